@@ -4,32 +4,143 @@ Configuration Module
 Copyright (c) 2025 Tekly IT Solutions. All rights reserved.
 PROPRIETARY SOFTWARE - Commercial use requires license agreement.
 """
+import os
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Optional, Tuple
 
 @dataclass
 class ModelConfig:
     detection_size: Tuple[int, int] = (160, 160)
     threshold: float = 0.6
     embedding_dim: int = 512  # InsightFace embedding dimension
+    model_name: str = "buffalo_l"  # InsightFace model pack
+    precision: str = "fp32"  # "fp32" or "int8" (quantized pack built by scripts/quantize_models.py)
+    pipeline_mode: str = "unified"  # "unified" (one detector + aligned chip) or "legacy" (RetinaFace crop + InsightFace)
+    embed_batching: bool = False  # Batch every caller; the API and stream manager batch their own app regardless
+    embed_max_batch: int = 32
+    embed_max_wait_ms: float = 2.0  # Longest a chip waits for others to join its batch
+    index_backend: str = "auto"  # "flat", "ivf_flat", "ivf_pq", "hnsw", "sq_fp16", "sq_int8", "pq" or "auto" (by size)
+    auto_flat_max: int = 50_000  # auto: exact search up to this many vectors
+    auto_ivf_flat_max: int = 1_000_000  # auto: IVF-Flat up to this many, IVF-PQ beyond
+    ivf_nlist: int = 1024  # IVF coarse clusters (clamped to gallery size when training)
+    ivf_nprobe: int = 16  # IVF clusters scanned per query
+    pq_m: int = 64  # PQ sub-quantizers (must divide embedding_dim)
+    pq_nbits: int = 8  # Bits per PQ code
+    hnsw_m: int = 32  # HNSW graph neighbours per node
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    rescore_factor: int = 4  # Compressed indexes: re-score k * factor candidates with full-precision rows (0 = off)
+    identity_search: bool = False  # Rank identities by centroid/exemplars, then re-score their full image sets
+    identity_exemplars: int = 3  # Extra k-means exemplars per identity (0 = centroid only)
+    identity_candidates: int = 10  # Identities re-scored per query
+    min_face_size: int = int(os.environ.get('MIN_FACE_SIZE', 0))  # Smallest face (px, full frame) to detect; > 0 runs detection on a downscaled copy
+    detector_min_face: int = 24  # Face size RetinaFace still finds reliably; the downscale keeps min_face_size above it
+    detection_min_side: int = 160  # Never downscale the detector input's short side below this
+
+@dataclass
+class RuntimeConfig:
+    providers: Tuple[str, ...] = ('CPUExecutionProvider',)
+    intra_op_threads: int = 0  # Threads inside one operator (0 = all cores; pool workers get cores // workers)
+    inter_op_threads: int = 0  # Threads across operators (parallel execution mode only)
+    graph_optimization: str = "all"  # "disable", "basic", "extended" or "all"
+    execution_mode: str = "sequential"  # "sequential" or "parallel"
+    enable_cpu_mem_arena: bool = True
+    enable_mem_pattern: bool = True
+    warmup_runs: int = 2  # Dummy inferences at startup so the first request is not slow
 
 @dataclass
 class CameraConfig:
     frame_width: int = 640
     frame_height: int = 480
     fps: int = 30
+    inference_workers: int = 2  # Live mode inference threads
+    frame_queue_size: int = 1  # Frames waiting for inference; older ones are dropped
+    tracking_enabled: bool = True  # Reuse a tracked face's identity instead of re-embedding every frame
+    track_iou_threshold: float = 0.3
+    track_reembed_interval: int = 15  # Frames between refresh embeddings of a tracked face
+    track_max_misses: int = 5  # Frames a track survives without a detection
+    track_history: int = 10  # Decisions smoothed per track
+    motion_gate_enabled: bool = False  # Skip detection on frames with no motion in the ROI
+    motion_method: str = "diff"  # "diff" (frame differencing) or "mog2" (background subtraction)
+    motion_pixel_threshold: int = 25  # Grey-level change that counts as a moving pixel
+    motion_min_changed: float = 0.01  # Fraction of moving pixels that triggers detection
+    motion_force_interval: int = 30  # Detect at least once every N frames
+    detection_roi: Optional[Tuple[float, float, float, float]] = None  # (x1, y1, x2, y2) as frame fractions
+    stream_queue_size: int = 2  # Frames buffered per stream in multi-stream mode; older ones are dropped
+    stream_reconnect_attempts: int = 5  # Reopen attempts after a device or RTSP stream stops delivering frames
+    stream_reconnect_delay: float = 2.0  # Seconds between reopen attempts
 
 @dataclass
 class DatasetConfig:
     dataset_path: str = "dataset"
     supported_formats: tuple = ('.jpg', '.jpeg', '.png', '.bmp')
+    num_workers: int = 0  # Ingestion worker processes (0 = one per CPU, 1 = in-process)
+    batch_size: int = 32  # Images embedded per recognition batch
+    checkpoint_path: str = "models/ingest_checkpoint.pkl"
+    cache_path: str = "models/embedding_cache.pkl"  # Empty string disables the embedding cache
+
+@dataclass
+class VideoConfig:
+    sample_every: int = 5  # Process every Nth frame of recorded footage
+    sample_interval: float = 0.0  # Seconds between processed frames; overrides sample_every when > 0
+    batch_size: int = 16  # Frames per detection/embedding batch
+    num_workers: int = 0  # Worker processes (0 = one per CPU, 1 = in-process)
+    max_pending_batches: int = 2  # Batches in flight per worker; bounds memory for any video length
+    include_unknown: bool = False  # Also write faces that matched nobody
+
+@dataclass
+class BulkVerifyConfig:
+    num_workers: int = 0  # Decode/detect/embed worker processes (0 = one per CPU, 1 = in-process)
+    batch_size: int = 32  # Images per worker batch and per index search
+    max_pending_batches: int = 2  # Batches in flight per worker
+    top_k: int = 5  # Matches written per image
 
 @dataclass
 class StorageConfig:
-    model_path: str = "models/enhanced_face_model.pkl"
-    index_path: str = "models/enhanced_face_index.faiss"
+    model_path: str = "models/enhanced_face_model.json"  # Header of the mmap-able model; legacy .pkl is still read
+    index_path: str = "models/enhanced_face_index.faiss"  # Index of the model at model_path; other models use <stem>.faiss
+    vector_store: str = "faiss"  # "faiss" (in-process, per worker) or "milvus" (shared by every worker)
+    milvus_uri: str = "models/milvus_gallery.db"  # *.db runs Milvus Lite locally; http://host:19530 for a server
+    milvus_collection: str = "faces"
+    milvus_index_type: str = "AUTOINDEX"
+    identity_cache_seconds: float = 60.0  # Shared store: max age of the cached identity count behind /health
+    rescore_copy: str = "float16"  # On-disk rows for re-scoring a compressed index: "float16" (.f16) or "float32" (.f32)
+
+@dataclass
+class ApiConfig:
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 1  # Server processes; each loads its own model and index
+    inference_threads: int = 4  # Threads per worker running detection/embedding off the event loop
+    max_concurrent_requests: int = 32  # Further requests get 503 instead of queueing
+    max_upload_bytes: int = 10 * 1024 * 1024
+    top_k: int = 5
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = False  # Stage timers and counters; disabled they cost one attribute check per call
+    port: int = 0  # Standalone /metrics endpoint for the CLI and camera loops (0 = off; the API serves /metrics)
+    stage_buckets: Tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+@dataclass
+class LoggingConfig:
+    level: str = "INFO"  # Overridden by the LOG_LEVEL environment variable
+    format: str = "json"  # "json" (one object per line) or "text"; LOG_FORMAT overrides
+    file: Optional[str] = None  # e.g. "logs/face_verification.log" (rotated)
+    file_max_bytes: int = 10 * 1024 * 1024
+    file_backups: int = 5
+    queue_size: int = 10000  # Records beyond this are dropped rather than blocking the caller
+    rate_limit_interval: float = 10.0  # Seconds per rate-limit window, per message template
+    rate_limit_burst: int = 5  # Records let through per window (0 = no limit)
+    sample_every: int = 100  # Keep 1 in N per-item debug records marked as sampled
 
 model_config = ModelConfig()
+runtime_config = RuntimeConfig()
 camera_config = CameraConfig()
 dataset_config = DatasetConfig()
-storage_config = StorageConfig()
\ No newline at end of file
+video_config = VideoConfig()
+bulk_verify_config = BulkVerifyConfig()
+storage_config = StorageConfig()
+api_config = ApiConfig()
+metrics_config = MetricsConfig()
+logging_config = LoggingConfig()
\ No newline at end of file
@@ -15,15 +15,18 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 os.chdir(SCRIPT_DIR)
 print(f"Working directory set to: {os.getcwd()}")
 
-from config.config import dataset_config
+from config.config import dataset_config, storage_config, metrics_config
 from src.core.embedding_service import init_insightface
-from src.services.dataset_loader import load_dataset
-from src.services.index_manager import build_index, get_top_matches
+from src.core.image_processor import warm_up_detector, detector_stats
+from src.services.dataset_loader import load_dataset, load_person_images
+from src.services.index_manager import build_index, get_top_matches, replace_identity, remove_identity
+from src.services.identity_index import identity_index_for
 from src.services.verification_service import verify_face
 from src.services.camera_service import close_camera
 from src.services.live_verification import capture_and_verify, live_verification_mode
-from src.services.storage_service import save_model, load_model
+from src.services.storage_service import save_model, load_model, append_enrollment, model_exists
 from src.services.training_service import quick_train_face
+from src.utils.metrics import start_metrics_server, stage_summary
 
 def rebuild_model(app, dataset_path, threshold=0.6):
     """Rebuild model from dataset"""
@@ -46,16 +49,49 @@ def rebuild_model(app, dataset_path, threshold=0.6):
         print("\n❌ Failed to load dataset")
         return None, None, None, False
 
+def enroll_person(app, dataset_path, person_name, embeddings, labels, index):
+    """Add or refresh one person in the live index without a full rebuild"""
+    print("\n" + "="*60)
+    print(f"➕ ENROLLING '{person_name}' INTO THE CURRENT MODEL")
+    print("="*60)
+    
+    person_embeddings, success = load_person_images(app, dataset_path, person_name)
+    if not success:
+        print("\n❌ No usable images for this person")
+        return embeddings, labels, index, False
+    
+    index, embeddings, labels = replace_identity(index, embeddings, labels, person_name, person_embeddings)
+    append_enrollment('replace', person_name, person_embeddings)
+    print(f"\n✅ '{person_name}' enrolled ({len(person_embeddings)} embeddings)")
+    return embeddings, labels, index, True
+
+def remove_person(person_name, embeddings, labels, index):
+    """Remove one person from the live index and journal the removal"""
+    if person_name not in set(labels):
+        print(f"❌ '{person_name}' is not in the model")
+        return embeddings, labels, index, False
+    
+    index, embeddings, labels = remove_identity(index, embeddings, labels, person_name)
+    append_enrollment('remove', person_name)
+    print(f"✅ '{person_name}' removed from the model")
+    print(f"💡 Delete the '{person_name}' dataset folder to keep them out of future rebuilds")
+    return embeddings, labels, index, True
+
 
 def main():
     """Enhanced main function with training capability"""
     print("🚀 ENHANCED FACE VERIFICATION SYSTEM WITH TRAINING")
     print("="*60)
     
+    if metrics_config.enabled and metrics_config.port:
+        start_metrics_server()
+    
     app = init_insightface()
+    warm_up_detector()
     embeddings = []
     labels = []
     index = None
+    identity_index = None
     threshold = 0.6
     camera = None
     dataset_path = dataset_config.dataset_path
@@ -64,8 +100,8 @@ def main():
     os.makedirs(dataset_path, exist_ok=True)
     
     # Check for model in FaceRecognition/models folder
-    model_path = "models/enhanced_face_model.pkl"
-    if os.path.exists(model_path):
+    model_path = storage_config.model_path
+    if model_exists(model_path):
         choice = input("📁 Found existing model. Load it? (y/n): ").lower().strip()
         if choice == 'y':
             embeddings, labels, threshold, index, success = load_model(model_path)
@@ -101,10 +137,11 @@ def main():
         print("6. 📈 System info")
         print("7. 🔨 Rebuild model from dataset")
         print("8. 🎓 Train new face (Camera)")
-        print("9. 🚪 Exit")
+        print("9. 🗑️  Remove person from model")
+        print("10. 🚪 Exit")
         print("="*60)
         
-        choice = input("Choose option (1-9): ").strip()
+        choice = input("Choose option (1-10): ").strip()
         
         if choice == '1':
             if index is None:
@@ -113,7 +150,8 @@ def main():
             
             image_path = input("Enter image path: ").strip().strip('"')
             if os.path.exists(image_path):
-                verify_face(app, index, labels, image_path, threshold)
+                identity_index = identity_index_for(identity_index, embeddings, labels)
+                verify_face(app, index, labels, image_path, threshold, identity_index)
             else:
                 print(f"❌ File not found: {image_path}")
         
@@ -124,7 +162,8 @@ def main():
             
             image_path = input("Enter image path: ").strip().strip('"')
             if os.path.exists(image_path):
-                matches = get_top_matches(index, labels, image_path, app)
+                identity_index = identity_index_for(identity_index, embeddings, labels)
+                matches = get_top_matches(index, labels, image_path, app, identity_index=identity_index)
                 print("\n🔍 Top matches:")
                 for i, (label, score) in enumerate(matches, 1):
                     print(f"  {i}. {label}: {score:.3f}")
@@ -181,6 +220,15 @@ def main():
             print(f"Index size: {index.ntotal if index else 0}")
             print(f"Camera status: {'Ready' if camera else 'Not initialized'}")
             print(f"Dataset path: {dataset_path}")
+            print(f"ONNX Runtime: {getattr(app, 'session_settings', {})}")
+            detector = detector_stats.summary()
+            if detector['calls']:
+                print(f"Detector: {detector['calls']} calls, {detector['latency_ms']:.1f} ms avg "
+                      f"(p95 {detector['latency_p95_ms']:.1f} ms), scale {detector['last_scale']:.2f} -> "
+                      f"{detector['last_input'][0]}x{detector['last_input'][1]} input")
+            if metrics_config.enabled:
+                for name, (calls, mean_ms) in sorted(stage_summary().items()):
+                    print(f"Stage {name}: {calls} calls, {mean_ms:.2f} ms avg")
         
         elif choice == '7':
             print("\n🔨 Rebuild model from dataset...")
@@ -197,7 +245,23 @@ def main():
             try:
                 success, camera, person_name = quick_train_face(app, camera, dataset_path)
                 
-                if success:
+                if success and index is not None:
+                    print("\n" + "="*60)
+                    enroll = input("Add the new face to the current model now? (y/n): ").lower().strip()
+                    
+                    if enroll == 'y':
+                        embeddings, labels, index, enroll_success = enroll_person(
+                            app, dataset_path, person_name, embeddings, labels, index
+                        )
+                        if enroll_success:
+                            print(f"\n🎉 SUCCESS! '{person_name}' is now in the system!")
+                        else:
+                            print("\n⚠️  Training images saved but enrollment failed.")
+                            print("You can manually rebuild using option 7.")
+                    else:
+                        print("\n💡 Training images saved. Use option 7 to rebuild model later.")
+                
+                elif success:
                     print("\n" + "="*60)
                     print("Would you like to rebuild the model now?")
                     print("(This will include the new face in the recognition system)")
@@ -220,6 +284,14 @@ def main():
                 pass
         
         elif choice == '9':
+            if index is None:
+                print("❌ No model loaded")
+                continue
+            
+            person_name = input("Enter name of person to remove: ").strip().replace(" ", "_")
+            embeddings, labels, index, _ = remove_person(person_name, embeddings, labels, index)
+        
+        elif choice == '10':
             print("👋 Goodbye!")
             close_camera(camera)
             break
@@ -0,0 +1,51 @@
+"""Verify a folder or manifest of query images against the gallery, writing resumable CSV/JSONL results"""
+import sys
+import os
+import argparse
+from concurrent.futures.process import BrokenProcessPool
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config.config import bulk_verify_config
+from src.services.storage_service import load_model
+from src.services.ingestion_engine import app_for_workers
+from src.services.bulk_verification import bulk_verify
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", help="Folder of images, or a manifest (CSV with a 'path' column, or one path per line)")
+    parser.add_argument("--output", default="bulk_verification.jsonl", help="Results file (.csv or .jsonl)")
+    parser.add_argument("--top-k", type=int, default=bulk_verify_config.top_k, help="Matches written per image")
+    parser.add_argument("--threshold", type=float, help="Override the model's verification threshold")
+    parser.add_argument("--workers", type=int, default=bulk_verify_config.num_workers,
+                        help="Worker processes (0 = one per CPU, 1 = in-process)")
+    parser.add_argument("--batch-size", type=int, default=bulk_verify_config.batch_size,
+                        help="Images per batch and per index search")
+    parser.add_argument("--restart", action="store_true", help="Discard existing output instead of resuming from it")
+    args = parser.parse_args()
+    
+    embeddings, labels, threshold, index, success = load_model()
+    if not success:
+        print("❌ No trained model found; run scripts/train_model.py first")
+        return 1
+    if args.threshold is not None:
+        threshold = args.threshold
+    
+    args.workers, app = app_for_workers(args.workers)
+    if args.workers <= 1 and app is None:
+        return 1
+    
+    print(f"🔍 Verifying {args.source} (threshold {threshold:.3f}, top {args.top_k}) -> {args.output}")
+    try:
+        stats = bulk_verify(app, index, labels, args.source, args.output, threshold, top_k=args.top_k,
+                            num_workers=args.workers, batch_size=args.batch_size, resume=not args.restart)
+    except BrokenProcessPool:
+        print(f"❌ A worker process died (out of memory?); rerun the same command to resume from {args.output}")
+        return 1
+    print(f"✅ {stats['processed']} verified in {stats['elapsed_s']:.1f}s ({stats['images_per_second']:.1f} images/s), "
+          f"{stats['skipped']} already done")
+    print(f"   {stats['match']} matched, {stats['no_match']} unknown, {stats['no_face']} without a face, "
+          f"{stats['missing']} missing, {stats['error']} errors")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
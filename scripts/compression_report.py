@@ -0,0 +1,54 @@
+"""Report memory saved versus score error for compressed gallery indexes"""
+import sys
+import os
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config.config import model_config
+from src.services.gallery_compression import compression_report, COMPRESSED_BACKENDS
+from src.utils.benchmark import random_gallery, random_queries, save_results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Use a random gallery of this size instead of the saved model")
+    parser.add_argument("--queries", type=int, default=1000, help="Noisy copies of gallery rows used as probes")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours compared against exact search")
+    parser.add_argument("--backends", default=",".join(COMPRESSED_BACKENDS), help="Comma-separated index backends")
+    parser.add_argument("--rescore-factor", type=int, default=model_config.rescore_factor,
+                        help="Candidates re-scored per result (0 = compressed codes only)")
+    parser.add_argument("--output", default="models/compression_report.json", help="JSON report path")
+    args = parser.parse_args()
+    model_config.rescore_factor = args.rescore_factor
+    
+    if args.synthetic:
+        embeddings, _ = random_gallery(args.synthetic)
+    else:
+        from src.services.storage_service import load_model
+        embeddings, labels, threshold, index, success = load_model()
+        if not success:
+            print("❌ No trained model found; use --synthetic N or run scripts/train_model.py first")
+            return 1
+    
+    print(f"📦 Comparing {args.backends} on {len(embeddings)} embeddings ({args.queries} queries, k={args.k})")
+    report = compression_report(embeddings, random_queries(embeddings, args.queries),
+                                backends=tuple(args.backends.split(",")), k=args.k)
+    
+    print(f"{'backend':<10} {'MB':>9} {'B/vec':>7} {'saved':>6} {'top1':>6} {'err':>7} {'top1*':>6} {'err*':>7}")
+    for backend, entry in report['backends'].items():
+        line = f"{backend:<10} {entry['memory_mb']:>9.1f} {entry['bytes_per_vector']:>7.0f} {entry['memory_saved']:>6.0%}"
+        if 'top1_agreement' in entry:
+            line += f" {entry['top1_agreement']:>6.3f} {entry['score_error_mean']:>7.4f}"
+        if 'rescored_top1_agreement' in entry:
+            line += f" {entry['rescored_top1_agreement']:>6.3f} {entry['rescored_score_error_mean']:>7.4f}"
+        print(line)
+    print(f"* after re-scoring {report['rescore_factor']}x candidates from a "
+          f"{report['rescore_copy_bytes_per_vector']} B/vector on-disk copy")
+    
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    save_results(report, args.output)
+    print(f"💾 Report saved: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
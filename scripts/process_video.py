@@ -0,0 +1,49 @@
+"""Scan recorded video footage for enrolled identities and stream matches to JSONL"""
+import sys
+import os
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config.config import video_config
+from src.services.storage_service import load_model
+from src.services.ingestion_engine import app_for_workers
+from src.services.video_processor import process_video, video_info
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("videos", nargs="+", help="Video files to scan")
+    parser.add_argument("--output", default="video_matches.jsonl", help="JSONL file matches are appended to")
+    parser.add_argument("--every", type=int, default=video_config.sample_every, help="Process every Nth frame")
+    parser.add_argument("--interval", type=float, default=video_config.sample_interval,
+                        help="Seconds between processed frames (overrides --every)")
+    parser.add_argument("--workers", type=int, default=video_config.num_workers,
+                        help="Worker processes (0 = one per CPU, 1 = in-process)")
+    parser.add_argument("--batch-size", type=int, default=video_config.batch_size, help="Frames per batch")
+    parser.add_argument("--min-face", type=int, default=0, help="Ignore faces smaller than this many pixels")
+    parser.add_argument("--all-faces", action="store_true", help="Also write faces that matched nobody")
+    args = parser.parse_args()
+    
+    embeddings, labels, threshold, index, success = load_model()
+    if not success:
+        print("❌ No trained model found; run scripts/train_model.py first")
+        return 1
+    
+    args.workers, app = app_for_workers(args.workers)
+    if args.workers <= 1 and app is None:
+        return 1
+    
+    for video_path in args.videos:
+        info = video_info(video_path)
+        print(f"🎞️  {video_path}: {info['duration_s']:.0f}s at {info['fps']:.1f} FPS ({info['width']}x{info['height']})")
+        stats = process_video(app, index, labels, video_path, args.output, threshold, sample_every=args.every,
+                              sample_interval=args.interval, batch_size=args.batch_size, num_workers=args.workers,
+                              min_size=args.min_face, include_unknown=args.all_faces)
+        print(f"✅ {stats['frames_processed']} frames, {stats['faces']} faces, {stats['matches']} matches in "
+              f"{stats['elapsed_s']:.1f}s ({stats['frames_per_second']:.1f} frames/s, "
+              f"{stats['realtime_factor']:.1f}x realtime) -> {args.output}")
+        if stats['failed_frames']:
+            print(f"⚠️  {stats['failed_frames']} frames skipped after detection/embedding errors (see log)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
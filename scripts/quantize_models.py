@@ -0,0 +1,47 @@
+"""Build the INT8 model pack and report its accuracy delta against FP32"""
+import sys
+import os
+import json
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config.config import dataset_config
+from src.core.embedding_service import init_insightface
+from src.services.quantization_service import quantize_model_pack, accuracy_delta_report
+
+def main():
+    """Quantize detection and recognition models, then compare INT8 with FP32 on the dataset"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dataset", default=dataset_config.dataset_path)
+    parser.add_argument("--calibration-images", type=int, default=200)
+    parser.add_argument("--report", default="models/int8_accuracy_report.json")
+    parser.add_argument("--report-only", action="store_true", help="Skip quantization and only compare packs")
+    args = parser.parse_args()
+    
+    fp32_app = init_insightface(precision='fp32')
+    if not args.report_only:
+        print(f"🔧 Quantizing models with calibration data from {args.dataset}")
+        quantize_model_pack(fp32_app, args.dataset, max_images=args.calibration_images)
+    
+    int8_app = init_insightface(precision='int8')
+    report = accuracy_delta_report(fp32_app, int8_app, args.dataset)
+    
+    os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"\n{'='*60}")
+    print(f"📊 INT8 vs FP32 ({report['faces']} faces, {report['identities']} people):")
+    print(f"Top-1 agreement: {report['top1_agreement']*100:.1f}%")
+    print(f"Top-1 accuracy: FP32 {report['fp32_top1_accuracy']*100:.1f}% | INT8 {report['int8_top1_accuracy']*100:.1f}%")
+    print(f"Accept/reject agreement @ {report['threshold']}: {report['decision_agreement']*100:.1f}%")
+    print(f"Score drift: mean {report['score_drift_mean']:.4f}, max {report['score_drift_max']:.4f}")
+    print(f"Recognition: {report['fp32_recognition_ms']:.2f} ms -> {report['int8_recognition_ms']:.2f} ms "
+          f"per face ({report['recognition_speedup']}x)")
+    print(f"SCRFD detection (unified pipeline only): {report['fp32_scrfd_detection_ms']:.2f} ms -> "
+          f"{report['int8_scrfd_detection_ms']:.2f} ms per image ({report['scrfd_detection_speedup']}x)")
+    print(f"📝 Report saved to {args.report}")
+    print("💡 Set ModelConfig.precision = \"int8\" to serve the quantized pack")
+
+if __name__ == "__main__":
+    main()
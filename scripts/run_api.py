@@ -0,0 +1,17 @@
+"""Run the HTTP verification service"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import uvicorn
+from config.config import api_config
+
+def main():
+    """Start uvicorn; every worker process loads the model once at startup"""
+    print(f"🌐 Starting Face Recognition API on {api_config.host}:{api_config.port} "
+          f"({api_config.workers} worker(s))")
+    uvicorn.run("src.api.routes:create_app", factory=True, host=api_config.host,
+                port=api_config.port, workers=api_config.workers)
+
+if __name__ == "__main__":
+    main()
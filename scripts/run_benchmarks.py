@@ -0,0 +1,226 @@
+"""Offline benchmark suite for the detection, embedding, search and storage hot paths"""
+import sys
+import os
+import io
+import argparse
+import platform
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+from src.utils.benchmark import (measure, random_gallery, random_queries, synthetic_face_image, synthetic_chips,
+                                 write_synthetic_dataset, compare_results, load_results, save_results, peak_rss_mb)
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+STAGES = ("search", "storage", "embedding", "detection", "pipeline")
+
+def quiet(fn):
+    """Wrap fn so its progress prints do not pollute the benchmark output"""
+    def run(*args, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return fn(*args, **kwargs)
+    return run
+
+def bench_search(results, sizes, backends, iterations, batch_size):
+    """Index build, single-query verify, batched verify and top-k at each gallery size"""
+    from src.services.index_manager import build_index, top_matches_for_embedding
+    from src.services.verification_service import verify_embedding, verify_embeddings
+    
+    for size in sizes:
+        embeddings, labels = random_gallery(size)
+        queries = random_queries(embeddings, max(iterations, batch_size))
+        for backend in backends:
+            prefix = f"search/{backend}/{size}"
+            print(f"⏱️  {prefix}")
+            built = {}
+            
+            def build():
+                built['index'] = quiet(build_index)(embeddings, backend)
+            
+            results[f"{prefix}/build_index"] = measure(build, iterations=1, warmup=0, items_per_call=size)
+            index = built['index']
+            cursor = iter(range(10 ** 9))
+            
+            results[f"{prefix}/verify_embedding"] = measure(
+                lambda: verify_embedding(index, labels, queries[next(cursor) % len(queries)], 0.6),
+                iterations=iterations)
+            results[f"{prefix}/verify_embeddings_batch{batch_size}"] = measure(
+                lambda: verify_embeddings(index, labels, queries[:batch_size], 0.6),
+                iterations=max(5, iterations // 10), items_per_call=batch_size)
+            results[f"{prefix}/top_matches_k5"] = measure(
+                lambda: top_matches_for_embedding(index, labels, queries[next(cursor) % len(queries)], 5),
+                iterations=iterations)
+
+def bench_storage(results, sizes, max_size, iterations):
+    """save_model and load_model (mmap'd arrays + index) round trips"""
+    from src.services.index_manager import build_index
+    from src.services.storage_service import save_model, load_model
+    
+    for size in [size for size in sizes if size <= max_size]:
+        embeddings, labels = random_gallery(size)
+        index = quiet(build_index)(embeddings, "flat")
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, "bench_model.json")
+            prefix = f"storage/{size}"
+            print(f"⏱️  {prefix}")
+            results[f"{prefix}/save_model"] = measure(
+                lambda: quiet(save_model)(embeddings, labels, 0.6, index, model_path),
+                iterations=max(1, iterations // 10), warmup=1, items_per_call=size)
+            results[f"{prefix}/load_model"] = measure(
+                lambda: quiet(load_model)(model_path), iterations=max(1, iterations // 10), warmup=1, items_per_call=size)
+
+def bench_embedding(results, app, iterations, batch_size):
+    """Recognition model on synthetic aligned chips, one at a time and batched"""
+    from src.core.embedding_service import embed_aligned_faces
+    
+    chips = synthetic_chips(batch_size)
+    print("⏱️  embedding")
+    results["embedding/single"] = measure(lambda: embed_aligned_faces(app, chips[:1]), iterations=iterations)
+    results[f"embedding/batch{batch_size}"] = measure(lambda: embed_aligned_faces(app, chips),
+                                                      iterations=max(5, iterations // 10), items_per_call=batch_size)
+
+def bench_detection(results, iterations):
+    """RetinaFace on synthetic 640x480 frames, and 1280x720 at full and adaptive resolution"""
+    from src.core.image_processor import detect_largest_face, warm_up_detector, run_detector
+    
+    quiet(warm_up_detector)()
+    frames = [synthetic_face_image(seed) for seed in range(8)]
+    cursor = iter(range(10 ** 9))
+    print("⏱️  detection")
+    results["detection/retinaface_640x480"] = measure(
+        lambda: detect_largest_face(frames[next(cursor) % len(frames)]), iterations=max(5, iterations // 5))
+    
+    hd_frames = [synthetic_face_image(seed, (720, 1280)) for seed in range(4)]
+    for min_face in (0, 80):
+        results[f"detection/retinaface_1280x720_min_face{min_face}"] = measure(
+            lambda: run_detector(hd_frames[next(cursor) % len(hd_frames)], min_face_size=min_face),
+            iterations=max(5, iterations // 5))
+
+def bench_pipeline(results, app, iterations, people, images_per_person):
+    """process_single_image and a cold load_dataset over a synthetic dataset folder"""
+    from src.core.image_processor import process_single_image
+    from src.services.dataset_loader import load_dataset
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = os.path.join(tmp, "dataset")
+        total = write_synthetic_dataset(dataset, people, images_per_person)
+        image_path = os.path.join(dataset, "synthetic_000", "000.jpg")
+        print("⏱️  pipeline")
+        results["pipeline/process_single_image"] = measure(
+            lambda: quiet(process_single_image)(app, image_path, "bench"), iterations=max(5, iterations // 5))
+        
+        runs = iter(range(10 ** 9))
+        
+        def cold_load():
+            # Fresh cache and checkpoint every run so nothing is reused between runs
+            run = next(runs)
+            quiet(load_dataset)(app, dataset, num_workers=0,
+                                checkpoint_path=os.path.join(tmp, f"ckpt_{run}.pkl"),
+                                cache_path=os.path.join(tmp, f"cache_{run}.pkl"))
+        
+        results[f"pipeline/load_dataset_{total}_images"] = measure(cold_load, iterations=3, warmup=1, items_per_call=total)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_summary(results):
+    print(f"\n{'='*96}")
+    print(f"{'benchmark':<52}{'p50 ms':>10}{'p99 ms':>10}{'items/s':>12}{'peak MB':>10}")
+    for name, result in sorted(results.items()):
+        if 'error' in result:
+            print(f"{name:<52}  skipped: {result['error']}")
+            continue
+        print(f"{name:<52}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+              f"{result['throughput_per_s']:>12.1f}{result['peak_traced_mb']:>10.1f}")
+
+def main():
+    """Run the selected stages, write JSON and optionally fail on regressions against a baseline"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {STAGES}")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Gallery sizes for search/storage")
+    parser.add_argument("--quick", action="store_true", help="Gallery sizes up to 100k and fewer iterations")
+    parser.add_argument("--backends", default="auto", help="Index backends, e.g. flat,ivf_flat,hnsw")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--storage-max-size", type=int, default=100_000)
+    parser.add_argument("--dataset-people", type=int, default=5)
+    parser.add_argument("--dataset-images", type=int, default=4)
+    parser.add_argument("--output", default=f"benchmark_results_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown as a fraction (0.10 = 10%%)")
+    args = parser.parse_args()
+    
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {sorted(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+    iterations = args.iterations
+    if args.quick:
+        sizes = [size for size in sizes if size <= 100_000]
+        iterations = max(10, iterations // 4)
+    
+    results = {}
+    print(f"🏁 Benchmarking stages {stages} (sizes {sizes})")
+    
+    if "search" in stages:
+        bench_search(results, sizes, args.backends.split(","), iterations, args.batch_size)
+    if "storage" in stages:
+        bench_storage(results, sizes, args.storage_max_size, iterations)
+    
+    app = None
+    if {"embedding", "pipeline"} & set(stages):
+        try:
+            from src.core.embedding_service import init_insightface
+            app = quiet(init_insightface)()
+        except Exception as e:
+            print(f"⚠️  InsightFace unavailable, skipping model stages: {e}")
+            results["embedding/single"] = {'error': str(e)}
+    if "embedding" in stages and app is not None:
+        bench_embedding(results, app, iterations, args.batch_size)
+    if "detection" in stages:
+        try:
+            bench_detection(results, iterations)
+        except Exception as e:
+            print(f"⚠️  RetinaFace unavailable, skipping detection: {e}")
+            results["detection/retinaface_640x480"] = {'error': str(e)}
+    if "pipeline" in stages and app is not None:
+        bench_pipeline(results, app, iterations, args.dataset_people, args.dataset_images)
+    
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'stages': stages,
+            'sizes': sizes,
+            'peak_rss_mb': peak_rss_mb(),
+        },
+        'results': results,
+    }
+    save_results(report, args.output)
+    print_summary(results)
+    print(f"\n📝 Results saved to {args.output}")
+    
+    if args.baseline:
+        regressions = compare_results(load_results(args.baseline), report, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold*100:.0f}% vs {args.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.threshold*100:.0f}% vs {args.baseline}")
+
+if __name__ == "__main__":
+    main()
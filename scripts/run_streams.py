@@ -0,0 +1,96 @@
+"""Verify faces on several cameras, video files or RTSP streams with one shared model"""
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config.config import camera_config
+from src.core.embedding_service import init_insightface
+from src.core.image_processor import warm_up_detector
+from src.services.storage_service import load_model
+from src.services.stream_manager import StreamManager
+
+def parse_stream_arg(arg):
+    """Split "door=rtsp://..." into ("door", "rtsp://..."); a bare source gets an automatic name"""
+    name, sep, target = arg.partition("=")
+    if sep and name and not any(c in name for c in ":/\\."):
+        return name, target
+    return None, arg
+
+def result_record(result):
+    return {
+        'stream': result.stream,
+        'frame_id': result.frame_id,
+        'latency_ms': round((result.completed_at - result.captured_at) * 1000, 1),
+        'faces': [{'identity': face.identity, 'confidence': round(face.confidence, 4),
+                   'box': [int(v) for v in face.box], 'det_score': round(float(face.det_score), 4)}
+                  for face in result.faces],
+    }
+
+def print_stats(stats):
+    for name, s in stats.items():
+        print(f"📹 {name} [{s['state']}]: capture {s['capture_fps']:.1f} FPS, inference {s['inference_fps']:.1f} FPS, "
+              f"queue {s['queue_depth']}, dropped {s['dropped_frames']}, latency {s['latency_ms']:.0f} ms "
+              f"(p95 {s['latency_p95_ms']:.0f} ms)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sources", nargs="+", help="Camera index (0), video file or stream URL (rtsp://...); "
+                                                   "prefix with name= to label a stream")
+    parser.add_argument("--workers", type=int, default=camera_config.inference_workers,
+                        help="Shared inference threads for all streams")
+    parser.add_argument("--queue-size", type=int, default=camera_config.stream_queue_size,
+                        help="Frames buffered per stream before the oldest are dropped")
+    parser.add_argument("--min-face", type=int, default=0, help="Ignore faces smaller than this many pixels")
+    parser.add_argument("--output", help="Append every frame result to this JSONL file")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="Seconds between stats lines")
+    parser.add_argument("--loop", action="store_true", help="Restart video files when they end")
+    args = parser.parse_args()
+    
+    embeddings, labels, threshold, index, success = load_model()
+    if not success:
+        print("❌ No trained model found; run scripts/train_model.py first")
+        return 1
+    app = init_insightface()
+    if app is None:
+        return 1
+    warm_up_detector()
+    
+    output = open(args.output, "a") if args.output else None
+    write_lock = threading.Lock()
+    
+    def on_result(result):
+        if output is None or not result.faces:
+            return
+        line = json.dumps(result_record(result))
+        with write_lock:
+            output.write(line + "\n")
+    
+    manager = StreamManager(app, index, labels, threshold, num_workers=args.workers, queue_size=args.queue_size,
+                            min_size=args.min_face, on_result=on_result)
+    for source in args.sources:
+        name, target = parse_stream_arg(source)
+        manager.add_stream(target, name=name, loop=args.loop)
+    
+    print(f"🎥 Watching {len(args.sources)} streams with {args.workers} shared inference workers (Ctrl+C to stop)")
+    manager.start()
+    try:
+        while any(stream.thread.is_alive() for stream in manager.streams.values()):
+            time.sleep(args.stats_interval)
+            print_stats(manager.stats())
+        manager.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+        if output is not None:
+            output.close()
+    
+    print_stats(manager.stats())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""HTTP middleware: request timing and limits"""
+import time
+from starlette.responses import JSONResponse
+
+class TimingMiddleware:
+    """Add an X-Process-Time header (milliseconds) to every response"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", f"{elapsed_ms:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        await self.app(scope, receive, send_with_timing)
+
+class LimitMiddleware:
+    """Reject oversized bodies (413) and shed load beyond max_concurrent requests (503)"""
+    
+    def __init__(self, app, max_body_bytes, max_concurrent):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.max_concurrent = max_concurrent
+        self.active = 0
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope.get("headers", []))
+        content_length = headers.get(b"content-length")
+        if content_length is not None and int(content_length) > self.max_body_bytes:
+            await JSONResponse({"detail": "Request body too large"}, status_code=413)(scope, receive, send)
+            return
+        
+        if self.active >= self.max_concurrent:
+            await JSONResponse({"detail": "Server busy, retry later"}, status_code=503,
+                               headers={"Retry-After": "1"})(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise BodyTooLarge()
+            return message
+        
+        self.active += 1
+        try:
+            await self.app(scope, limited_receive, send)
+        except BodyTooLarge:
+            await JSONResponse({"detail": "Request body too large"}, status_code=413)(scope, receive, send)
+        finally:
+            self.active -= 1
+
+class BodyTooLarge(Exception):
+    """Raised while streaming a chunked body past the size limit"""
+    pass
@@ -0,0 +1,384 @@
+"""HTTP verification service"""
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import asyncio
+import cv2
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response
+from config.config import api_config, storage_config
+from src.core.embedding_service import init_insightface
+from src.core.batch_scheduler import get_batcher, close_batcher
+from src.core.image_processor import embed_images, process_frame_faces, warm_up_detector
+from src.services.identity_index import identity_index_for
+from src.services.index_manager import add_identity, remove_identity, replace_identity, top_matches_for_embedding
+from src.services.storage_service import load_model, load_journal, append_enrollment, model_exists
+from src.services.verification_service import verify_embedding, verify_embeddings
+from src.services.vector_store import create_vector_store, gallery_record_ids
+from src.api.middleware import TimingMiddleware, LimitMiddleware
+from src.utils.metrics import stage, record_decisions, render_prometheus, PROMETHEUS_CONTENT_TYPE
+from src.api.schemas import (VerifyResponse, FaceResult, FacesResponse, Match, TopMatchesResponse,
+                             EnrollResponse, DeleteResponse, HealthResponse)
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+class GalleryState:
+    """Model, index and InsightFace session shared by every request in one worker
+
+    Searches and enrollment updates hold the lock; detection and embedding do not.
+    Handlers call every method through run_blocking, so a long enrollment only
+    occupies executor threads and never the event loop.
+    """
+    
+    def __init__(self, app, embeddings, labels, index, threshold, model_path):
+        self.app = app
+        self.embeddings = embeddings
+        self.labels = labels
+        self.index = index
+        self.threshold = threshold
+        self.model_path = model_path
+        self.identities = identity_index_for(None, embeddings, labels)
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def load(cls, model_path=None):
+        model_path = model_path or storage_config.model_path
+        app = init_insightface()
+        warm_up_detector()
+        embeddings, labels, index, threshold = np.array([]), np.array([]), None, 0.6
+        if model_exists(model_path):
+            loaded = load_model(model_path)
+            if loaded[4]:
+                embeddings, labels, threshold, index, _ = loaded
+        else:
+            embeddings, labels, index = load_journal(model_path)
+        if storage_config.vector_store != "faiss":
+            return SharedGalleryState.connect(app, embeddings, labels, threshold)
+        return cls(app, embeddings, labels, index, threshold, model_path)
+    
+    @property
+    def ready(self):
+        return self.index is not None
+    
+    def size(self):
+        return len(self.labels)
+    
+    def identity_count(self):
+        return len(set(self.labels))
+    
+    def counts(self):
+        """(gallery size, identity count) for /health"""
+        return self.size(), self.identity_count()
+    
+    def verify(self, embedding):
+        with self.lock:
+            if self.identities is not None:
+                return self.identities.verify(embedding, self.threshold)
+            return verify_embedding(self.index, self.labels, embedding, self.threshold)
+    
+    def verify_many(self, embeddings):
+        with self.lock:
+            if self.identities is not None:
+                return self.identities.verify_many(embeddings, self.threshold)
+            return verify_embeddings(self.index, self.labels, embeddings, self.threshold)
+    
+    def top_matches(self, embedding, k):
+        with self.lock:
+            if self.identities is not None:
+                return self.identities.top_matches(embedding, k)
+            return top_matches_for_embedding(self.index, self.labels, embedding, k)
+    
+    def enroll(self, identity, new_embeddings, replace):
+        with self.lock:
+            update = replace_identity if replace else add_identity
+            self.index, self.embeddings, self.labels = update(
+                self.index, self.embeddings, self.labels, identity, new_embeddings)
+            append_enrollment('replace' if replace else 'add', identity, new_embeddings, self.model_path)
+            self._refresh_identities(identity)
+            return len(self.labels)
+    
+    def delete(self, identity):
+        with self.lock:
+            if identity not in set(self.labels):
+                return False, len(self.labels)
+            self.index, self.embeddings, self.labels = remove_identity(
+                self.index, self.embeddings, self.labels, identity)
+            append_enrollment('remove', identity, model_path=self.model_path)
+            self._refresh_identities(identity)
+            return True, len(self.labels)
+    
+    def _refresh_identities(self, identity):
+        # Only the changed identity's centroid and exemplars are recomputed
+        if self.identities is not None and len(self.labels) > 0:
+            self.identities.refresh(self.embeddings, self.labels, changed=[identity])
+        else:
+            self.identities = identity_index_for(None, self.embeddings, self.labels)
+
+class SharedGalleryState(GalleryState):
+    """Gallery kept in a shared vector store, so every API worker sees the same enrollments
+
+    The store is the source of truth: enrollments are not journaled to the local model
+    files, and no per-worker copy of the vectors is held. Store calls block on the
+    network, so handlers run them on the executor like every other state call.
+    """
+    
+    def __init__(self, app, store, threshold):
+        super().__init__(app, np.array([]), np.array([]), None, threshold, None)
+        self.store = store
+        # Distinct labels seen in the store, with the record count and time they were read at
+        self._label_cache = None
+        self._label_cache_count = -1
+        self._label_cache_at = 0.0
+    
+    @classmethod
+    def connect(cls, app, embeddings, labels, threshold, store=None, batch_size=1000):
+        """Open the configured store, seeding it from the local model when it is empty
+
+        Seed ids are deterministic, so workers starting together upsert the same records.
+        """
+        store = store or create_vector_store()
+        if store.count() == 0 and len(labels) > 0:
+            ids = gallery_record_ids(labels)
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                store.upsert(ids[start:end], list(labels[start:end]), np.asarray(embeddings[start:end]))
+            log.info("Seeded shared gallery with %s embeddings", len(ids))
+        log.info("Shared gallery: %s embeddings", store.count())
+        return cls(app, store, threshold)
+    
+    @property
+    def ready(self):
+        return True
+    
+    def size(self):
+        return self.store.count()
+    
+    def identity_count(self, count=None):
+        """Number of distinct labels in the store
+        
+        The labels are rescanned only when the store's record count changed (another worker
+        enrolled or deleted) or the cache is older than identity_cache_seconds.
+        """
+        count = self.store.count() if count is None else count
+        with self.lock:
+            if (self._label_cache is not None and count == self._label_cache_count
+                    and time.monotonic() - self._label_cache_at < storage_config.identity_cache_seconds):
+                return len(self._label_cache)
+        labels = self.store.identities()
+        with self.lock:
+            self._label_cache, self._label_cache_count, self._label_cache_at = labels, count, time.monotonic()
+        return len(labels)
+    
+    def counts(self):
+        count = self.store.count()
+        return count, self.identity_count(count)
+    
+    def _note_change(self, identity, present, count):
+        """Apply this worker's own enroll/delete to the cached labels so /health needs no rescan"""
+        with self.lock:
+            if self._label_cache is None:
+                return
+            if present:
+                self._label_cache.add(identity)
+            else:
+                self._label_cache.discard(identity)
+            self._label_cache_count = count
+    
+    def verify(self, embedding):
+        top_labels, scores, accepted = self.verify_many([embedding])
+        return (top_labels[0] if accepted[0] else None), float(scores[0])
+    
+    def verify_many(self, embeddings):
+        with stage("search"):
+            hits = self.store.search(np.asarray(embeddings, dtype='float32'), k=1)
+        top_labels = np.array([row[0][1] if row else None for row in hits], dtype=object)
+        scores = np.array([row[0][2] if row else 0.0 for row in hits], dtype='float32')
+        accepted = np.array([bool(row) for row in hits], dtype=bool) & (scores >= self.threshold)
+        record_decisions(accepted.sum(), len(accepted) - accepted.sum())
+        return top_labels, scores, accepted
+    
+    def top_matches(self, embedding, k):
+        return [(label, score) for _, label, score in self.store.search(np.asarray([embedding]), k=k)[0]]
+    
+    def enroll(self, identity, new_embeddings, replace):
+        if replace:
+            self.store.delete(labels=[identity])
+        ids = [f"{identity}/{uuid.uuid4().hex}" for _ in range(len(new_embeddings))]
+        self.store.upsert(ids, [identity] * len(ids), new_embeddings)
+        count = self.store.count()
+        self._note_change(identity, True, count)
+        return count
+    
+    def delete(self, identity):
+        removed = self.store.delete(labels=[identity])
+        count = self.store.count()
+        self._note_change(identity, False, count)
+        return removed > 0, count
+
+def decode_image(data):
+    """Decode uploaded bytes into a BGR image, or None if they are not an image"""
+    if not data:
+        return None
+    with stage("decode"):
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+async def run_blocking(request, func, *args):
+    """Run decoding, search or store calls on the inference executor instead of the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(request.app.state.executor, func, *args)
+
+async def read_uploads(request):
+    """Return the raw bytes of every uploaded image (multipart files or the raw body)"""
+    content_type = request.headers.get('content-type', '')
+    if content_type.startswith('multipart/form-data'):
+        form = await request.form()
+        return [await item.read() for _, item in form.multi_items() if hasattr(item, 'read')]
+    
+    body = await request.body()
+    return [body] if body else []
+
+def _validate_identity(identity):
+    if not identity or not identity.replace(" ", "").replace("_", "").isalnum():
+        raise HTTPException(status_code=400, detail="Identity can only contain letters, numbers, spaces, and underscores")
+    return identity.replace(" ", "_")
+
+async def _embed_uploads(request, limit=None):
+    uploads = await read_uploads(request)
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No image uploaded")
+    if limit is not None and len(uploads) > limit:
+        raise HTTPException(status_code=400, detail=f"Expected at most {limit} image(s)")
+    
+    state = request.app.state.gallery
+    
+    def _work():
+        images = [decode_image(data) for data in uploads]
+        if any(img is None for img in images):
+            return None
+        return embed_images(state.app, images)
+    
+    embeddings = await run_blocking(request, _work)
+    if embeddings is None:
+        raise HTTPException(status_code=400, detail="Could not decode uploaded image")
+    return uploads, embeddings
+
+@asynccontextmanager
+async def lifespan(app):
+    # Loaded once per server process, not per request
+    app.state.gallery = GalleryState.load(app.state.model_path)
+    app.state.executor = ThreadPoolExecutor(max_workers=api_config.inference_threads,
+                                            thread_name_prefix="inference")
+    # Concurrent requests share recognition batches
+    if app.state.gallery.app is not None:
+        get_batcher(app.state.gallery.app)
+    try:
+        yield
+    finally:
+        app.state.executor.shutdown(wait=False)
+        if app.state.gallery.app is not None:
+            close_batcher(app.state.gallery.app)
+
+def create_app(model_path=None):
+    """Build the FastAPI application (used as a uvicorn factory)"""
+    app = FastAPI(title="Face Recognition API", lifespan=lifespan)
+    app.state.model_path = model_path
+    app.add_middleware(LimitMiddleware, max_body_bytes=api_config.max_upload_bytes,
+                       max_concurrent=api_config.max_concurrent_requests)
+    app.add_middleware(TimingMiddleware)
+    
+    @app.get("/health", response_model=HealthResponse)
+    async def health(request: Request):
+        state = request.app.state.gallery
+        gallery_size, identities = await run_blocking(request, state.counts)
+        return HealthResponse(status="ok", gallery_size=gallery_size, identities=identities,
+                              threshold=state.threshold)
+    
+    @app.get("/metrics")
+    async def metrics():
+        # Per worker process; with several uvicorn workers each one is scraped separately
+        return Response(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+    
+    @app.post("/verify", response_model=VerifyResponse)
+    async def verify(request: Request):
+        state = request.app.state.gallery
+        if not state.ready:
+            raise HTTPException(status_code=503, detail="No face database loaded")
+        
+        _, (embedding,) = await _embed_uploads(request, limit=1)
+        timestamp = datetime.now().isoformat()
+        if embedding is None:
+            return VerifyResponse(identity=None, confidence=0.0, success=False, face_found=False, timestamp=timestamp)
+        
+        label, score = await run_blocking(request, state.verify, embedding)
+        return VerifyResponse(identity=str(label) if label is not None else None, confidence=score,
+                              success=label is not None, face_found=True, timestamp=timestamp)
+    
+    @app.post("/verify/faces", response_model=FacesResponse)
+    async def verify_all_faces(request: Request):
+        state = request.app.state.gallery
+        if not state.ready:
+            raise HTTPException(status_code=503, detail="No face database loaded")
+        
+        uploads = await read_uploads(request)
+        if len(uploads) != 1:
+            raise HTTPException(status_code=400, detail="Expected exactly one image")
+        
+        def _work():
+            img = decode_image(uploads[0])
+            return None if img is None else process_frame_faces(state.app, img)
+        
+        faces = await run_blocking(request, _work)
+        if faces is None:
+            raise HTTPException(status_code=400, detail="Could not decode uploaded image")
+        timestamp = datetime.now().isoformat()
+        if not faces:
+            return FacesResponse(faces=[], timestamp=timestamp)
+        
+        top_labels, scores, accepted = await run_blocking(request, state.verify_many,
+                                                          [face.embedding for face in faces])
+        return FacesResponse(faces=[FaceResult(identity=str(top_labels[i]) if accepted[i] else None,
+                                               confidence=float(scores[i]), success=bool(accepted[i]),
+                                               box=list(face.box), det_score=face.det_score)
+                                    for i, face in enumerate(faces)], timestamp=timestamp)
+    
+    @app.post("/matches", response_model=TopMatchesResponse)
+    async def matches(request: Request, k: int = Query(api_config.top_k, ge=1, le=100)):
+        state = request.app.state.gallery
+        if not state.ready:
+            raise HTTPException(status_code=503, detail="No face database loaded")
+        
+        _, (embedding,) = await _embed_uploads(request, limit=1)
+        if embedding is None:
+            return TopMatchesResponse(face_found=False, matches=[])
+        
+        results = await run_blocking(request, state.top_matches, embedding, k)
+        return TopMatchesResponse(face_found=True, matches=[Match(label=str(label), score=score)
+                                                            for label, score in results])
+    
+    @app.post("/identities/{identity}", response_model=EnrollResponse)
+    async def enroll(request: Request, identity: str, replace: bool = Query(True)):
+        identity = _validate_identity(identity)
+        uploads, embeddings = await _embed_uploads(request)
+        usable = [embedding for embedding in embeddings if embedding is not None]
+        if not usable:
+            raise HTTPException(status_code=422, detail="No face found in the uploaded images")
+        
+        state = request.app.state.gallery
+        gallery_size = await run_blocking(request, state.enroll, identity, np.stack(usable), replace)
+        return EnrollResponse(identity=identity, images_received=len(uploads),
+                              embeddings_added=len(usable), gallery_size=gallery_size)
+    
+    @app.delete("/identities/{identity}", response_model=DeleteResponse)
+    async def delete(request: Request, identity: str):
+        identity = _validate_identity(identity)
+        state = request.app.state.gallery
+        removed, gallery_size = await run_blocking(request, state.delete, identity)
+        if not removed:
+            raise HTTPException(status_code=404, detail=f"Unknown identity: {identity}")
+        return DeleteResponse(identity=identity, removed=True, gallery_size=gallery_size)
+    
+    return app
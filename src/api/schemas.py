@@ -0,0 +1,48 @@
+"""API request and response schemas"""
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class VerifyResponse(BaseModel):
+    """Mirrors VerificationResult in src/models/data_models.py"""
+    identity: Optional[str] = Field(None, description="Matched identity, null when rejected")
+    confidence: float = Field(..., description="Top-1 cosine similarity")
+    success: bool
+    face_found: bool
+    timestamp: str
+
+class FaceResult(BaseModel):
+    """Mirrors FaceVerificationResult in src/models/data_models.py"""
+    identity: Optional[str] = None
+    confidence: float
+    success: bool
+    box: List[int] = Field(..., description="x1, y1, x2, y2 in image pixels")
+    det_score: float
+
+class FacesResponse(BaseModel):
+    faces: List[FaceResult]
+    timestamp: str
+
+class Match(BaseModel):
+    label: str
+    score: float
+
+class TopMatchesResponse(BaseModel):
+    face_found: bool
+    matches: List[Match]
+
+class EnrollResponse(BaseModel):
+    identity: str
+    images_received: int
+    embeddings_added: int
+    gallery_size: int
+
+class DeleteResponse(BaseModel):
+    identity: str
+    removed: bool
+    gallery_size: int
+
+class HealthResponse(BaseModel):
+    status: str
+    gallery_size: int
+    identities: int
+    threshold: float
@@ -0,0 +1,136 @@
+"""Dynamic micro-batching for embedding inference"""
+import time
+import queue
+import threading
+import weakref
+from concurrent.futures import Future
+import numpy as np
+from config.config import model_config
+from src.core.embedding_service import embed_aligned_faces
+
+# Queued by close(); the worker thread exits when it reaches it
+_STOP = object()
+
+class EmbeddingBatcher:
+    """Collect aligned chips from concurrent callers and run them as one recognition batch
+
+    A batch runs when max_batch_size chips are waiting or max_wait_ms has passed since
+    the first chip of the batch arrived, whichever comes first. The app is held weakly:
+    once it is garbage collected the batcher closes itself and its thread exits.
+    """
+    
+    def __init__(self, app, max_batch_size=None, max_wait_ms=None):
+        self._app = weakref.ref(app)
+        self.closed = False
+        self.max_batch_size = max(1, max_batch_size or model_config.embed_max_batch)
+        self.max_wait = (model_config.embed_max_wait_ms if max_wait_ms is None else max_wait_ms) / 1000.0
+        self.pending = queue.Queue()
+        self.batches_run = 0
+        self.chips_embedded = 0
+        self.worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self.worker.start()
+        weakref.finalize(app, self.close)
+    
+    @property
+    def app(self):
+        return self._app()
+    
+    def submit(self, chip):
+        """Queue one aligned chip; returns a Future resolving to its normalized embedding"""
+        if self.closed:
+            raise RuntimeError("Embedding batcher is closed")
+        future = Future()
+        self.pending.put((chip, future))
+        return future
+    
+    def close(self):
+        """Stop the worker thread after the chips already queued are embedded"""
+        if not self.closed:
+            self.closed = True
+            self.pending.put(_STOP)
+    
+    def embed(self, chip):
+        return self.submit(chip).result()
+    
+    def embed_many(self, chips):
+        """Embed several chips, possibly sharing batches with other callers"""
+        futures = [self.submit(chip) for chip in chips]
+        if not futures:
+            return np.empty((0, 0), dtype='float32')
+        return np.stack([future.result() for future in futures])
+    
+    def _collect(self):
+        """Next batch of (chip, future); None once close() was called and the queue is drained"""
+        item = self.pending.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Run what was collected, then stop on the next call
+                self.pending.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            futures = [future for _, future in batch]
+            try:
+                app = self.app
+                if app is None:
+                    raise RuntimeError("InsightFace app was released")
+                embeddings = embed_aligned_faces(app, [chip for chip, _ in batch])
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            
+            self.batches_run += 1
+            self.chips_embedded += len(batch)
+            for future, embedding in zip(futures, embeddings):
+                future.set_result(embedding)
+    
+    def stats(self):
+        return {
+            'batches_run': self.batches_run,
+            'chips_embedded': self.chips_embedded,
+            'mean_batch_size': self.chips_embedded / self.batches_run if self.batches_run else 0.0,
+        }
+
+_batchers = weakref.WeakKeyDictionary()
+_batchers_lock = threading.Lock()
+
+def get_batcher(app):
+    """Return the shared batcher for an InsightFace app, creating it on first use
+
+    Servers with concurrent callers (the HTTP API, the stream manager) call this at
+    startup to opt their app into batching; see embed_chips.
+    """
+    with _batchers_lock:
+        batcher = _batchers.get(app)
+        if batcher is None:
+            batcher = EmbeddingBatcher(app)
+            _batchers[app] = batcher
+        return batcher
+
+def active_batcher(app):
+    """The batcher already running for app, or None"""
+    with _batchers_lock:
+        return _batchers.get(app)
+
+def close_batcher(app):
+    """Stop and forget the batcher for app, if any; later calls embed directly again"""
+    with _batchers_lock:
+        batcher = _batchers.pop(app, None)
+    if batcher is not None:
+        batcher.close()
@@ -1,21 +1,130 @@
 """Embedding extraction"""
+import os
+import time
+import numpy as np
+import onnxruntime
 from insightface.app import FaceAnalysis
+from insightface.utils import face_align
+from config.config import model_config, runtime_config
+from src.utils.metrics import stage
+from src.utils.logger import get_logger
 
-def init_insightface():
-    """Initialize InsightFace with optimized settings for speed"""
+log = get_logger(__name__)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    'sequential': onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+
+def build_session_options(config=None):
+    """Translate RuntimeConfig into onnxruntime.SessionOptions"""
+    config = config or runtime_config
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = config.intra_op_threads
+    options.inter_op_num_threads = config.inter_op_threads
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[config.graph_optimization]
+    options.execution_mode = EXECUTION_MODES[config.execution_mode]
+    options.enable_cpu_mem_arena = config.enable_cpu_mem_arena
+    options.enable_mem_pattern = config.enable_mem_pattern
+    return options
+
+def _apply_session_options(app, options, providers):
+    # FaceAnalysis only forwards providers to its sessions, so rebuild them with our options
+    for model in app.models.values():
+        model.session = onnxruntime.InferenceSession(model.model_file, sess_options=options,
+                                                     providers=list(providers))
+
+def warm_up(app, runs=None):
+    """Run dummy inferences so lazy allocations happen before the first real request"""
+    runs = runtime_config.warmup_runs if runs is None else runs
+    if runs <= 0:
+        return 0.0
+    
+    start = time.perf_counter()
+    chip = np.zeros((112, 112, 3), dtype=np.uint8)
+    frame = np.zeros((app.det_size[1], app.det_size[0], 3), dtype=np.uint8)
+    for _ in range(runs):
+        get_recognition_model(app).get_feat([chip])
+        app.det_model.detect(frame, max_num=0, metric='default')
+    return (time.perf_counter() - start) * 1000
+
+def model_pack_name(precision=None):
+    """InsightFace model pack for a precision; INT8 packs live next to the FP32 one"""
+    precision = precision or model_config.precision
+    if precision not in ('fp32', 'int8'):
+        raise ValueError(f"Unknown precision: {precision}")
+    return model_config.model_name if precision == 'fp32' else f"{model_config.model_name}_int8"
+
+def model_pack_dir(precision=None, root='~/.insightface'):
+    return os.path.join(os.path.expanduser(root), 'models', model_pack_name(precision))
+
+def init_insightface(precision=None):
+    """Initialize InsightFace with ONNX Runtime settings from RuntimeConfig"""
     try:
-        print("📦 Loading InsightFace models (optimized for speed)...")
+        pack = model_pack_name(precision)
+        log.info("Loading InsightFace models '%s' (optimized for speed)...", pack)
+        
+        if pack != model_config.model_name and not os.path.isdir(model_pack_dir(precision)):
+            raise FileNotFoundError(f"Quantized model pack not found at {model_pack_dir(precision)}; "
+                                    f"run scripts/quantize_models.py first")
         
+        providers = list(runtime_config.providers)
         app = FaceAnalysis(
+            name=pack,
             allowed_modules=['detection', 'recognition'],
-            providers=['CPUExecutionProvider']
+            providers=providers
         )
+        _apply_session_options(app, build_session_options(), providers)
+        
+        ctx_id = -1 if providers == ['CPUExecutionProvider'] else 0
+        app.prepare(ctx_id=ctx_id, det_size=tuple(model_config.detection_size))
+        warmup_ms = warm_up(app)
         
-        app.prepare(ctx_id=-1, det_size=(160, 160))
-        print("✅ InsightFace ready!")
+        app.session_settings = {
+            'model_pack': pack,
+            'providers': providers,
+            'intra_op_threads': runtime_config.intra_op_threads,
+            'inter_op_threads': runtime_config.inter_op_threads,
+            'graph_optimization': runtime_config.graph_optimization,
+            'execution_mode': runtime_config.execution_mode,
+            'cpu_mem_arena': runtime_config.enable_cpu_mem_arena,
+            'mem_pattern': runtime_config.enable_mem_pattern,
+            'det_size': tuple(model_config.detection_size),
+            'warmup_runs': runtime_config.warmup_runs,
+            'warmup_ms': round(warmup_ms, 1),
+        }
+        log.info("ONNX Runtime settings: %s", app.session_settings)
+        log.info("InsightFace ready!")
         return app
         
     except Exception as e:
-        print(f"❌ InsightFace initialization failed: {e}")
-        print("💡 Try installing a lighter face recognition model")
-        raise
\ No newline at end of file
+        log.error("InsightFace initialization failed: %s", e)
+        log.info("Try installing a lighter face recognition model")
+        raise
+
+def get_recognition_model(app):
+    """Return the ArcFace recognition model loaded by FaceAnalysis"""
+    return app.models['recognition']
+
+def align_face(img_bgr, landmarks, image_size=112):
+    """Warp a face to the ArcFace template using its 5-point landmarks"""
+    return face_align.norm_crop(img_bgr, landmark=landmarks, image_size=image_size)
+
+def embed_aligned_faces(app, chips):
+    """Run the recognition model on aligned BGR chips and return L2-normalized float32 embeddings"""
+    if len(chips) == 0:
+        return np.empty((0, 0), dtype='float32')
+    
+    with stage("embed"):
+        feats = get_recognition_model(app).get_feat(list(chips)).astype('float32')
+    with stage("normalize"):
+        norms = np.linalg.norm(feats, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return feats / norms
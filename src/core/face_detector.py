@@ -1,35 +1,88 @@
 """Face detection"""
 import numpy as np
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# RetinaFace landmark keys in the order InsightFace's ArcFace template expects
+LANDMARK_KEYS = ('right_eye', 'left_eye', 'nose', 'mouth_right', 'mouth_left')
+
+def _clamped_box(image_shape, face_data):
+    """Return the RetinaFace box clamped to the image, or None when it is missing or empty"""
+    fa = face_data.get('facial_area') or face_data.get('facialArea')
+    if fa is None:
+        return None
+    
+    h, w = image_shape[:2]
+    x1, y1, x2, y2 = map(int, fa)
+    
+    # Ensure coordinates are within image bounds
+    x1 = max(0, min(x1, w-1))
+    x2 = max(0, min(x2, w))
+    y1 = max(0, min(y1, h-1))
+    y2 = max(0, min(y2, h))
+    
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return (x1, y1, x2, y2)
+
+def select_largest_face(image_shape, faces):
+    """Pick the largest RetinaFace detection, returning (box, face_data) clamped to the image"""
+    best_face = None
+    best_data = None
+    max_area = 0
+    
+    for face_key, face_data in faces.items():
+        box = _clamped_box(image_shape, face_data)
+        if box is None:
+            continue
+        
+        x1, y1, x2, y2 = box
+        area = (x2 - x1) * (y2 - y1)
+        if area > max_area:
+            max_area = area
+            best_face = box
+            best_data = face_data
+    
+    if best_face is None or max_area <= 0:
+        return None, None
+    return best_face, best_data
+
+def select_all_faces(image_shape, faces, min_size=0):
+    """Return (box, face_data) for every RetinaFace detection, largest first
+
+    Faces whose shorter box side is below min_size pixels are dropped.
+    """
+    selected = []
+    for face_key, face_data in faces.items():
+        box = _clamped_box(image_shape, face_data)
+        if box is None:
+            continue
+        
+        x1, y1, x2, y2 = box
+        if min(x2 - x1, y2 - y1) < min_size:
+            continue
+        selected.append((box, face_data))
+    
+    selected.sort(key=lambda item: (item[0][2] - item[0][0]) * (item[0][3] - item[0][1]), reverse=True)
+    return selected
+
+def extract_landmarks(face_data):
+    """Return the 5-point landmarks of a RetinaFace detection as a (5, 2) float32 array"""
+    landmarks = face_data.get('landmarks') if face_data else None
+    if not landmarks:
+        return None
+    try:
+        return np.array([landmarks[key] for key in LANDMARK_KEYS], dtype=np.float32)
+    except KeyError:
+        return None
 
 def extract_face_from_retinaface(img_rgb, faces):
     """Extract face exactly like the diagnostic (proven to work)"""
     try:
-        best_face = None
-        max_area = 0
+        best_face, _ = select_largest_face(img_rgb.shape, faces)
         
-        for face_key, face_data in faces.items():
-            fa = face_data.get('facial_area') or face_data.get('facialArea')
-            if fa is None:
-                continue
-            
-            x1, y1, x2, y2 = map(int, fa)
-            
-            # Ensure coordinates are within image bounds
-            h, w = img_rgb.shape[:2]
-            x1 = max(0, min(x1, w-1))
-            x2 = max(0, min(x2, w))
-            y1 = max(0, min(y1, h-1))
-            y2 = max(0, min(y2, h))
-            
-            if x2 <= x1 or y2 <= y1:
-                continue
-            
-            area = (x2 - x1) * (y2 - y1)
-            if area > max_area:
-                max_area = area
-                best_face = (x1, y1, x2, y2)
-        
-        if best_face and max_area > 0:
+        if best_face:
             x1, y1, x2, y2 = best_face
             crop = img_rgb[y1:y2, x1:x2]
             return crop if crop.size > 0 else None
@@ -37,5 +90,5 @@ def extract_face_from_retinaface(img_rgb, faces):
         return None
         
     except Exception as e:
-        print(f"Error extracting face: {e}")
-        return None
\ No newline at end of file
+        log.warning("Error extracting face: %s", e)
+        return None
@@ -1,83 +1,436 @@
 """Image processing"""
 import os
+import time
+import threading
+from collections import deque
 import cv2
 import numpy as np
 from retinaface import RetinaFace
-from src.core.face_detector import extract_face_from_retinaface
+from config.config import model_config, runtime_config
+from src.core.face_detector import extract_face_from_retinaface, select_largest_face, select_all_faces, extract_landmarks
+from src.core.embedding_service import align_face, embed_aligned_faces
+from src.core.batch_scheduler import get_batcher, active_batcher
+from src.models.data_models import DetectedFace
+from src.utils.metrics import stage, inc
+from src.utils.logger import get_logger
 
-def process_single_image(app, image_path, class_name):
-    """Process single image using the proven diagnostic method"""
+log = get_logger(__name__)
+
+PIPELINE_UNIFIED = "unified"
+PIPELINE_LEGACY = "legacy"
+
+def _resolve_mode(mode):
+    mode = mode or model_config.pipeline_mode
+    if mode not in (PIPELINE_UNIFIED, PIPELINE_LEGACY):
+        raise ValueError(f"Unknown pipeline mode: {mode}")
+    return mode
+
+def pipeline_version(mode=None):
+    """Identify the detector/model combination that produced an embedding"""
+    model = model_config.model_name if model_config.precision == 'fp32' else f"{model_config.model_name}-{model_config.precision}"
+    return f"retinaface+{model}/{_resolve_mode(mode)}"
+
+def warm_up_detector(runs=None, frame_shape=(480, 640, 3)):
+    """Build the RetinaFace model and run it on blank frames so the first real call is not slow"""
+    runs = runtime_config.warmup_runs if runs is None else runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        RetinaFace.detect_faces(np.zeros(frame_shape, dtype=np.uint8))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if runs > 0:
+        log.info("RetinaFace warmed up in %.0f ms", elapsed_ms)
+    return elapsed_ms
+
+def embed_chips(app, chips):
+    """Embed aligned chips, through the app's micro-batcher when one is running
+
+    Single callers (CLI, ingestion) embed directly rather than waiting for batch
+    partners; servers opt in with get_batcher(app), or embed_batching forces it.
+    """
+    batcher = get_batcher(app) if model_config.embed_batching else active_batcher(app)
+    if batcher is not None:
+        return batcher.embed_many(chips)
+    return embed_aligned_faces(app, chips)
+
+class DetectorStats:
+    """Recent detector calls: latency, chosen scale and input size"""
+    
+    def __init__(self, window=200):
+        self.calls = deque(maxlen=window)
+        self.total_calls = 0
+        self.lock = threading.Lock()
+    
+    def record(self, latency_ms, scale, input_shape):
+        with self.lock:
+            self.calls.append((latency_ms, scale, input_shape[1], input_shape[0]))
+            self.total_calls += 1
+    
+    def summary(self):
+        """Mean/p95 latency (ms), mean scale and the last call's scale and detector input size"""
+        with self.lock:
+            calls = list(self.calls)
+            total = self.total_calls
+        if not calls:
+            return {'calls': total}
+        latencies = sorted(call[0] for call in calls)
+        return {
+            'calls': total,
+            'latency_ms': sum(latencies) / len(latencies),
+            'latency_p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            'mean_scale': sum(call[1] for call in calls) / len(calls),
+            'last_scale': calls[-1][1],
+            'last_input': (calls[-1][2], calls[-1][3]),
+        }
+
+detector_stats = DetectorStats()
+
+def detection_scale(image_shape, min_face_size=None):
+    """Downscale factor (<= 1) for the detector input
+    
+    The smallest face we care about (min_face_size px in the full frame) is shrunk to
+    ModelConfig.detector_min_face px, but the short side never drops below
+    detection_min_side. min_face_size <= 0 keeps the full resolution.
+    """
+    min_face_size = model_config.min_face_size if min_face_size is None else min_face_size
+    if min_face_size <= 0:
+        return 1.0
+    scale = model_config.detector_min_face / min_face_size
+    short_side = min(image_shape[:2])
+    if short_side > 0:
+        scale = max(scale, model_config.detection_min_side / short_side)
+    return min(1.0, scale)
+
+def _rescale_faces(faces, scale_x, scale_y):
+    """Map RetinaFace boxes and landmarks from the downscaled copy back to full-resolution pixels"""
+    for face_data in faces.values():
+        x1, y1, x2, y2 = face_data['facial_area']
+        face_data['facial_area'] = [int(round(x1 * scale_x)), int(round(y1 * scale_y)),
+                                    int(round(x2 * scale_x)), int(round(y2 * scale_y))]
+        landmarks = face_data.get('landmarks') or {}
+        for name, point in landmarks.items():
+            landmarks[name] = [float(point[0]) * scale_x, float(point[1]) * scale_y]
+    return faces
+
+def run_detector(img, min_face_size=None):
+    """RetinaFace.detect_faces timed as the "detect" stage; returns a dict of faces ({} when none)
+    
+    When a minimum face size is configured the detector sees a downscaled copy (with
+    RetinaFace's own upscaling turned off), and boxes and landmarks are mapped back so
+    crops and alignment still use the full-resolution image.
+    """
+    height, width = img.shape[:2]
+    scale = detection_scale(img.shape, min_face_size)
+    start = time.perf_counter()
+    with stage("detect"):
+        if scale < 1.0:
+            small = cv2.resize(img, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+            faces = RetinaFace.detect_faces(small, allow_upscaling=False)
+        else:
+            small = img
+            faces = RetinaFace.detect_faces(img)
+    latency_ms = (time.perf_counter() - start) * 1000
+    
+    if not isinstance(faces, dict):
+        faces = {}
+    elif small is not img:
+        faces = _rescale_faces(faces, width / small.shape[1], height / small.shape[0])
+    
+    detector_stats.record(latency_ms, scale, small.shape)
+    log.debug("Detected %d faces in %.1f ms at scale %.2f", len(faces), latency_ms, scale,
+              extra={'sampled': True, 'latency_ms': round(latency_ms, 2), 'scale': round(scale, 3),
+                     'detector_input': [small.shape[1], small.shape[0]]})
+    inc("face_images_processed_total")
+    inc("face_faces_found_total", len(faces))
+    return faces
+
+def detect_largest_face(img_bgr):
+    """Run RetinaFace once on a BGR image; returns (box, det_score, landmarks) of the largest face or None"""
+    faces = run_detector(img_bgr)
+    if len(faces) == 0:
+        return None
+    
+    box, face_data = select_largest_face(img_bgr.shape, faces)
+    landmarks = extract_landmarks(face_data)
+    if landmarks is None:
+        return None
+    
+    return box, float(face_data.get('score', 1.0)), landmarks
+
+def detect_all_faces(img_bgr, min_size=0):
+    """Run RetinaFace once and return (box, det_score, landmarks) for every face, largest first"""
+    faces = run_detector(img_bgr, max(min_size, model_config.min_face_size))
+    if len(faces) == 0:
+        return []
+    
+    detections = []
+    for box, face_data in select_all_faces(img_bgr.shape, faces, min_size):
+        landmarks = extract_landmarks(face_data)
+        if landmarks is not None:
+            detections.append((box, float(face_data.get('score', 1.0)), landmarks))
+    return detections
+
+def detect_and_align(img_bgr):
+    """Run RetinaFace once on a BGR image and return the aligned 112x112 chip of the largest face"""
+    detection = detect_largest_face(img_bgr)
+    if detection is None:
+        return None
+    
+    with stage("crop"):
+        return align_face(img_bgr, detection[2])
+
+def embed_face(app, img_bgr, landmarks):
+    """Align one detected face and return its normalized embedding"""
+    with stage("crop"):
+        chip = align_face(img_bgr, landmarks)
+    return embed_chips(app, [chip])[0]
+
+def _record_error(errors, item):
+    if errors is not None:
+        errors.append(item)
+
+def embed_images(app, images, mode=None, errors=None):
+    """Embed the largest face of each BGR image; returns a list aligned with images (None on failure)
+
+    In unified mode all aligned chips go through the recognition model as one batch.
+    When errors is a list, the slots that are None because of a missing image or an
+    exception (rather than because no face was found) are appended to it.
+    """
+    if errors is None:
+        errors = []
+    if _resolve_mode(mode) == PIPELINE_LEGACY:
+        results = []
+        for slot, img in enumerate(images):
+            failed = []
+            results.append(process_frame_embedding_legacy(app, img, failed)[0] if img is not None else None)
+            if img is None or failed:
+                errors.append(slot)
+        return results
+    
+    chips = []
+    chip_slots = []
+    for slot, img in enumerate(images):
+        if img is None:
+            errors.append(slot)
+            continue
+        try:
+            chip = detect_and_align(img)
+        except Exception as e:
+            log.warning("RetinaFace error: %s", e)
+            errors.append(slot)
+            chip = None
+        if chip is not None:
+            chip_slots.append(slot)
+            chips.append(chip)
+    
+    results = [None] * len(images)
+    if chips:
+        try:
+            for slot, embedding in zip(chip_slots, embed_chips(app, chips)):
+                results[slot] = embedding
+        except Exception as e:
+            log.error("InsightFace batch error: %s", e)
+            errors.extend(chip_slots)
+    return results
+
+def process_single_image(app, image_path, class_name, mode=None, errors=None):
+    """Process single image and return its normalized embedding
+
+    None means no face or a failure; failures (not "no face") append image_path to errors.
+    """
+    if _resolve_mode(mode) == PIPELINE_LEGACY:
+        return process_single_image_legacy(app, image_path, class_name, errors)
+    
+    try:
+        with stage("decode"):
+            img = cv2.imread(image_path)
+        if img is None:
+            log.warning("Could not load: %s", os.path.basename(image_path))
+            _record_error(errors, image_path)
+            return None
+        
+        try:
+            chip = detect_and_align(img)
+            if chip is None:
+                log.info("No faces detected: %s", os.path.basename(image_path))
+                return None
+        except Exception as e:
+            log.warning("RetinaFace error: %s - %s", os.path.basename(image_path), e)
+            _record_error(errors, image_path)
+            return None
+        
+        try:
+            embedding = embed_chips(app, [chip])[0]
+            log.debug("Embedded: %s", os.path.basename(image_path), extra={'sampled': True})
+            return embedding
+        except Exception as e:
+            log.error("InsightFace error: %s - %s", os.path.basename(image_path), e)
+            _record_error(errors, image_path)
+            return None
+    
+    except Exception as e:
+        log.error("General error: %s - %s", os.path.basename(image_path), e)
+        _record_error(errors, image_path)
+        return None
+
+def process_frame_embedding(app, frame, mode=None):
+    """Process a camera frame and return (embedding, face_crop)
+
+    In unified mode face_crop is the aligned BGR chip fed to the recognition model.
+    """
+    if _resolve_mode(mode) == PIPELINE_LEGACY:
+        return process_frame_embedding_legacy(app, frame)
+    
     try:
-        img = cv2.imread(image_path)
+        chip = detect_and_align(frame)
+        if chip is None:
+            return None, None
+        
+        embedding = embed_chips(app, [chip])[0]
+        return embedding, chip
+    
+    except Exception as e:
+        log.error("Error processing frame: %s", e)
+        return None, None
+
+def process_frame_faces(app, frame, min_size=0):
+    """Detect, align and embed every face in a frame with one recognition batch
+
+    Returns a list of DetectedFace, largest face first; empty when no face is found.
+    """
+    try:
+        detections = detect_all_faces(frame, min_size)
+        if not detections:
+            return []
+        
+        with stage("crop"):
+            chips = [align_face(frame, landmarks) for _, _, landmarks in detections]
+        embeddings = embed_chips(app, chips)
+        return [DetectedFace(box=box, det_score=det_score, embedding=embedding, chip=chip)
+                for (box, det_score, _), chip, embedding in zip(detections, chips, embeddings)]
+    
+    except Exception as e:
+        log.error("Error processing frame: %s", e)
+        return []
+
+def process_frames_faces(app, frames, min_size=0):
+    """Detect every face in several frames, then embed all of their chips in one recognition batch
+
+    Returns one list of DetectedFace (without chips) per frame, largest face first.
+    """
+    detections = []
+    for frame in frames:
+        try:
+            detections.append(detect_all_faces(frame, min_size))
+        except Exception as e:
+            log.error("Error processing frame: %s", e)
+            detections.append([])
+    
+    with stage("crop"):
+        chips = [align_face(frame, landmarks) for frame, found in zip(frames, detections) for _, _, landmarks in found]
+    if not chips:
+        return [[] for _ in frames]
+    embeddings = embed_chips(app, chips)
+    
+    results, position = [], 0
+    for found in detections:
+        results.append([DetectedFace(box=box, det_score=det_score, embedding=embeddings[position + i])
+                        for i, (box, det_score, _) in enumerate(found)])
+        position += len(found)
+    return results
+
+def process_single_image_legacy(app, image_path, class_name, errors=None):
+    """Process single image using the proven diagnostic method (RetinaFace crop + InsightFace)"""
+    try:
+        with stage("decode"):
+            img = cv2.imread(image_path)
         if img is None:
-            print(f"   ❌ Could not load: {os.path.basename(image_path)}")
+            log.warning("Could not load: %s", os.path.basename(image_path))
+            _record_error(errors, image_path)
             return None
         
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        with stage("color_convert"):
+            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         
         try:
-            faces = RetinaFace.detect_faces(img_rgb)
-            if not isinstance(faces, dict) or len(faces) == 0:
-                print(f"   ❌ No faces detected: {os.path.basename(image_path)}")
+            faces = run_detector(img_rgb)
+            if len(faces) == 0:
+                log.info("No faces detected: %s", os.path.basename(image_path))
                 return None
             
-            face_crop = extract_face_from_retinaface(img_rgb, faces)
+            with stage("crop"):
+                face_crop = extract_face_from_retinaface(img_rgb, faces)
             if face_crop is None:
-                print(f"   ❌ Could not extract face: {os.path.basename(image_path)}")
+                log.info("Could not extract face: %s", os.path.basename(image_path))
                 return None
             
         except Exception as e:
-            print(f"   ❌ RetinaFace error: {os.path.basename(image_path)} - {e}")
+            log.warning("RetinaFace error: %s - %s", os.path.basename(image_path), e)
+            _record_error(errors, image_path)
             return None
         
         try:
-            face_bgr = cv2.cvtColor(face_crop, cv2.COLOR_RGB2BGR)
-            insight_faces = app.get(face_bgr)
+            with stage("color_convert"):
+                face_bgr = cv2.cvtColor(face_crop, cv2.COLOR_RGB2BGR)
+            with stage("embed"):
+                insight_faces = app.get(face_bgr)
             
             if not insight_faces:
-                print(f"   ❌ No embedding: {os.path.basename(image_path)}")
+                log.info("No embedding: %s", os.path.basename(image_path))
                 return None
             
             face = insight_faces[0]
-            embedding = face.embedding.astype('float32')
-            embedding = embedding / np.linalg.norm(embedding)
+            with stage("normalize"):
+                embedding = face.embedding.astype('float32')
+                embedding = embedding / np.linalg.norm(embedding)
             
-            print(f"   ✅ Success: {os.path.basename(image_path)}")
+            log.debug("Embedded: %s", os.path.basename(image_path), extra={'sampled': True})
             return embedding
             
         except Exception as e:
-            print(f"   ❌ InsightFace error: {os.path.basename(image_path)} - {e}")
+            log.error("InsightFace error: %s - %s", os.path.basename(image_path), e)
+            _record_error(errors, image_path)
             return None
             
     except Exception as e:
-        print(f"   ❌ General error: {os.path.basename(image_path)} - {e}")
+        log.error("General error: %s - %s", os.path.basename(image_path), e)
+        _record_error(errors, image_path)
         return None
 
-def process_frame_embedding(app, frame):
-    """Process a camera frame and return embedding"""
+def process_frame_embedding_legacy(app, frame, errors=None):
+    """Process a camera frame with RetinaFace crop + InsightFace and return embedding
+
+    On an exception (rather than "no face") the frame is appended to errors.
+    """
     try:
-        img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with stage("color_convert"):
+            img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         
-        faces = RetinaFace.detect_faces(img_rgb)
-        if not isinstance(faces, dict) or len(faces) == 0:
+        faces = run_detector(img_rgb)
+        if len(faces) == 0:
             return None, None
         
-        face_crop = extract_face_from_retinaface(img_rgb, faces)
+        with stage("crop"):
+            face_crop = extract_face_from_retinaface(img_rgb, faces)
         if face_crop is None:
             return None, None
         
-        face_bgr = cv2.cvtColor(face_crop, cv2.COLOR_RGB2BGR)
-        insight_faces = app.get(face_bgr)
+        with stage("color_convert"):
+            face_bgr = cv2.cvtColor(face_crop, cv2.COLOR_RGB2BGR)
+        with stage("embed"):
+            insight_faces = app.get(face_bgr)
         
         if not insight_faces:
             return None, None
         
         face = insight_faces[0]
-        embedding = face.embedding.astype('float32')
-        embedding = embedding / np.linalg.norm(embedding)
+        with stage("normalize"):
+            embedding = face.embedding.astype('float32')
+            embedding = embedding / np.linalg.norm(embedding)
         
         return embedding, face_crop
         
     except Exception as e:
-        print(f"Error processing frame: {e}")
-        return None, None
\ No newline at end of file
+        log.error("Error processing frame: %s", e)
+        _record_error(errors, frame)
+        return None, None
@@ -1,6 +1,6 @@
 """Data models"""
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional, Tuple
 import numpy as np
 
 @dataclass
@@ -16,4 +16,37 @@ class VerificationResult:
     identity: Optional[str]
     confidence: float
     success: bool
-    timestamp: str
\ No newline at end of file
+    timestamp: str
+    
+@dataclass
+class DetectedFace:
+    """One face found in a frame, with its embedding"""
+    box: Tuple[int, int, int, int]
+    det_score: float
+    embedding: np.ndarray
+    chip: Optional[np.ndarray] = None
+    
+@dataclass
+class FaceVerificationResult(VerificationResult):
+    """Verification result for one of several faces in a frame"""
+    box: Tuple[int, int, int, int] = (0, 0, 0, 0)
+    det_score: float = 0.0
+    
+@dataclass
+class FrameResult:
+    """Verification decision for one camera frame"""
+    frame_id: int
+    captured_at: float
+    completed_at: float
+    identity: Optional[str]
+    confidence: float
+    face_found: bool
+
+@dataclass
+class StreamFrameResult:
+    """Per-face decisions for one frame of a named stream"""
+    stream: str
+    frame_id: int
+    captured_at: float
+    completed_at: float
+    faces: List[FaceVerificationResult]
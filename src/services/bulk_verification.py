@@ -0,0 +1,299 @@
+"""Bulk verification of image folders and manifests with resumable, streaming output"""
+import os
+import csv
+import json
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.config import bulk_verify_config, dataset_config
+from src.core.embedding_service import init_insightface
+from src.core.image_processor import warm_up_detector
+from src.services.ingestion_engine import embed_batch_with_errors, resolve_num_workers, worker_threads, limit_worker_threads
+from src.services.index_manager import top_matches_for_embeddings
+from src.utils.metrics import record_decisions
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+CSV_FIELDS = ['input', 'status', 'identity', 'score', 'matches', 'error']
+
+# InsightFace session owned by each pool worker (set by _init_worker)
+_worker_app = None
+
+def _init_worker(threads):
+    """Load one InsightFace/ONNX session per worker process"""
+    global _worker_app
+    limit_worker_threads(threads)
+    _worker_app = init_insightface()
+    warm_up_detector()
+
+def _worker_embed_batch(items):
+    return embed_batch_with_errors(_worker_app, items)
+
+def iter_directory_inputs(root, formats=None):
+    """Yield (input_key, image_path) for every image under root, in a stable order
+    
+    The key is the path relative to root, so output written on one machine can resume
+    on another.
+    """
+    formats = tuple(formats or dataset_config.supported_formats)
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(formats):
+                path = os.path.join(folder, name)
+                yield os.path.relpath(path, root), path
+
+def iter_manifest_inputs(manifest_path):
+    """Yield (input_key, image_path) from a manifest
+    
+    A manifest is either a CSV file with a "path" column (plus an optional "id" column
+    used as the key) or a plain list with one path per line. Relative paths are resolved
+    against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline='', encoding='utf-8') as f:
+        first = f.readline()
+        f.seek(0)
+        header = [field.strip().lower() for field in next(csv.reader([first]), [])]
+        if 'path' in header:
+            for row in csv.DictReader(f):
+                row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+                if row.get('path'):
+                    yield row.get('id') or row['path'], os.path.join(base, row['path'])
+        else:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line, os.path.join(base, line)
+
+def iter_inputs(source):
+    """Directory -> every image below it; file -> manifest"""
+    if os.path.isdir(source):
+        return iter_directory_inputs(source)
+    if os.path.isfile(source):
+        return iter_manifest_inputs(source)
+    raise FileNotFoundError(f"No such directory or manifest: {source}")
+
+def output_format(output_path, fmt=None):
+    fmt = (fmt or os.path.splitext(output_path)[1].lstrip('.')).lower()
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"Output must be .csv or .jsonl, got: {output_path}")
+    return fmt
+
+def _drop_partial_line(path):
+    """Cut a torn final line left by an interrupted run so appended rows start cleanly"""
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b'\n')
+            if newline >= 0:
+                f.truncate(position - step + newline + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+def completed_inputs(output_path, fmt=None):
+    """Return the input keys already written to output_path (empty when it does not exist)
+    
+    Rows with status "error" do not count, so a rerun retries them and appends a new row.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    fmt = output_format(output_path, fmt)
+    _drop_partial_line(output_path)
+    
+    done = set()
+    with open(output_path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            done.update(row['input'] for row in csv.DictReader(f)
+                        if row.get('input') and row.get('status') != 'error')
+        else:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if record.get('status') != 'error':
+                        done.add(record['input'])
+                except (ValueError, KeyError, AttributeError):
+                    continue
+    return done
+
+class ResultWriter:
+    """Append verification records to CSV or JSONL, flushing after every batch"""
+    
+    def __init__(self, output_path, fmt=None):
+        self.fmt = output_format(output_path, fmt)
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.file = open(output_path, 'a', newline='', encoding='utf-8')
+        self.csv = csv.DictWriter(self.file, fieldnames=CSV_FIELDS) if self.fmt == 'csv' else None
+        if self.csv is not None and is_new:
+            self.csv.writeheader()
+    
+    def write(self, records):
+        for record in records:
+            if self.csv is not None:
+                row = dict(record)
+                row['matches'] = ';'.join(f"{label}:{score:.4f}" for label, score in record['matches'])
+                self.csv.writerow(row)
+            else:
+                self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+    
+    def close(self):
+        self.file.close()
+
+def _records(batch, outcome, index, labels, threshold, top_k):
+    """Search all embedded images of a batch at once and build one record per input
+
+    outcome is (results, failed paths) from embed_batch_with_errors; images that could
+    not be read or embedded become "error" records, so a resumed run retries them.
+    """
+    results, failed = outcome
+    failed = set(failed)
+    embedded = [(key, embedding) for (key, _), (_, _, embedding) in zip(batch, results) if embedding is not None]
+    matches = dict(zip([key for key, _ in embedded],
+                       top_matches_for_embeddings(index, labels, [embedding for _, embedding in embedded], top_k)
+                       if embedded else []))
+    
+    records = []
+    for key, path in batch:
+        top = matches.get(key)
+        if top is None:
+            if not os.path.isfile(path):
+                status, error = 'missing', None
+            elif path in failed:
+                status, error = 'error', "Could not read or embed image (see log)"
+            else:
+                status, error = 'no_face', None
+            records.append({'input': key, 'status': status, 'identity': None, 'score': None, 'matches': [],
+                            'error': error})
+            continue
+        best_label, best_score = top[0] if top else (None, 0.0)
+        accepted = best_label is not None and best_score >= threshold
+        records.append({'input': key, 'status': 'match' if accepted else 'no_match',
+                        'identity': best_label if accepted else None, 'score': round(best_score, 4),
+                        'matches': [(label, round(score, 4)) for label, score in top], 'error': None})
+    return records
+
+def _error_records(batch, error):
+    return [{'input': key, 'status': 'error', 'identity': None, 'score': None, 'matches': [], 'error': str(error)}
+            for key, _ in batch]
+
+def bulk_verify(app, index, labels, source, output_path, threshold, top_k=None, num_workers=None,
+                batch_size=None, resume=True, fmt=None):
+    """Verify every image of a folder or manifest, streaming top-k results to CSV/JSONL
+    
+    Inputs already present in output_path are skipped (resume=False starts a fresh
+    file). Batches are decoded, detected and embedded in-process (num_workers <= 1)
+    or by worker processes, searched against the index with one call per batch, and
+    appended in input order as they finish. Returns a stats dict.
+    
+    If a worker process dies (e.g. killed for memory), the pool is unusable, so the
+    run stops with BrokenProcessPool instead of writing the remaining inputs as errors;
+    rerunning resumes after the last written batch.
+    """
+    top_k = top_k or bulk_verify_config.top_k
+    batch_size = max(1, batch_size or bulk_verify_config.batch_size)
+    num_workers = resolve_num_workers(bulk_verify_config.num_workers if num_workers is None else num_workers)
+    
+    if not resume and os.path.exists(output_path):
+        os.remove(output_path)
+    done = completed_inputs(output_path, fmt) if resume else set()
+    if done:
+        log.info("Resuming bulk verification: %d inputs already in %s", len(done), output_path)
+    
+    stats = {'processed': 0, 'skipped': 0, 'match': 0, 'no_match': 0, 'no_face': 0, 'missing': 0, 'error': 0}
+    pending_inputs = []
+    for key, path in iter_inputs(source):
+        if key in done:
+            stats['skipped'] += 1
+            continue
+        pending_inputs.append((key, path))
+    # Each key is written once even if the manifest repeats it
+    pending_inputs = list(dict(pending_inputs).items())
+    
+    writer = ResultWriter(output_path, fmt)
+    start = time.perf_counter()
+    
+    def write(records):
+        writer.write(records)
+        for record in records:
+            stats[record['status']] += 1
+        stats['processed'] += len(records)
+        matched = sum(1 for record in records if record['status'] == 'match')
+        record_decisions(matched, sum(1 for record in records if record['status'] == 'no_match'))
+    
+    def finish(batch, outcome):
+        try:
+            return _records(batch, outcome, index, labels, threshold, top_k)
+        except Exception as e:
+            log.error("Search failed for a batch of %d inputs: %s", len(batch), e)
+            return _error_records(batch, e)
+    
+    batches = (pending_inputs[i:i + batch_size] for i in range(0, len(pending_inputs), batch_size))
+    try:
+        if num_workers <= 1:
+            for batch in batches:
+                try:
+                    outcome = embed_batch_with_errors(app, [(path, key) for key, path in batch])
+                except Exception as e:
+                    log.error("Embedding failed for a batch of %d inputs: %s", len(batch), e)
+                    write(_error_records(batch, e))
+                    continue
+                write(finish(batch, outcome))
+        else:
+            workers = min(num_workers, max(1, -(-len(pending_inputs) // batch_size)))
+            log.info("Verifying %d inputs with %d worker processes (batch size %d)", len(pending_inputs), workers,
+                     batch_size)
+            context = multiprocessing.get_context("spawn")
+            window = workers * max(1, bulk_verify_config.max_pending_batches)
+            pending = deque()
+            
+            def drain_one():
+                batch, future = pending.popleft()
+                try:
+                    outcome = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    log.error("Worker failed on a batch of %d inputs: %s", len(batch), e)
+                    write(_error_records(batch, e))
+                    return
+                write(finish(batch, outcome))
+            
+            try:
+                with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(worker_threads(workers),)) as pool:
+                    for batch in batches:
+                        pending.append((batch, pool.submit(_worker_embed_batch,
+                                                           [(path, key) for key, path in batch])))
+                        if len(pending) >= window:
+                            drain_one()
+                    while pending:
+                        drain_one()
+            except BrokenProcessPool:
+                log.error("A worker process died after %d inputs were written; rerun to resume from %s",
+                          stats['processed'], output_path, extra=dict(stats))
+                raise
+    finally:
+        writer.close()
+    
+    elapsed = time.perf_counter() - start
+    stats['elapsed_s'] = elapsed
+    stats['images_per_second'] = stats['processed'] / elapsed if elapsed > 0 else 0.0
+    log.info("Bulk verification: %d processed (%d matched), %d skipped in %.1fs", stats['processed'],
+             stats['match'], stats['skipped'], elapsed, extra=dict(stats))
+    return stats
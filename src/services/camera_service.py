@@ -1,22 +1,63 @@
 """Camera operations"""
 import cv2
+from config.config import camera_config
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 def init_camera(camera_id=0):
     """Initialize camera"""
     try:
         camera = cv2.VideoCapture(camera_id)
         if not camera.isOpened():
-            print(f"❌ Could not open camera {camera_id}")
+            log.error("Could not open camera %s", camera_id)
             return None
         
         camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         camera.set(cv2.CAP_PROP_FPS, 30)
         
-        print(f"📷 Camera {camera_id} initialized successfully")
+        log.info("Camera %s initialized successfully", camera_id)
         return camera
     except Exception as e:
-        print(f"❌ Camera initialization failed: {e}")
+        log.error("Camera initialization failed: %s", e)
+        return None
+
+def parse_source(source):
+    """Device index for 0 or "0", otherwise the file path or stream URL unchanged"""
+    if isinstance(source, int):
+        return source
+    text = str(source).strip()
+    return int(text) if text.isdigit() else text
+
+def is_live_source(source):
+    """Cameras and network streams are live; anything else is treated as a video file"""
+    source = parse_source(source)
+    return isinstance(source, int) or "://" in source
+
+def open_source(source):
+    """Open a camera index, video file or stream URL (rtsp://, http://); returns None on failure"""
+    source = parse_source(source)
+    try:
+        if isinstance(source, str) and "://" in source:
+            capture = cv2.VideoCapture(source, cv2.CAP_FFMPEG)
+        else:
+            capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            capture.release()
+            log.error("Could not open source %s", source)
+            return None
+        
+        if isinstance(source, int):
+            capture.set(cv2.CAP_PROP_FRAME_WIDTH, camera_config.frame_width)
+            capture.set(cv2.CAP_PROP_FRAME_HEIGHT, camera_config.frame_height)
+            capture.set(cv2.CAP_PROP_FPS, camera_config.fps)
+        elif "://" in source:
+            # Keep at most one decoded frame buffered so we read the live edge, not a backlog
+            capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+    except Exception as e:
+        log.error("Could not open source %s: %s", source, e)
         return None
 
 def close_camera(camera):
@@ -24,4 +65,4 @@ def close_camera(camera):
     if camera:
         camera.release()
         cv2.destroyAllWindows()
-        print("📷 Camera closed")
\ No newline at end of file
+        log.info("Camera closed")
\ No newline at end of file
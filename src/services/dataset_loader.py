@@ -1,49 +1,97 @@
 """Dataset loading"""
 import os
 import numpy as np
-from src.core.image_processor import process_single_image
+from config.config import dataset_config
+from src.core.image_processor import pipeline_version
+from src.services.ingestion_engine import ingest_images
+from src.services.embedding_cache import EmbeddingCache
+from src.utils.logger import get_logger
 
-def load_dataset(app, dataset_path):
-    """Load dataset using the proven method"""
-    print(f"📂 Loading dataset from: {dataset_path}")
-    
-    embeddings = []
-    labels = []
-    total_images = 0
-    successful_images = 0
-    
-    for person_folder in os.listdir(dataset_path):
+log = get_logger(__name__)
+
+def list_dataset_images(dataset_path):
+    """Return (image_path, label) for every supported image, one folder per person"""
+    items = []
+    for person_folder in sorted(os.listdir(dataset_path)):
         person_path = os.path.join(dataset_path, person_folder)
         
         if not os.path.isdir(person_path):
             continue
         
-        print(f"\n👤 Processing: {person_folder}")
-        
-        for image_file in os.listdir(person_path):
-            if not image_file.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-                continue
-            
-            image_path = os.path.join(person_path, image_file)
-            total_images += 1
-            
-            embedding = process_single_image(app, image_path, person_folder)
-            
-            if embedding is not None:
-                embeddings.append(embedding)
-                labels.append(person_folder)
-                successful_images += 1
+        items.extend(list_person_images(dataset_path, person_folder))
+    
+    return items
+
+def list_person_images(dataset_path, person_name):
+    """Return (image_path, label) for every supported image of one person"""
+    person_path = os.path.join(dataset_path, person_name)
+    return [(os.path.join(person_path, image_file), person_name)
+            for image_file in sorted(os.listdir(person_path))
+            if image_file.lower().endswith(dataset_config.supported_formats)]
+
+def _embed_items(app, items, scope_path, num_workers, batch_size, checkpoint_path, cache_path):
+    """Embed items through the cache and ingestion engine; returns ({image_path: embedding}, summary)"""
+    if num_workers is None:
+        num_workers = dataset_config.num_workers
+    if batch_size is None:
+        batch_size = dataset_config.batch_size
+    if checkpoint_path is None:
+        checkpoint_path = dataset_config.checkpoint_path
+    if cache_path is None:
+        cache_path = dataset_config.cache_path
+    
+    cache = EmbeddingCache(cache_path, pipeline_version()).load()
+    results, missing = cache.lookup(items)
+    cache_hits = len(results)
     
+    computed, stats = ingest_images(app, missing, num_workers, batch_size, checkpoint_path)
+    results.update(computed)
+    
+    # Read or inference errors may be transient: only "no face" (None) outcomes are cached
+    cache.update({path: embedding for path, embedding in computed.items() if path not in stats['failed_paths']})
+    evicted = cache.evict(scope_path, [image_path for image_path, _ in items])
+    cache.save()
+    
+    stats.update({'cache_hits': cache_hits, 'missing': len(missing), 'evicted': evicted})
+    return results, stats
+
+def _collect(items, results):
+    embeddings = [results[image_path] for image_path, _ in items if results.get(image_path) is not None]
+    labels = [label for image_path, label in items if results.get(image_path) is not None]
     embeddings = np.array(embeddings) if embeddings else np.array([])
     labels = np.array(labels) if labels else np.array([])
+    return embeddings, labels
+
+def load_dataset(app, dataset_path, num_workers=None, batch_size=None, checkpoint_path=None, cache_path=None):
+    """Load dataset, embedding only new or changed images in parallel batches with resumable progress"""
+    items = list_dataset_images(dataset_path)
+    total_images = len(items)
+    log.info("Loading dataset from %s: %d images in %d person folders", dataset_path, total_images,
+             len(set(label for _, label in items)))
     
-    print(f"\n{'='*60}")
-    print(f"📊 DATASET LOADING SUMMARY:")
-    print(f"Total images processed: {total_images}")
-    print(f"Successful embeddings: {successful_images}")
-    print(f"Failed images: {total_images - successful_images}")
-    print(f"Success rate: {successful_images/total_images*100:.1f}%" if total_images > 0 else "0%")
-    print(f"Classes: {list(set(labels))}")
-    print(f"{'='*60}")
+    results, stats = _embed_items(app, items, dataset_path, num_workers, batch_size, checkpoint_path, cache_path)
+    embeddings, labels = _collect(items, results)
+    successful_images = len(embeddings)
+    
+    log.info("Dataset loaded: %d/%d images embedded (%.1f%%), %d classes, %.1f images/sec",
+             successful_images, total_images, successful_images / total_images * 100 if total_images > 0 else 0.0,
+             len(set(labels)), stats['images_per_second'],
+             extra={'total_images': total_images, 'embedded': successful_images,
+                    'failed': total_images - successful_images, 'cache_hits': stats['cache_hits'],
+                    're_embedded': stats['missing'], 'evicted': stats['evicted'], 'processed': stats['processed'],
+                    'resumed': stats['resumed'], 'images_per_second': round(stats['images_per_second'], 1),
+                    'classes': sorted(set(labels))})
+    
+    return embeddings, labels, len(embeddings) > 0
+
+def load_person_images(app, dataset_path, person_name, num_workers=None, batch_size=None,
+                       checkpoint_path=None, cache_path=None):
+    """Embed only one person's folder; returns (embeddings, success)"""
+    items = list_person_images(dataset_path, person_name)
+    results, stats = _embed_items(app, items, os.path.join(dataset_path, person_name),
+                                  num_workers, batch_size, checkpoint_path, cache_path)
+    embeddings, _ = _collect(items, results)
     
-    return embeddings, labels, len(embeddings) > 0
\ No newline at end of file
+    log.info("%d/%d images embedded for '%s' (%d from cache)", len(embeddings), len(items), person_name,
+             stats['cache_hits'])
+    return embeddings, len(embeddings) > 0
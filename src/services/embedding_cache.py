@@ -0,0 +1,104 @@
+"""Content-addressed embedding cache"""
+import os
+import pickle
+import hashlib
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+def hash_file(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class EmbeddingCache:
+    """Persistent per-image embeddings keyed by content hash plus pipeline version
+
+    entries maps "<pipeline version>:<sha256>" to an embedding (None when no face was found).
+    paths maps each absolute image path to (size, mtime_ns, key) so unchanged files skip re-hashing.
+    """
+    
+    def __init__(self, path, version):
+        self.path = os.path.abspath(path) if path else None
+        self.version = version
+        self.entries = {}
+        self.paths = {}
+    
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+            self.entries = data.get('entries', {})
+            self.paths = data.get('paths', {})
+        except Exception as e:
+            log.warning("Ignoring unreadable embedding cache %s: %s", self.path, e)
+            self.entries = {}
+            self.paths = {}
+        return self
+    
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'entries': self.entries, 'paths': self.paths}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+    
+    def key_for(self, image_path):
+        """Return the cache key for a file, re-hashing only when its size or mtime changed"""
+        image_path = os.path.abspath(image_path)
+        stat = os.stat(image_path)
+        known = self.paths.get(image_path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns and known[2].startswith(self.version + ':'):
+            return known[2]
+        
+        key = f"{self.version}:{hash_file(image_path)}"
+        self.paths[image_path] = (stat.st_size, stat.st_mtime_ns, key)
+        return key
+    
+    def lookup(self, items):
+        """Split (image_path, label) items into ({image_path: embedding}, missing items)"""
+        hits = {}
+        missing = []
+        for image_path, label in items:
+            if not self.path:
+                missing.append((image_path, label))
+                continue
+            key = self.key_for(image_path)
+            if key in self.entries:
+                hits[image_path] = self.entries[key]
+            else:
+                missing.append((image_path, label))
+        return hits, missing
+    
+    def update(self, results):
+        """Store freshly computed {image_path: embedding} results"""
+        if not self.path:
+            return
+        for image_path, embedding in results.items():
+            try:
+                self.entries[self.key_for(image_path)] = embedding
+            except OSError:
+                continue
+    
+    def evict(self, dataset_path, current_paths):
+        """Drop paths under dataset_path that are gone, then any entry no path refers to"""
+        dataset_path = os.path.join(os.path.abspath(dataset_path), '')
+        current_paths = {os.path.abspath(p) for p in current_paths}
+        
+        for image_path in list(self.paths):
+            stale = image_path.startswith(dataset_path) and image_path not in current_paths
+            if stale or not os.path.exists(image_path):
+                del self.paths[image_path]
+        
+        live_keys = {record[2] for record in self.paths.values()}
+        evicted = [key for key in self.entries if key not in live_keys]
+        for key in evicted:
+            del self.entries[key]
+        return len(evicted)
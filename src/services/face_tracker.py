@@ -0,0 +1,185 @@
+"""Face tracking with embedding reuse across frames"""
+import threading
+from collections import deque
+from config.config import camera_config
+from src.core.image_processor import detect_largest_face, embed_face
+from src.services.verification_service import verify_embedding
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+def iou(box_a, box_b):
+    """Intersection over union of two (x1, y1, x2, y2) boxes"""
+    ix1, iy1 = max(box_a[0], box_b[0]), max(box_a[1], box_b[1])
+    ix2, iy2 = min(box_a[2], box_b[2]), min(box_a[3], box_b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+def face_quality(box, det_score):
+    """Larger, more confident detections give better embeddings"""
+    return (box[2] - box[0]) * (box[3] - box[1]) * det_score
+
+class Track:
+    """One face followed across frames"""
+    
+    def __init__(self, track_id, box, frame_idx, history_size):
+        self.track_id = track_id
+        self.box = box
+        self.last_seen = frame_idx
+        self.last_embedded = None
+        self.best_quality = 0.0
+        self.misses = 0
+        self.history = deque(maxlen=history_size)
+    
+    def decision(self, threshold):
+        """Smoothed (label, score) over the track's history; label is None unless a majority agrees"""
+        if not self.history:
+            return None, 0.0
+        
+        votes = {}
+        for label, score in self.history:
+            if label is not None:
+                votes.setdefault(label, []).append(score)
+        
+        if votes:
+            label, scores = max(votes.items(), key=lambda item: sum(item[1]))
+            mean_score = sum(scores) / len(scores)
+            if len(scores) * 2 > len(self.history) and mean_score >= threshold:
+                return label, mean_score
+        
+        return None, sum(score for _, score in self.history) / len(self.history)
+
+class FaceTracker:
+    """Greedy IoU association that decides when a track needs a fresh embedding"""
+    
+    def __init__(self, iou_threshold=None, reembed_interval=None, max_misses=None,
+                 history_size=None, quality_gain=1.2):
+        self.iou_threshold = camera_config.track_iou_threshold if iou_threshold is None else iou_threshold
+        self.reembed_interval = camera_config.track_reembed_interval if reembed_interval is None else reembed_interval
+        self.max_misses = camera_config.track_max_misses if max_misses is None else max_misses
+        self.history_size = camera_config.track_history if history_size is None else history_size
+        self.quality_gain = quality_gain
+        self.tracks = []
+        self.next_id = 1
+        self.frame_idx = 0
+        self.embeddings_computed = 0
+        self.embeddings_reused = 0
+    
+    def update(self, detections, frame_idx=None):
+        """Associate (box, det_score) detections with tracks
+
+        Returns a list of (track, needs_embedding) aligned with detections.
+        Unmatched tracks age out after max_misses frames. frame_idx is the capture
+        frame number (default: one more than the last update); an update for a frame
+        at or before the last one tracked is stale, is ignored, and returns None.
+        """
+        if frame_idx is None:
+            frame_idx = self.frame_idx + 1
+        elif frame_idx <= self.frame_idx:
+            return None
+        self.frame_idx = frame_idx
+        pairs = sorted(((iou(track.box, det[0]), t, d)
+                        for t, track in enumerate(self.tracks)
+                        for d, det in enumerate(detections)), reverse=True)
+        
+        assigned = {}
+        used_tracks = set()
+        for overlap, t, d in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in used_tracks or d in assigned:
+                continue
+            assigned[d] = self.tracks[t]
+            used_tracks.add(t)
+        
+        for t, track in enumerate(self.tracks):
+            if t not in used_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+        
+        results = []
+        for d, (box, det_score) in enumerate(detections):
+            track = assigned.get(d)
+            if track is None:
+                track = Track(self.next_id, box, self.frame_idx, self.history_size)
+                self.next_id += 1
+                self.tracks.append(track)
+            
+            track.box = box
+            track.last_seen = self.frame_idx
+            track.misses = 0
+            
+            quality = face_quality(box, det_score)
+            needs_embedding = (
+                track.last_embedded is None
+                or self.frame_idx - track.last_embedded >= self.reembed_interval
+                or quality > track.best_quality * self.quality_gain
+            )
+            if needs_embedding:
+                track.last_embedded = self.frame_idx
+                track.best_quality = max(track.best_quality, quality)
+                self.embeddings_computed += 1
+            else:
+                self.embeddings_reused += 1
+            results.append((track, needs_embedding))
+        
+        return results
+    
+    def record(self, track, label, score):
+        """Add one verification result to a track's history"""
+        track.history.append((label, score))
+
+class TrackedVerifier:
+    """Frame analyzer for LivePipeline that reuses a track's identity between re-embeds
+
+    Detection runs outside the lock so several inference workers can overlap. Workers
+    can finish detection out of order, so tracker updates carry the capture frame id
+    and a frame older than one already tracked repeats the last decision instead.
+    """
+    
+    def __init__(self, app, index, labels, threshold, tracker=None):
+        self.app = app
+        self.index = index
+        self.labels = labels
+        self.threshold = threshold
+        self.tracker = tracker or FaceTracker()
+        self.lock = threading.Lock()
+        self.last_result = (None, 0.0, False)
+    
+    def __call__(self, frame, frame_id=None):
+        try:
+            detection = detect_largest_face(frame)
+        except Exception as e:
+            log.error("Face detection failed: %s", e)
+            return None, 0.0, False
+        
+        with self.lock:
+            matches = self.tracker.update([] if detection is None else [(detection[0], detection[1])], frame_id)
+            if matches is None:
+                return self.last_result
+        if not matches:
+            with self.lock:
+                self.last_result = (None, 0.0, False)
+            return None, 0.0, False
+        
+        track, needs_embedding = matches[0]
+        if needs_embedding:
+            try:
+                embedding = embed_face(self.app, frame, detection[2])
+                label, score = verify_embedding(self.index, self.labels, embedding, self.threshold)
+            except Exception as e:
+                log.error("Embedding failed for track %s: %s", track.track_id, e)
+                with self.lock:
+                    # Retry on the track's next frame instead of waiting for the re-embed interval
+                    track.last_embedded = None
+                return None, 0.0, False
+            with self.lock:
+                self.tracker.record(track, label, score)
+        
+        with self.lock:
+            label, score = track.decision(self.threshold)
+            self.last_result = (label, score, True)
+        return label, score, True
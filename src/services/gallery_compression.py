@@ -0,0 +1,71 @@
+"""Memory versus score-error report for compressed gallery indexes"""
+import numpy as np
+import faiss
+from config.config import model_config
+from src.services.index_manager import build_index, search_index, rescore_vectors, attach_rescore_vectors
+
+COMPRESSED_BACKENDS = ("sq_fp16", "sq_int8", "pq", "ivf_pq")
+
+def index_memory_bytes(index):
+    """Serialized size of an index, a close proxy for its resident memory"""
+    return int(faiss.serialize_index(index).size)
+
+def _search_without_rescore(index, queries, k):
+    return index.search(np.ascontiguousarray(queries, dtype='float32'), k)
+
+def _compare(exact_D, exact_I, D, I, k):
+    """Top-1 agreement, recall@k and absolute top-1 score error against exact search"""
+    top1_error = np.abs(D[:, 0] - exact_D[:, 0])
+    recall = np.mean([len(set(row) & set(exact_row)) / k for row, exact_row in zip(I, exact_I)])
+    return {
+        'top1_agreement': float(np.mean(I[:, 0] == exact_I[:, 0])),
+        f'recall_at_{k}': float(recall),
+        'score_error_mean': float(top1_error.mean()),
+        'score_error_max': float(top1_error.max()),
+    }
+
+def compression_report(embeddings, queries, backends=COMPRESSED_BACKENDS, k=10, rescore_vectors_source=None):
+    """Compare compressed indexes with exact flat search on the same gallery and queries
+    
+    For each backend: index memory (total and per vector), the saving against the
+    float32 flat index, and top-1 agreement, recall@k and top-1 score error, both from
+    the compressed codes alone and after exact re-scoring of k * rescore_factor
+    candidates. rescore_vectors_source defaults to the float16-rounded gallery,
+    matching what is stored on disk next to a compressed model.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    k = min(k, len(embeddings))
+    if rescore_vectors_source is None:
+        rescore_vectors_source = embeddings.astype('float16')
+    
+    flat = build_index(embeddings, "flat")
+    exact_D, exact_I = _search_without_rescore(flat, queries, k)
+    flat_bytes = index_memory_bytes(flat)
+    report = {
+        'gallery_size': len(embeddings),
+        'dimension': embeddings.shape[1],
+        'queries': len(queries),
+        'k': k,
+        'rescore_factor': model_config.rescore_factor,
+        'rescore_copy_bytes_per_vector': rescore_vectors_source.itemsize * embeddings.shape[1],
+        'backends': {'flat': {'memory_mb': flat_bytes / 1e6, 'bytes_per_vector': flat_bytes / len(embeddings),
+                              'memory_saved': 0.0}},
+    }
+    
+    for backend in backends:
+        index = build_index(embeddings, backend)
+        size = index_memory_bytes(index)
+        entry = {
+            'memory_mb': size / 1e6,
+            'bytes_per_vector': size / len(embeddings),
+            'memory_saved': 1.0 - size / flat_bytes,
+        }
+        entry.update(_compare(exact_D, exact_I, *_search_without_rescore(index, queries, k), k))
+        if model_config.rescore_factor > 0:
+            attach_rescore_vectors(index, rescore_vectors_source)
+            if rescore_vectors(index) is not None:
+                rescored = _compare(exact_D, exact_I, *search_index(index, queries, k), k)
+                entry.update({f'rescored_{name}': value for name, value in rescored.items()})
+        report['backends'][backend] = entry
+    return report
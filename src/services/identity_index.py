@@ -0,0 +1,135 @@
+"""Identity-level search over per-person centroids and exemplars"""
+import numpy as np
+import faiss
+from config.config import model_config
+from src.services.index_manager import build_index
+from src.utils.metrics import stage, record_decisions
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def identity_representatives(vectors, exemplars=0):
+    """Return the normalized centroid of one identity plus up to `exemplars` k-means exemplars
+    
+    Exemplars are the real image vectors closest to each cluster centre, so an identity
+    enrolled under different conditions (glasses, lighting, pose) keeps one vector per mode.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    centroid = _normalize(vectors.mean(axis=0, keepdims=True))
+    if exemplars <= 0 or len(vectors) <= 1:
+        return centroid
+    if len(vectors) <= exemplars:
+        return np.vstack([centroid, vectors])
+    
+    kmeans = faiss.Kmeans(vectors.shape[1], exemplars, niter=20, seed=1234, spherical=True,
+                          min_points_per_centroid=1)
+    kmeans.train(vectors)
+    _, nearest = faiss.knn(kmeans.centroids, vectors, 1, faiss.METRIC_INNER_PRODUCT)
+    return np.vstack([centroid, vectors[np.unique(nearest[:, 0])]])
+
+class IdentityIndex:
+    """Two-stage search: rank identities by their representatives, then re-score their full sets
+    
+    The searched index holds a few vectors per identity instead of every enrollment image,
+    and results come back deduplicated by identity. `labels` is kept by reference so callers
+    can tell when the gallery it was built from has been replaced.
+    """
+    
+    def __init__(self, embeddings, labels, exemplars=None, candidates=None, backend=None):
+        self.exemplars = model_config.identity_exemplars if exemplars is None else exemplars
+        self.candidates = model_config.identity_candidates if candidates is None else candidates
+        self.backend = backend
+        self.representatives = {}
+        self.index = None
+        self.refresh(embeddings, labels)
+    
+    def refresh(self, embeddings, labels, changed=None):
+        """Re-group the gallery; recompute representatives for `changed` identities (all when None)"""
+        self.embeddings = np.ascontiguousarray(embeddings, dtype='float32') if len(embeddings) else np.empty((0, 0), dtype='float32')
+        self.labels = labels
+        identities, owner = np.unique(np.asarray(labels), return_inverse=True)
+        order = np.argsort(owner, kind='stable')
+        bounds = np.searchsorted(owner[order], np.arange(len(identities) + 1))
+        self.identities = identities
+        self.rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(identities))]
+        
+        stale = set(self.representatives) if changed is None else set(changed)
+        current = set(identities)
+        self.representatives = {label: reps for label, reps in self.representatives.items()
+                                if label not in stale and label in current}
+        for i, label in enumerate(identities):
+            if label not in self.representatives:
+                self.representatives[label] = identity_representatives(self.embeddings[self.rows[i]], self.exemplars)
+        
+        if len(identities) == 0:
+            self.index, self.rep_owner = None, np.array([], dtype='int64')
+            return self
+        
+        reps = [self.representatives[label] for label in identities]
+        self.rep_owner = np.concatenate([np.full(len(r), i, dtype='int64') for i, r in enumerate(reps)])
+        self.index = build_index(np.vstack(reps), self.backend)
+        log.info("Identity index: %d identities, %d representatives for %d images", len(identities),
+                 len(self.rep_owner), len(self.embeddings))
+        return self
+    
+    def search(self, queries, k=5):
+        """Return, for every query row, up to k (label, score) pairs with one entry per identity
+        
+        The score is the best similarity against any enrollment image of that identity.
+        """
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype='float32')
+        if self.index is None or len(queries) == 0:
+            return [[] for _ in range(len(queries))]
+        
+        candidates = max(k, self.candidates)
+        fetch = min(self.index.ntotal, candidates * (1 + self.exemplars))
+        with stage("search"):
+            _, I = self.index.search(queries, fetch)
+            
+            results = []
+            for query, ids in zip(queries, I):
+                owners = list(dict.fromkeys(self.rep_owner[ids[ids >= 0]].tolist()))[:candidates]
+                scored = [(self.identities[i], float(np.max(self.embeddings[self.rows[i]] @ query))) for i in owners]
+                scored.sort(key=lambda item: item[1], reverse=True)
+                results.append(scored[:k])
+        return results
+    
+    def top_matches(self, embedding, k=5):
+        """Return up to k (label, score) pairs for one embedding, one per identity"""
+        if embedding is None:
+            return []
+        return self.search(embedding, k)[0]
+    
+    def verify(self, embedding, threshold):
+        """Identity-level counterpart of verify_embedding: (label or None, top score)"""
+        matches = self.top_matches(embedding, k=1)
+        if not matches:
+            return None, 0.0
+        label, score = matches[0]
+        record_decisions(score >= threshold, score < threshold)
+        return (label, score) if score >= threshold else (None, score)
+    
+    def verify_many(self, embeddings, threshold):
+        """Identity-level counterpart of verify_embeddings: (top_labels, scores, accepted)"""
+        matches = self.search(embeddings, k=1)
+        top_labels = np.array([m[0][0] if m else None for m in matches], dtype=object)
+        scores = np.array([m[0][1] if m else 0.0 for m in matches], dtype='float32')
+        accepted = np.array([bool(m) for m in matches], dtype=bool) & (scores >= threshold)
+        record_decisions(accepted.sum(), len(accepted) - accepted.sum())
+        return top_labels, scores, accepted
+
+def identity_index_for(identity_index, embeddings, labels):
+    """Return an IdentityIndex for the current gallery, rebuilding only when labels were replaced
+    
+    Returns None when identity search is disabled or the gallery is empty.
+    """
+    if not model_config.identity_search or len(labels) == 0:
+        return None
+    if identity_index is not None and identity_index.labels is labels:
+        return identity_index
+    return IdentityIndex(embeddings, labels)
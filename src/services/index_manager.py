@@ -1,41 +1,285 @@
 """FAISS index management"""
+import weakref
 import numpy as np
 import faiss
+from config.config import model_config
 from src.core.image_processor import process_single_image
+from src.utils.metrics import stage
+from src.utils.logger import get_logger
 
-def build_index(embeddings):
-    """Build FAISS index"""
+log = get_logger(__name__)
+
+INDEX_BACKENDS = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq_fp16", "sq_int8", "pq")
+
+# Indexes whose storage is a read-only view of an mmap'd file; FAISS aborts if they are mutated
+_memory_mapped_indexes = weakref.WeakSet()
+
+# Compressed indexes paired with full-precision gallery rows (row i = id i) for exact re-scoring
+_rescore_vectors = weakref.WeakKeyDictionary()
+
+def mark_memory_mapped(index):
+    """Record that an index was loaded with mmap IO flags"""
+    _memory_mapped_indexes.add(index)
+    return index
+
+def ensure_writable(index):
+    """Return an in-memory copy of an mmap-backed index so it can be updated"""
+    if index is not None and index in _memory_mapped_indexes:
+        log.info("Copying memory-mapped index into RAM for update")
+        return faiss.deserialize_index(faiss.serialize_index(index))
+    return index
+
+def _inner_index(index):
+    return faiss.downcast_index(index.index) if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) else index
+
+def is_compressed(index):
+    """True for indexes that store lossy codes (scalar or product quantized) instead of raw vectors"""
+    if index is None:
+        return False
+    return isinstance(_inner_index(index), (faiss.IndexScalarQuantizer, faiss.IndexPQ, faiss.IndexIVFPQ,
+                                            faiss.IndexIVFScalarQuantizer))
+
+def attach_rescore_vectors(index, vectors):
+    """Re-score candidates of a compressed index against vectors (row i = id i), e.g. an on-disk memmap
+    
+    Does nothing for uncompressed indexes or when ModelConfig.rescore_factor is 0.
+    """
+    if is_compressed(index) and vectors is not None and len(vectors) and model_config.rescore_factor > 0:
+        _rescore_vectors[index] = vectors
+    return index
+
+def rescore_vectors(index):
+    return _rescore_vectors.get(index) if index is not None else None
+
+def _carry_rescore_vectors(old_index, new_index, embeddings):
+    """Keep exact re-scoring after an update, against the caller's updated in-memory rows"""
+    if old_index is not None and old_index in _rescore_vectors:
+        attach_rescore_vectors(new_index, embeddings)
+    return new_index
+
+def search_index(index, queries, k):
+    """index.search, re-scoring k * rescore_factor candidates exactly when re-score vectors are attached
+    
+    Candidate rows are read once each (sorted, so a memmap is read sequentially) and
+    cast to float32 before the dot products; D and I have the usual FAISS layout.
+    """
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    vectors = rescore_vectors(index)
+    if vectors is None:
+        return index.search(queries, k)
+    
+    fetch = min(index.ntotal, max(k, k * model_config.rescore_factor))
+    _, candidates = index.search(queries, fetch)
+    with stage("rescore"):
+        valid = candidates >= 0
+        rows, inverse = np.unique(candidates[valid], return_inverse=True)
+        gathered = np.asarray(vectors[rows], dtype='float32')
+        scores = np.full(candidates.shape, -np.inf, dtype='float32')
+        query_rows = np.broadcast_to(np.arange(len(queries))[:, None], candidates.shape)[valid]
+        scores[valid] = np.einsum('ij,ij->i', gathered[inverse], queries[query_rows])
+        
+        order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        D = np.take_along_axis(scores, order, axis=1)
+        I = np.take_along_axis(candidates, order, axis=1)
+        I[~np.isfinite(D)] = -1
+    return D, I
+
+def select_backend(ntotal, backend=None):
+    """Resolve the configured backend, picking one by gallery size in auto mode"""
+    backend = backend or model_config.index_backend
+    if backend == "auto":
+        if ntotal <= model_config.auto_flat_max:
+            return "flat"
+        if ntotal <= model_config.auto_ivf_flat_max:
+            return "ivf_flat"
+        return "ivf_pq"
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend: {backend}")
+    return backend
+
+def create_index(embeddings, backend=None):
+    """Create and train an empty inner-product index for the given backend"""
+    ntotal, dimension = embeddings.shape
+    backend = select_backend(ntotal, backend)
+    
+    # IVF needs ~39 training points per centroid and PQ needs 2^nbits points per codebook
+    nlist = max(1, min(model_config.ivf_nlist, ntotal // 39))
+    if backend == "ivf_pq" and ntotal < (1 << model_config.pq_nbits):
+        log.warning("Too few vectors to train PQ (%s), using ivf_flat", ntotal)
+        backend = "ivf_flat"
+    if backend == "pq" and ntotal < (1 << model_config.pq_nbits):
+        log.warning("Too few vectors to train PQ (%s), using sq_int8", ntotal)
+        backend = "sq_int8"
+    
+    if backend == "flat":
+        index = faiss.IndexFlatIP(dimension)
+    elif backend in ("sq_fp16", "sq_int8"):
+        qtype = faiss.ScalarQuantizer.QT_fp16 if backend == "sq_fp16" else faiss.ScalarQuantizer.QT_8bit
+        index = faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_INNER_PRODUCT)
+    elif backend == "pq":
+        index = faiss.IndexPQ(dimension, model_config.pq_m, model_config.pq_nbits, faiss.METRIC_INNER_PRODUCT)
+    elif backend == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, model_config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = model_config.hnsw_ef_construction
+    else:
+        quantizer = faiss.IndexFlatIP(dimension)
+        if backend == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, model_config.pq_m,
+                                     model_config.pq_nbits, faiss.METRIC_INNER_PRODUCT)
+    
+    if not index.is_trained:
+        index.train(embeddings)
+    
+    log.info("Index backend: %s", backend)
+    return tune_index(index)
+
+def tune_index(index):
+    """Apply search-time parameters from ModelConfig (also used after loading from disk)"""
+    inner = _inner_index(index)
+    if isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = min(model_config.ivf_nprobe, inner.nlist)
+    elif isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = model_config.hnsw_ef_search
+    return index
+
+def build_index(embeddings, backend=None):
+    """Build an ID-mapped FAISS index whose ids are the row positions of embeddings/labels"""
     if len(embeddings) == 0:
-        print("❌ No embeddings to index")
+        log.error("No embeddings to index")
         return None
     
-    print(f"🔍 Building FAISS index for {len(embeddings)} embeddings...")
+    log.info("Building FAISS index for %s embeddings...", len(embeddings))
     
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dimension)
-    index.add(embeddings.astype('float32'))
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    index = create_index(embeddings, backend)
+    if not isinstance(index, faiss.IndexIVF):
+        # IVF stores ids natively; every other backend needs an id map
+        index = faiss.IndexIDMap2(index)
+    index.add_with_ids(embeddings, np.arange(len(embeddings), dtype='int64'))
     
-    print(f"✅ FAISS index built with {index.ntotal} embeddings")
+    log.info("FAISS index built with %s embeddings", index.ntotal)
+    return attach_rescore_vectors(index, embeddings)
+
+def ensure_id_mapped(index, embeddings):
+    """Upgrade a plain index (e.g. loaded from an older model file) to an ID-mapped one"""
+    if index is None or not isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexIVF)):
+        if len(embeddings) == 0:
+            return None
+        return build_index(np.asarray(embeddings))
     return index
 
-def get_top_matches(index, labels, image_path, app, k=5):
-    """Get top k matches for an image"""
-    if index is None:
-        print("❌ No index built yet")
-        return []
+def add_identity(index, embeddings, labels, label, new_embeddings):
+    """Append vectors for one identity in place; returns (index, embeddings, labels)"""
+    new_embeddings = np.ascontiguousarray(new_embeddings, dtype='float32')
+    if len(new_embeddings) == 0:
+        return index, embeddings, labels
     
-    embedding = process_single_image(app, image_path, "query")
+    if index is None or len(embeddings) == 0:
+        embeddings = new_embeddings
+        labels = np.array([label] * len(new_embeddings))
+        return build_index(embeddings), embeddings, labels
     
-    if embedding is None:
+    previous = index
+    index = ensure_writable(ensure_id_mapped(index, embeddings))
+    start = len(embeddings)
+    index.add_with_ids(new_embeddings, np.arange(start, start + len(new_embeddings), dtype='int64'))
+    
+    embeddings = np.vstack([np.asarray(embeddings, dtype='float32'), new_embeddings])
+    labels = np.concatenate([np.asarray(labels), np.array([label] * len(new_embeddings))])
+    _carry_rescore_vectors(previous, index, embeddings)
+    
+    log.info("Added %s embeddings for '%s' (index size: %s)", len(new_embeddings), label, index.ntotal)
+    return index, embeddings, labels
+
+def remove_identity(index, embeddings, labels, label):
+    """Remove every vector of one identity in place; returns (index, embeddings, labels)
+
+    Ids stay equal to row positions: the tail rows are moved into the freed slots,
+    so only O(removed) vectors are touched.
+    """
+    labels = np.asarray(labels)
+    removed = np.flatnonzero(labels == label)
+    if len(removed) == 0 or index is None:
+        return index, embeddings, labels
+    
+    previous = index
+    index = ensure_writable(ensure_id_mapped(index, embeddings))
+    embeddings = np.array(embeddings, dtype='float32')
+    labels = labels.copy()
+    
+    keep_count = len(labels) - len(removed)
+    holes = removed[removed < keep_count]
+    movers = np.setdiff1d(np.arange(keep_count, len(labels)), removed)
+    embeddings[holes] = embeddings[movers]
+    labels[holes] = labels[movers]
+    embeddings = embeddings[:keep_count]
+    labels = labels[:keep_count]
+    
+    if keep_count == 0:
+        log.info("Removed %s embeddings for '%s' (index empty)", len(removed), label)
+        return None, np.array([]), np.array([])
+    
+    try:
+        index.remove_ids(removed.astype('int64'))
+        if len(holes) > 0:
+            index.remove_ids(movers.astype('int64'))
+            index.add_with_ids(np.ascontiguousarray(embeddings[holes]), holes.astype('int64'))
+    except RuntimeError:
+        # Some backends (HNSW) cannot delete vectors; rebuild from the compacted rows instead
+        index = build_index(embeddings)
+    
+    _carry_rescore_vectors(previous, index, embeddings)
+    log.info("Removed %s embeddings for '%s' (index size: %s)", len(removed), label, index.ntotal)
+    return index, embeddings, labels
+
+def replace_identity(index, embeddings, labels, label, new_embeddings):
+    """Swap all vectors of one identity for new ones; returns (index, embeddings, labels)"""
+    index, embeddings, labels = remove_identity(index, embeddings, labels, label)
+    return add_identity(index, embeddings, labels, label, new_embeddings)
+
+def top_matches_for_embedding(index, labels, embedding, k=5):
+    """Return up to k (label, score) pairs for one embedding"""
+    if index is None or embedding is None or index.ntotal == 0:
         return []
     
     k = min(k, index.ntotal)
-    D, I = index.search(np.array([embedding]).astype('float32'), k=k)
+    with stage("search"):
+        D, I = search_index(index, np.array([embedding]).astype('float32'), k)
     
     results = []
     for i in range(k):
+        if I[0][i] < 0:
+            continue
         score = float(D[0][i])
         label = labels[I[0][i]]
         results.append((label, score))
     
-    return results
\ No newline at end of file
+    return results
+
+def top_matches_for_embeddings(index, labels, embeddings, k=5):
+    """Return up to k (label, score) pairs for every row of an (N, dim) matrix with one search"""
+    embeddings = np.ascontiguousarray(np.asarray(embeddings, dtype='float32').reshape(len(embeddings), -1))
+    if index is None or index.ntotal == 0 or len(embeddings) == 0:
+        return [[] for _ in range(len(embeddings))]
+    
+    with stage("search"):
+        D, I = search_index(index, embeddings, min(k, index.ntotal))
+    return [[(labels[i], float(score)) for score, i in zip(row_scores, row_ids) if i >= 0]
+            for row_scores, row_ids in zip(D, I)]
+
+def get_top_matches(index, labels, image_path, app, k=5, identity_index=None):
+    """Get top k matches for an image (one per person when an IdentityIndex is given)"""
+    if index is None:
+        log.error("No index built yet")
+        return []
+    
+    embedding = process_single_image(app, image_path, "query")
+    
+    if embedding is None:
+        return []
+    
+    if identity_index is not None:
+        return identity_index.top_matches(embedding, k)
+    return top_matches_for_embedding(index, labels, embedding, k)
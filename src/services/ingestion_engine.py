@@ -0,0 +1,212 @@
+"""Parallel, resumable dataset ingestion"""
+import os
+import pickle
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from config.config import model_config, runtime_config
+from src.core.embedding_service import init_insightface
+from src.core.image_processor import embed_images, process_single_image, warm_up_detector, PIPELINE_LEGACY
+from src.utils.metrics import stage
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# InsightFace session owned by each pool worker (set by _init_worker)
+_worker_app = None
+
+def _init_worker(threads):
+    """Load one InsightFace/ONNX session per worker process"""
+    global _worker_app
+    limit_worker_threads(threads)
+    _worker_app = init_insightface()
+    warm_up_detector()
+
+def resolve_num_workers(num_workers):
+    """Worker process count: 0 or None means one per CPU; <= 1 means run in-process"""
+    return num_workers if num_workers else (os.cpu_count() or 1)
+
+def app_for_workers(num_workers):
+    """Resolve num_workers and load InsightFace only if the work runs in this process
+
+    Pool workers load their own models, so the parent gets None for them. Returns
+    (num_workers, app); app is also None if an in-process load failed.
+    """
+    num_workers = resolve_num_workers(num_workers)
+    if num_workers > 1:
+        return num_workers, None
+    app = init_insightface()
+    if app is not None:
+        warm_up_detector()
+    return num_workers, app
+
+def worker_threads(num_workers):
+    """Inference threads per pool worker, so num_workers processes together use each core once"""
+    return max(1, (os.cpu_count() or 1) // max(1, num_workers))
+
+def limit_worker_threads(threads):
+    """Cap ONNX Runtime and TensorFlow (RetinaFace) threads in a pool worker before its models load
+
+    Left at their defaults, every worker process would size its thread pools to all
+    cores. An explicit RuntimeConfig.intra_op_threads is kept.
+    """
+    if runtime_config.intra_op_threads == 0:
+        runtime_config.intra_op_threads = threads
+    try:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except (ImportError, RuntimeError) as e:
+        # RuntimeError: TensorFlow already initialized its thread pools in this process
+        log.debug("TensorFlow threads not limited: %s", e)
+
+def embed_batch(app, items, errors=None):
+    """Decode, detect and align a batch of (image_path, label) items, then embed all chips in one run
+
+    Returns a list of (image_path, label, embedding or None) in input order. When errors
+    is a list, paths whose None came from a read or inference error are appended to it.
+    """
+    if model_config.pipeline_mode == PIPELINE_LEGACY:
+        return [(path, label, process_single_image(app, path, label, errors=errors)) for path, label in items]
+    
+    images = []
+    for path, label in items:
+        with stage("decode"):
+            img = cv2.imread(path)
+        if img is None:
+            log.warning("Could not load: %s", os.path.basename(path))
+        images.append(img)
+    
+    failed_slots = []
+    embeddings = embed_images(app, images, errors=failed_slots)
+    if errors is not None:
+        errors.extend(items[slot][0] for slot in failed_slots)
+    return [(path, label, embedding) for (path, label), embedding in zip(items, embeddings)]
+
+def embed_batch_with_errors(app, items):
+    """embed_batch that also returns the paths which failed with an error rather than "no face" """
+    errors = []
+    return embed_batch(app, items, errors), errors
+
+def _worker_embed_batch(items):
+    return embed_batch_with_errors(_worker_app, items)
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+class IngestionCheckpoint:
+    """Append-only record of finished images so an interrupted ingestion can resume"""
+    
+    def __init__(self, path):
+        self.path = os.path.abspath(path) if path else None
+    
+    def load(self):
+        """Return {image_path: (signature, label, embedding)} for every record written so far"""
+        done = {}
+        if not self.path or not os.path.exists(self.path):
+            return done
+        
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    records = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError):
+                    # A crash mid-write leaves a truncated tail; everything before it is valid
+                    break
+                for path, signature, label, embedding in records:
+                    done[path] = (signature, label, embedding)
+        return done
+    
+    def append(self, results):
+        if not self.path:
+            return
+        
+        records = []
+        for path, label, embedding in results:
+            try:
+                records.append((path, _file_signature(path), label, embedding))
+            except OSError:
+                continue
+        
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'ab') as f:
+            pickle.dump(records, f)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def ingest_images(app, items, num_workers=None, batch_size=32, checkpoint_path=None):
+    """Embed (image_path, label) items in parallel batches, resuming from a checkpoint
+
+    num_workers <= 1 runs in-process with the given app; otherwise each worker
+    process loads its own InsightFace session.
+    Returns ({image_path: embedding or None}, stats). Images that failed with an error
+    rather than "no face" are listed in stats['failed_paths'] and are not checkpointed,
+    so the next run retries them.
+    """
+    num_workers = resolve_num_workers(num_workers)
+    batch_size = max(1, batch_size)
+    
+    checkpoint = IngestionCheckpoint(checkpoint_path)
+    finished = checkpoint.load()
+    
+    results = {}
+    pending = []
+    for path, label in items:
+        record = finished.get(path)
+        try:
+            if record is not None and record[0] == _file_signature(path) and record[1] == label:
+                results[path] = record[2]
+                continue
+        except OSError:
+            pass
+        pending.append((path, label))
+    
+    resumed = len(results)
+    if resumed:
+        log.info("Resuming ingestion: %s images already done, %s remaining", resumed, len(pending))
+    
+    start = time.perf_counter()
+    batches = list(_chunks(pending, batch_size))
+    
+    failed_paths = set()
+    
+    def _collect(outcome):
+        batch_results, errors = outcome
+        failed_paths.update(errors)
+        checkpoint.append([result for result in batch_results if result[0] not in failed_paths])
+        for path, label, embedding in batch_results:
+            results[path] = embedding
+    
+    if num_workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            _collect(embed_batch_with_errors(app, batch))
+    else:
+        context = multiprocessing.get_context("spawn")
+        workers = min(num_workers, len(batches))
+        log.info("Ingesting with %s worker processes (batch size %s)", workers, batch_size)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(worker_threads(workers),)) as pool:
+            for outcome in pool.map(_worker_embed_batch, batches):
+                _collect(outcome)
+    
+    elapsed = time.perf_counter() - start
+    stats = {
+        'processed': len(pending),
+        'resumed': resumed,
+        'elapsed': elapsed,
+        'images_per_second': len(pending) / elapsed if elapsed > 0 else 0.0,
+        'failed_paths': failed_paths,
+    }
+    
+    checkpoint.clear()
+    return results, stats
@@ -4,6 +4,13 @@ from datetime import datetime
 from src.core.image_processor import process_frame_embedding
 from src.services.verification_service import verify_embedding
 from src.services.camera_service import init_camera
+from src.services.stream_pipeline import LivePipeline
+from src.services.face_tracker import TrackedVerifier
+from src.services.motion_gate import MotionGate
+from config.config import camera_config
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 def capture_and_verify(app, camera, index, labels, threshold, save_image=True):
     """Capture image from camera and verify"""
@@ -24,21 +31,27 @@ def capture_and_verify(app, camera, index, labels, threshold, save_image=True):
     
     captured = False
     captured_frame = None
+    verifier = TrackedVerifier(app, index, labels, threshold) if camera_config.tracking_enabled else None
     
     while True:
         ret, frame = camera.read()
         if not ret:
-            print("❌ Failed to read from camera")
+            log.warning("Failed to read from camera")
             break
         
         frame = cv2.flip(frame, 1)
-        embedding, face_crop = process_frame_embedding(app, frame)
+        if verifier is not None:
+            label, score, face_found = verifier(frame)
+        else:
+            embedding, face_crop = process_frame_embedding(app, frame)
+            face_found = embedding is not None
+            if face_found:
+                label, score = verify_embedding(index, labels, embedding, threshold)
         
         cv2.putText(frame, "Press SPACE to capture, ESC to exit", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
-        if embedding is not None:
-            label, score = verify_embedding(index, labels, embedding, threshold)
+        if face_found:
             if label:
                 cv2.putText(frame, f"Detected: {label} ({score:.3f})", 
                            (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
@@ -90,8 +103,12 @@ def capture_and_verify(app, camera, index, labels, threshold, save_image=True):
     
     return label, score, camera
 
-def live_verification_mode(app, camera, index, labels, threshold):
-    """Continuous live verification mode"""
+def live_verification_mode(app, camera, index, labels, threshold, num_workers=None):
+    """Continuous live verification mode
+
+    Capture, inference and rendering run on separate threads; the preview shows every
+    captured frame with the newest available decision.
+    """
     if camera is None:
         camera = init_camera()
         if camera is None:
@@ -101,44 +118,68 @@ def live_verification_mode(app, camera, index, labels, threshold):
         print("❌ No face database loaded")
         return camera
     
+    if num_workers is None:
+        num_workers = camera_config.inference_workers
+    
     print("🎥 Starting live verification mode...")
     print("Press ESC to exit")
     
-    while True:
-        ret, frame = camera.read()
-        if not ret:
-            print("❌ Failed to read from camera")
-            break
-        
-        frame = cv2.flip(frame, 1)
-        embedding, face_crop = process_frame_embedding(app, frame)
-        
-        cv2.putText(frame, "Live Face Verification (Press ESC to exit)", 
-                   (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        
-        if embedding is not None:
-            label, score = verify_embedding(index, labels, embedding, threshold)
+    verifier = TrackedVerifier(app, index, labels, threshold) if camera_config.tracking_enabled else None
+    pipeline = LivePipeline(app, camera, index, labels, threshold, num_workers=num_workers,
+                            queue_size=camera_config.frame_queue_size, analyze=verifier,
+                            gate=MotionGate() if camera_config.motion_gate_enabled else None).start()
+    frame_id = 0
+    
+    try:
+        while pipeline.running:
+            frame_id, frame = pipeline.latest_frame(frame_id)
+            if frame is None:
+                continue
             
-            if label:
-                cv2.putText(frame, f"VERIFIED: {label}", 
-                           (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 3)
-                cv2.putText(frame, f"Confidence: {score:.3f}", 
-                           (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                cv2.rectangle(frame, (5, 5), (frame.shape[1]-5, frame.shape[0]-5), (0, 255, 0), 3)
+            frame = frame.copy()
+            result = pipeline.latest_result()
+            
+            cv2.putText(frame, "Live Face Verification (Press ESC to exit)", 
+                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            
+            if result is not None and result.face_found:
+                if result.identity:
+                    cv2.putText(frame, f"VERIFIED: {result.identity}", 
+                               (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 3)
+                    cv2.putText(frame, f"Confidence: {result.confidence:.3f}", 
+                               (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    cv2.rectangle(frame, (5, 5), (frame.shape[1]-5, frame.shape[0]-5), (0, 255, 0), 3)
+                else:
+                    cv2.putText(frame, "UNKNOWN PERSON", 
+                               (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
+                    cv2.putText(frame, f"Score: {result.confidence:.3f}", 
+                               (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                    cv2.rectangle(frame, (5, 5), (frame.shape[1]-5, frame.shape[0]-5), (0, 0, 255), 3)
             else:
-                cv2.putText(frame, "UNKNOWN PERSON", 
-                           (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
-                cv2.putText(frame, f"Score: {score:.3f}", 
-                           (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                cv2.rectangle(frame, (5, 5), (frame.shape[1]-5, frame.shape[0]-5), (0, 0, 255), 3)
-        else:
-            cv2.putText(frame, "No face detected", 
-                       (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 3)
-        
-        cv2.imshow('Live Face Verification', frame)
-        
-        if cv2.waitKey(1) & 0xFF == 27:
-            break
-    
-    cv2.destroyAllWindows()
-    return camera
\ No newline at end of file
+                cv2.putText(frame, "No face detected", 
+                           (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 3)
+            
+            metrics = pipeline.metrics()
+            cv2.putText(frame, f"Capture {metrics['capture_fps']:.1f} FPS | Inference {metrics['inference_fps']:.1f} FPS | "
+                               f"Latency {metrics['latency_ms']:.0f} ms", 
+                       (10, frame.shape[0] - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            
+            cv2.imshow('Live Face Verification', frame)
+            
+            if cv2.waitKey(1) & 0xFF == 27:
+                break
+    finally:
+        pipeline.stop()
+        cv2.destroyAllWindows()
+    
+    metrics = pipeline.metrics()
+    print(f"📈 Capture: {metrics['capture_fps']:.1f} FPS, inference: {metrics['inference_fps']:.1f} FPS, "
+          f"latency: {metrics['latency_ms']:.0f} ms (p95 {metrics['latency_p95_ms']:.0f} ms), "
+          f"dropped frames: {metrics['dropped_frames']}")
+    if 'detections_run' in metrics:
+        print(f"🚦 Motion gate: {metrics['detections_run']} detections run, "
+              f"{metrics['detections_skipped']} skipped ({metrics['skip_rate']*100:.0f}%)")
+    if verifier is not None:
+        tracker = verifier.tracker
+        print(f"🎯 Tracking: {tracker.embeddings_computed} embeddings computed, {tracker.embeddings_reused} reused")
+    return camera
@@ -0,0 +1,103 @@
+"""Motion-gated, ROI-restricted detection for camera streams"""
+import threading
+import cv2
+from config.config import camera_config
+
+class MotionGate:
+    """Skip face detection on frames where nothing in the region of interest changed
+
+    roi is (x1, y1, x2, y2) as fractions of the frame so it survives resolution changes.
+    method is "diff" (difference against the last analysed frame) or "mog2"
+    (OpenCV background subtraction). A detection is forced every force_interval frames
+    so a still face is still re-verified now and then.
+    """
+    
+    def __init__(self, roi=None, method=None, pixel_threshold=None, min_changed=None,
+                 force_interval=None, work_width=160):
+        self.roi = camera_config.detection_roi if roi is None else roi
+        self.method = method or camera_config.motion_method
+        self.pixel_threshold = camera_config.motion_pixel_threshold if pixel_threshold is None else pixel_threshold
+        self.min_changed = camera_config.motion_min_changed if min_changed is None else min_changed
+        self.force_interval = camera_config.motion_force_interval if force_interval is None else force_interval
+        self.work_width = work_width
+        
+        if self.method not in ("diff", "mog2"):
+            raise ValueError(f"Unknown motion method: {self.method}")
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) if self.method == "mog2" else None
+        self.reference = None
+        self.since_detection = 0
+        self.detections_run = 0
+        self.detections_skipped = 0
+        self.lock = threading.Lock()
+    
+    def crop(self, frame):
+        """Return (roi_frame, (x_offset, y_offset)) for the configured region of interest"""
+        if not self.roi:
+            return frame, (0, 0)
+        
+        h, w = frame.shape[:2]
+        x1, y1 = int(self.roi[0] * w), int(self.roi[1] * h)
+        x2, y2 = int(self.roi[2] * w), int(self.roi[3] * h)
+        return frame[y1:y2, x1:x2], (x1, y1)
+    
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.work_width / float(w))
+        small = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+    
+    def changed_fraction(self, frame):
+        """Fraction of pixels that changed since the last analysed frame (1.0 on the first frame)"""
+        gray = self._small_gray(frame)
+        
+        if self.subtractor is not None:
+            mask = self.subtractor.apply(gray)
+            return float((mask > 0).mean())
+        
+        if self.reference is None or self.reference.shape != gray.shape:
+            self.reference = gray
+            return 1.0
+        
+        changed = float((cv2.absdiff(gray, self.reference) > self.pixel_threshold).mean())
+        if changed >= self.min_changed:
+            # Compare against the last frame that triggered detection so slow drift accumulates
+            self.reference = gray
+        return changed
+    
+    def should_detect(self, roi_frame):
+        with self.lock:
+            self.since_detection += 1
+            moved = self.changed_fraction(roi_frame) >= self.min_changed
+            if moved or self.since_detection >= self.force_interval:
+                self.since_detection = 0
+                self.detections_run += 1
+                return True
+            self.detections_skipped += 1
+            return False
+    
+    def stats(self):
+        total = self.detections_run + self.detections_skipped
+        return {
+            'detections_run': self.detections_run,
+            'detections_skipped': self.detections_skipped,
+            'skip_rate': self.detections_skipped / total if total else 0.0,
+        }
+
+class GatedAnalyzer:
+    """Wrap a frame analyzer so it only runs on the ROI of frames with motion
+
+    Skipped frames repeat the last decision.
+    """
+    
+    def __init__(self, analyze, gate=None):
+        self.analyze = analyze
+        self.gate = gate or MotionGate()
+        self.last_result = (None, 0.0, False)
+    
+    def __call__(self, frame, frame_id=None):
+        roi_frame, _ = self.gate.crop(frame)
+        if not self.gate.should_detect(roi_frame):
+            return self.last_result
+        self.last_result = self.analyze(roi_frame, frame_id)
+        return self.last_result
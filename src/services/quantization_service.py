@@ -0,0 +1,207 @@
+"""INT8 quantization of the InsightFace model pack"""
+import os
+import time
+import cv2
+import numpy as np
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+from config.config import model_config
+from src.core.embedding_service import get_recognition_model, embed_aligned_faces, model_pack_dir
+from src.core.image_processor import detect_and_align
+from src.services.dataset_loader import list_dataset_images
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+def sample_calibration_items(dataset_path, max_images=200):
+    """Pick calibration images round-robin across person folders so every identity is represented"""
+    by_person = {}
+    for image_path, label in list_dataset_images(dataset_path):
+        by_person.setdefault(label, []).append((image_path, label))
+    
+    items = []
+    queues = [list(person_items) for person_items in by_person.values()]
+    while queues and len(items) < max_images:
+        for queue in queues:
+            if queue and len(items) < max_images:
+                items.append(queue.pop(0))
+        queues = [queue for queue in queues if queue]
+    return items
+
+def load_aligned_chips(items):
+    """Detect and align every image; returns (chips, kept_items) skipping unreadable or faceless images"""
+    chips, kept = [], []
+    for image_path, label in items:
+        img = cv2.imread(image_path)
+        if img is None:
+            continue
+        chip = detect_and_align(img)
+        if chip is None:
+            continue
+        chips.append(chip)
+        kept.append((image_path, label))
+    return chips, kept
+
+def letterbox(img_bgr, input_size):
+    """Resize keeping aspect ratio and pad to input_size (width, height), as SCRFD.detect does"""
+    width, height = input_size
+    if img_bgr.shape[0] / img_bgr.shape[1] > height / width:
+        new_height, new_width = height, int(height / (img_bgr.shape[0] / img_bgr.shape[1]))
+    else:
+        new_width, new_height = width, int(width * (img_bgr.shape[0] / img_bgr.shape[1]))
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    canvas[:new_height, :new_width] = cv2.resize(img_bgr, (new_width, new_height))
+    return canvas
+
+class BlobCalibrationReader(CalibrationDataReader):
+    """Feed preprocessed blobs to quantize_static, one batch at a time"""
+    
+    def __init__(self, input_name, blobs):
+        self.input_name = input_name
+        self.blobs = iter(blobs)
+    
+    def get_next(self):
+        blob = next(self.blobs, None)
+        return None if blob is None else {self.input_name: blob}
+
+def recognition_calibration_reader(app, chips, batch_size=1):
+    """Calibration batches for ArcFace, preprocessed exactly like ArcFaceONNX.get_feat"""
+    rec = get_recognition_model(app)
+    blobs = [cv2.dnn.blobFromImages(chips[i:i + batch_size], 1.0 / rec.input_std, rec.input_size,
+                                    (rec.input_mean,) * 3, swapRB=True)
+             for i in range(0, len(chips), batch_size)]
+    return BlobCalibrationReader(rec.input_name, blobs)
+
+def detection_calibration_reader(app, items, input_size=None):
+    """Calibration blobs for SCRFD from full dataset images at the configured detection size"""
+    det = app.det_model
+    input_size = tuple(input_size or model_config.detection_size)
+    blobs = []
+    for image_path, _ in items:
+        img = cv2.imread(image_path)
+        if img is None:
+            continue
+        blobs.append(cv2.dnn.blobFromImage(letterbox(img, input_size), 1.0 / det.input_std, input_size,
+                                           (det.input_mean,) * 3, swapRB=True))
+    return BlobCalibrationReader(det.input_name, blobs)
+
+def _preprocess(model_file, work_dir):
+    """Run shape inference and graph cleanup before quantizing; fall back to the raw model on failure"""
+    try:
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+        prepared = os.path.join(work_dir, "prep_" + os.path.basename(model_file))
+        quant_pre_process(model_file, prepared, skip_symbolic_shape=True)
+        return prepared
+    except Exception as e:
+        log.warning("Pre-processing skipped for %s: %s", os.path.basename(model_file), e)
+        return model_file
+
+def quantize_onnx(model_file, output_file, reader, per_channel=True):
+    """Static INT8 quantization (QDQ format, signed weights and activations)"""
+    work_dir = os.path.dirname(output_file)
+    source = _preprocess(model_file, work_dir)
+    quantize_static(source, output_file, reader, quant_format=QuantFormat.QDQ, per_channel=per_channel,
+                    activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+    if source != model_file:
+        os.remove(source)
+    return output_file
+
+def quantize_model_pack(app, dataset_path, max_images=200, output_dir=None):
+    """Write INT8 detection and recognition models calibrated on our dataset next to the FP32 pack"""
+    output_dir = output_dir or model_pack_dir('int8')
+    os.makedirs(output_dir, exist_ok=True)
+    
+    items = sample_calibration_items(dataset_path, max_images)
+    chips, kept = load_aligned_chips(items)
+    if not chips:
+        raise ValueError(f"No usable faces found for calibration in {dataset_path}")
+    log.info("Calibrating on %s aligned faces from %s people", len(chips), len(set(label for _, label in kept)))
+    
+    outputs = {}
+    for task, reader in (('recognition', recognition_calibration_reader(app, chips)),
+                         ('detection', detection_calibration_reader(app, items))):
+        model_file = app.models[task].model_file
+        output_file = os.path.join(output_dir, os.path.basename(model_file))
+        start = time.perf_counter()
+        quantize_onnx(model_file, output_file, reader)
+        size_mb = os.path.getsize(output_file) / 1e6
+        log.info("%s: %s (%.1f MB, %.0fs)", task, os.path.basename(output_file), size_mb, time.perf_counter() - start)
+        outputs[task] = output_file
+    
+    return outputs
+
+def _leave_one_out_top1(embeddings, labels):
+    """Nearest other gallery entry for every embedding; returns (top_labels, top_scores)"""
+    sims = embeddings @ embeddings.T
+    np.fill_diagonal(sims, -np.inf)
+    nearest = np.argmax(sims, axis=1)
+    return labels[nearest], sims[np.arange(len(sims)), nearest]
+
+def _time_per_chip(app, chips, runs=3):
+    """Best-of-runs recognition latency per chip in milliseconds"""
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        embed_aligned_faces(app, chips)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / len(chips)
+
+def _time_detection(app, items, runs=3):
+    """Best-of-runs SCRFD latency per image in milliseconds"""
+    frames = [img for img in (cv2.imread(image_path) for image_path, _ in items[:20]) if img is not None]
+    if not frames:
+        return 0.0
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        for frame in frames:
+            app.det_model.detect(frame, max_num=0, metric='default')
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / len(frames)
+
+def accuracy_delta_report(fp32_app, int8_app, dataset_path, threshold=None, max_images=None):
+    """Compare INT8 against FP32 on the enrolled gallery: top-1 agreement, score drift and speed
+
+    Detection timings cover SCRFD only, which the unified pipeline uses; the legacy
+    pipeline's RetinaFace detector is not quantized.
+    """
+    threshold = model_config.threshold if threshold is None else threshold
+    items = list_dataset_images(dataset_path)
+    if max_images:
+        items = sample_calibration_items(dataset_path, max_images)
+    chips, kept = load_aligned_chips(items)
+    if len(chips) < 2:
+        raise ValueError("Need at least two detectable faces to compare models")
+    
+    labels = np.array([label for _, label in kept], dtype=object)
+    fp32 = embed_aligned_faces(fp32_app, chips)
+    int8 = embed_aligned_faces(int8_app, chips)
+    
+    fp32_labels, fp32_scores = _leave_one_out_top1(fp32, labels)
+    int8_labels, int8_scores = _leave_one_out_top1(int8, labels)
+    score_drift = np.abs(fp32_scores - int8_scores)
+    cosine = np.sum(fp32 * int8, axis=1)
+    
+    fp32_rec_ms = _time_per_chip(fp32_app, chips)
+    int8_rec_ms = _time_per_chip(int8_app, chips)
+    fp32_det_ms = _time_detection(fp32_app, kept)
+    int8_det_ms = _time_detection(int8_app, kept)
+    
+    return {
+        'faces': len(chips),
+        'identities': len(set(labels)),
+        'threshold': threshold,
+        'top1_agreement': float(np.mean(fp32_labels == int8_labels)),
+        'fp32_top1_accuracy': float(np.mean(fp32_labels == labels)),
+        'int8_top1_accuracy': float(np.mean(int8_labels == labels)),
+        'decision_agreement': float(np.mean((fp32_scores >= threshold) == (int8_scores >= threshold))),
+        'score_drift_mean': float(score_drift.mean()),
+        'score_drift_max': float(score_drift.max()),
+        'embedding_cosine_mean': float(cosine.mean()),
+        'embedding_cosine_min': float(cosine.min()),
+        'fp32_recognition_ms': round(fp32_rec_ms, 3),
+        'int8_recognition_ms': round(int8_rec_ms, 3),
+        'recognition_speedup': round(fp32_rec_ms / int8_rec_ms, 2) if int8_rec_ms else None,
+        'fp32_scrfd_detection_ms': round(fp32_det_ms, 3),
+        'int8_scrfd_detection_ms': round(int8_det_ms, 3),
+        'scrfd_detection_speedup': round(fp32_det_ms / int8_det_ms, 2) if int8_det_ms else None,
+    }
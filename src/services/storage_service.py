@@ -5,76 +5,271 @@ Copyright (c) 2025 Tekly IT Solutions. All rights reserved.
 PROPRIETARY SOFTWARE - Commercial use requires license agreement.
 """
 import os
+import json
+import fcntl
 import pickle
 import faiss
+import numpy as np
 from datetime import datetime
+from config.config import storage_config
+from src.core.image_processor import pipeline_version
+from src.services.embedding_cache import hash_file
+from src.services.index_manager import (add_identity, remove_identity, replace_identity, tune_index, mark_memory_mapped,
+                                        is_compressed, attach_rescore_vectors)
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+FORMAT_VERSION = 1
+
+def model_files(model_path):
+    """Return the header, embedding matrix and label table paths for a model"""
+    stem = os.path.splitext(model_path)[0]
+    return {
+        'header': stem + ".json",
+        'embeddings': stem + ".f32",
+        'compact': stem + ".f16",
+        'labels': stem + ".labels.npy",
+        'legacy': stem + ".pkl",
+    }
+
+def index_path_for(model_path):
+    """FAISS index file for a model: StorageConfig.index_path for the configured model, else <stem>.faiss"""
+    if os.path.abspath(model_path) == os.path.abspath(storage_config.model_path):
+        return os.path.abspath(storage_config.index_path)
+    return os.path.splitext(model_path)[0] + ".faiss"
+
+def model_exists(model_path=None):
+    """True if either the mapped format or a legacy pickle exists for model_path"""
+    files = model_files(os.path.abspath(model_path or storage_config.model_path))
+    return os.path.exists(files['header']) or os.path.exists(files['legacy'])
+
+def journal_path_for(model_path):
+    """Enrollment journal kept next to the model file"""
+    return os.path.splitext(model_path)[0] + ".journal"
+
+def _replace_from(tmp_path, path):
+    with open(tmp_path, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
 
 def save_model(embeddings, labels, threshold, index, model_path=None):
-    """Save the model inside FaceRecognition/models folder"""
+    """Save the model inside FaceRecognition/models folder
+
+    Writes a raw float32 embedding matrix (.f32), an int32 label-id table (.labels.npy)
+    and a JSON header holding the label dictionary, threshold, dimension, model version
+    and checksums. The header is written last, so a crash never leaves a half-written model.
+    """
     # Default paths inside FaceRecognition structure
     if model_path is None:
-        model_path = "models/enhanced_face_model.pkl"
+        model_path = storage_config.model_path
     
     # Convert to absolute path to ensure it's saved in the correct location
     if not os.path.isabs(model_path):
         model_path = os.path.abspath(model_path)
     
-    print(f"💾 Saving model to: {model_path}")
+    log.info("Saving model to: %s", model_path)
     
     # Ensure models directory exists
     models_dir = os.path.dirname(model_path)
     if models_dir and not os.path.exists(models_dir):
         os.makedirs(models_dir, exist_ok=True)
-        print(f"📁 Created directory: {models_dir}")
+        log.info("Created directory: %s", models_dir)
+    
+    files = model_files(model_path)
+    embeddings = np.ascontiguousarray(embeddings, dtype='<f4')
+    if embeddings.ndim != 2:
+        embeddings = embeddings.reshape(len(embeddings), -1)
+    label_names, label_ids = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
     
-    model_data = {
-        'embeddings': embeddings,
-        'labels': labels,
-        'threshold': threshold,
+    embeddings.tofile(files['embeddings'] + '.tmp')
+    _replace_from(files['embeddings'] + '.tmp', files['embeddings'])
+    with open(files['labels'] + '.tmp', 'wb') as f:
+        np.save(f, label_ids.astype('<i4'))
+    _replace_from(files['labels'] + '.tmp', files['labels'])
+    
+    # A compressed index re-scores its candidates from a half-size copy instead of the .f32 matrix
+    checksums = {}
+    if is_compressed(index) and storage_config.rescore_copy == "float16":
+        embeddings.astype('<f2').tofile(files['compact'] + '.tmp')
+        _replace_from(files['compact'] + '.tmp', files['compact'])
+        checksums['compact'] = hash_file(files['compact'])
+    elif os.path.exists(files['compact']):
+        os.remove(files['compact'])
+    
+    header = {
+        'format_version': FORMAT_VERSION,
+        'threshold': float(threshold),
+        'count': int(embeddings.shape[0]),
+        'dimension': int(embeddings.shape[1]) if embeddings.shape[0] else 0,
+        'model_version': pipeline_version(),
+        'label_names': label_names.tolist(),
+        'checksums': {
+            'embeddings': hash_file(files['embeddings']),
+            'labels': hash_file(files['labels']),
+            **checksums,
+        },
         'created_at': datetime.now().isoformat()
     }
+    with open(files['header'] + '.tmp', 'w') as f:
+        json.dump(header, f, indent=2)
+    _replace_from(files['header'] + '.tmp', files['header'])
     
-    with open(model_path, 'wb') as f:
-        pickle.dump(model_data, f)
-    
-    # Save FAISS index in models folder (same directory as model)
+    # Other processes may have the old index memory-mapped: writing over it in place would
+    # truncate pages under them (SIGBUS), so write a new file and swap it in
     if index:
-        index_path = os.path.join(models_dir, "enhanced_face_index.faiss")
-        faiss.write_index(index, index_path)
-        print(f"💾 Index saved: {index_path}")
+        index_path = index_path_for(model_path)
+        faiss.write_index(index, index_path + '.tmp')
+        _replace_from(index_path + '.tmp', index_path)
+        log.info("Index saved: %s", index_path)
+    
+    # A full snapshot already contains every journaled enrollment
+    journal_path = journal_path_for(model_path)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+    
+    log.info("Model saved successfully!")
+
+def verify_model_files(model_path=None):
+    """Re-hash the embedding and label files and compare them with the header checksums"""
+    files = model_files(os.path.abspath(model_path or storage_config.model_path))
+    with open(files['header']) as f:
+        checksums = json.load(f)['checksums']
+    return all(hash_file(files[name]) == digest for name, digest in checksums.items())
+
+def append_enrollment(op, label, new_embeddings=None, model_path=None):
+    """Persist one add/remove/replace of an identity without rewriting the model
+
+    Records are replayed on top of the last full snapshot by load_model. Each record is
+    written with one write under an exclusive lock, so several API workers can share a journal.
+    """
+    if op not in ('add', 'remove', 'replace'):
+        raise ValueError(f"Unknown enrollment operation: {op}")
+    
+    if model_path is None:
+        model_path = storage_config.model_path
+    if not os.path.isabs(model_path):
+        model_path = os.path.abspath(model_path)
+    
+    journal_path = journal_path_for(model_path)
+    os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+    record = pickle.dumps({'op': op, 'label': label, 'embeddings': new_embeddings,
+                           'created_at': datetime.now().isoformat()})
+    with open(journal_path, 'ab') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    
+    log.info("Enrollment journaled: %s '%s'", op, label)
+
+def _replay_journal(journal_path, embeddings, labels, index):
+    if not os.path.exists(journal_path):
+        return embeddings, labels, index
+    
+    replayed = 0
+    with open(journal_path, 'rb') as f:
+        while True:
+            try:
+                record = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError):
+                break
+            op, label = record['op'], record['label']
+            if op == 'add':
+                index, embeddings, labels = add_identity(index, embeddings, labels, label, record['embeddings'])
+            elif op == 'remove':
+                index, embeddings, labels = remove_identity(index, embeddings, labels, label)
+            elif op == 'replace':
+                index, embeddings, labels = replace_identity(index, embeddings, labels, label, record['embeddings'])
+            replayed += 1
     
-    print(f"✅ Model saved successfully!")
+    log.info("Replayed %s journaled enrollments", replayed)
+    return embeddings, labels, index
+
+def load_journal(model_path=None):
+    """Replay the enrollment journal onto an empty gallery; for services enrolled before any model was saved"""
+    model_path = os.path.abspath(model_path or storage_config.model_path)
+    return _replay_journal(journal_path_for(model_path), np.array([]), np.array([]), None)
+
+def _read_index(index_path):
+    """Read a FAISS index with mmap IO flags, falling back to a normal read"""
+    mmap_flag = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+    try:
+        return mark_memory_mapped(faiss.read_index(index_path, mmap_flag))
+    except RuntimeError:
+        return faiss.read_index(index_path)
+
+def _load_mapped(files):
+    with open(files['header']) as f:
+        header = json.load(f)
+    
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format version: {header.get('format_version')}")
+    if header['model_version'] != pipeline_version():
+        log.warning("Model built with %s, current pipeline is %s", header['model_version'], pipeline_version())
+    
+    count, dimension = header['count'], header['dimension']
+    if count == 0:
+        embeddings = np.empty((0, dimension), dtype='float32')
+    else:
+        embeddings = np.memmap(files['embeddings'], dtype='<f4', mode='r', shape=(count, dimension))
+    
+    label_ids = np.load(files['labels'], mmap_mode='r')
+    labels = np.asarray(header['label_names'], dtype=object)[label_ids]
+    return embeddings, labels, header['threshold']
+
+def _rescore_source(files, embeddings):
+    """Rows used to re-score a compressed index: the float16 copy when one was saved, else the .f32 memmap"""
+    if storage_config.rescore_copy == "float16" and os.path.exists(files['compact']) and len(embeddings):
+        return np.memmap(files['compact'], dtype='<f2', mode='r', shape=tuple(embeddings.shape))
+    return embeddings
+
+def _load_legacy(model_path):
+    with open(model_path, 'rb') as f:
+        model_data = pickle.load(f)
+    return model_data['embeddings'], model_data['labels'], model_data['threshold']
 
 def load_model(model_path=None):
-    """Load the model from FaceRecognition/models folder"""
+    """Load the model from FaceRecognition/models folder
+
+    Embeddings come back as a read-only np.memmap and the index is loaded with mmap
+    IO flags, so only the pages actually touched are read. Legacy pickles still load.
+    """
     # Default paths inside FaceRecognition structure
     if model_path is None:
-        model_path = "models/enhanced_face_model.pkl"
+        model_path = storage_config.model_path
     
     # Convert to absolute path to ensure it loads from the correct location
     if not os.path.isabs(model_path):
         model_path = os.path.abspath(model_path)
     
-    print(f"📁 Loading model from: {model_path}")
+    log.info("Loading model from: %s", model_path)
     
     try:
-        with open(model_path, 'rb') as f:
-            model_data = pickle.load(f)
+        files = model_files(model_path)
+        if os.path.exists(files['header']):
+            embeddings, labels, threshold = _load_mapped(files)
+        else:
+            log.info("No mapped model header found, reading legacy pickle")
+            embeddings, labels, threshold = _load_legacy(files['legacy'])
         
-        embeddings = model_data['embeddings']
-        labels = model_data['labels']
-        threshold = model_data['threshold']
-        
-        # Load FAISS index from models folder (same directory as model)
-        models_dir = os.path.dirname(model_path)
         index = None
-        index_path = os.path.join(models_dir, "enhanced_face_index.faiss")
+        index_path = index_path_for(model_path)
+        if not os.path.exists(index_path):
+            # Models saved before the index followed the model name
+            index_path = os.path.join(os.path.dirname(model_path), "enhanced_face_index.faiss")
         if os.path.exists(index_path):
-            index = faiss.read_index(index_path)
-            print(f"📁 Index loaded: {index_path}")
+            index = tune_index(_read_index(index_path))
+            attach_rescore_vectors(index, _rescore_source(files, embeddings))
+            log.info("Index loaded: %s", index_path)
+        
+        embeddings, labels, index = _replay_journal(journal_path_for(model_path), embeddings, labels, index)
         
-        print(f"✅ Model loaded successfully: {len(labels)} embeddings")
+        log.info("Model loaded successfully: %s embeddings", len(labels))
         return embeddings, labels, threshold, index, True
     except Exception as e:
-        print(f"❌ Failed to load model: {e}")
-        return None, None, None, None, False
\ No newline at end of file
+        log.error("Failed to load model: %s", e)
+        return None, None, None, None, False
@@ -0,0 +1,292 @@
+"""Many camera, video and RTSP streams sharing one detection and embedding worker pool"""
+import time
+import threading
+from collections import deque
+import cv2
+from config.config import camera_config
+from src.core.batch_scheduler import get_batcher, close_batcher
+from src.services.camera_service import open_source, is_live_source
+from src.services.stream_pipeline import LatestFrameQueue, RateMeter
+from src.services.verification_service import verify_frame_faces
+from src.models.data_models import StreamFrameResult
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+class FairScheduler:
+    """Round-robin over per-stream frame queues so one busy stream cannot starve the others
+    
+    Every stream queue shares the scheduler's condition, so idle workers wait on all
+    streams at once and each put wakes exactly one of them.
+    """
+    
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.queues = []
+        self.cursor = 0
+        self.closed = False
+    
+    def add_queue(self, key, maxsize):
+        queue = LatestFrameQueue(maxsize, condition=self.condition)
+        with self.condition:
+            self.queues.append((key, queue))
+        return queue
+    
+    def _take(self):
+        count = len(self.queues)
+        for offset in range(count):
+            key, queue = self.queues[(self.cursor + offset) % count]
+            if queue.items:
+                self.cursor = (self.cursor + offset + 1) % count
+                return key, queue.items.popleft()
+        return None
+    
+    def get(self, timeout=None):
+        """Next (key, item), taking one frame per stream per turn; None on timeout or close"""
+        with self.condition:
+            item = self._take()
+            if item is None and not self.closed:
+                self.condition.wait(timeout)
+                item = self._take()
+            return item
+    
+    def pending(self):
+        with self.condition:
+            return sum(len(queue.items) for _, queue in self.queues)
+    
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class StreamSource:
+    """One input: its capture handle, frame queue, counters and newest result"""
+    
+    def __init__(self, name, source, queue, realtime=None, loop=False):
+        self.name = name
+        self.source = source
+        self.queue = queue
+        self.live = is_live_source(source)
+        # Video files are paced at their own frame rate so they behave like cameras
+        self.realtime = not self.live if realtime is None else realtime
+        self.loop = loop
+        self.capture = None
+        self.thread = None
+        self.state = "starting"
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.reconnects = 0
+        self.capture_meter = RateMeter()
+        self.inference_meter = RateMeter()
+        self.latencies = deque(maxlen=100)
+        self.result = None
+
+class StreamManager:
+    """Capture thread per source -> fair scheduler -> shared inference workers -> per-stream results
+    
+    All streams share one InsightFace app, one detector and one worker pool, so model
+    memory and inference threads do not grow with the number of cameras. Each finished
+    frame becomes a StreamFrameResult, kept as the stream's latest result and passed
+    to on_result(result) when given.
+    """
+    
+    def __init__(self, app, index, labels, threshold, num_workers=None, queue_size=None, analyze=None,
+                 on_result=None, min_size=0, opener=open_source, reconnect_attempts=None, reconnect_delay=None):
+        self.app = app
+        self.index = index
+        self.labels = labels
+        self.threshold = threshold
+        self.min_size = min_size
+        self.num_workers = max(1, num_workers or camera_config.inference_workers)
+        self.queue_size = queue_size or camera_config.stream_queue_size
+        self.analyze = analyze or self._verify_frame
+        self.on_result = on_result
+        self.opener = opener
+        self.reconnect_attempts = (camera_config.stream_reconnect_attempts if reconnect_attempts is None
+                                   else reconnect_attempts)
+        self.reconnect_delay = camera_config.stream_reconnect_delay if reconnect_delay is None else reconnect_delay
+        
+        self.scheduler = FairScheduler()
+        self.streams = {}
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.running = False
+        self.workers = []
+    
+    def _verify_frame(self, frame):
+        return verify_frame_faces(self.app, self.index, self.labels, frame, self.threshold, self.min_size)
+    
+    def add_stream(self, source, name=None, realtime=None, loop=False):
+        """Register a source (device index, file path or URL); starts capturing at once if running"""
+        name = name or f"stream-{len(self.streams)}"
+        if name in self.streams:
+            raise ValueError(f"Duplicate stream name: {name}")
+        stream = StreamSource(name, source, self.scheduler.add_queue(name, self.queue_size), realtime, loop)
+        self.streams[name] = stream
+        if self.running:
+            self._start_capture(stream)
+        return name
+    
+    def start(self):
+        self.running = True
+        # Inference workers of all streams share recognition batches
+        if self.app is not None:
+            get_batcher(self.app)
+        self.workers = [threading.Thread(target=self._inference_loop, name=f"stream-inference-{i}", daemon=True)
+                        for i in range(self.num_workers)]
+        for worker in self.workers:
+            worker.start()
+        for stream in self.streams.values():
+            self._start_capture(stream)
+        log.info("Stream manager started: %d streams, %d inference workers", len(self.streams), self.num_workers)
+        return self
+    
+    def _start_capture(self, stream):
+        stream.thread = threading.Thread(target=self._capture_loop, args=(stream,), name=f"capture-{stream.name}",
+                                         daemon=True)
+        stream.thread.start()
+    
+    def stop(self):
+        self.running = False
+        self.scheduler.close()
+        for stream in self.streams.values():
+            if stream.thread is not None:
+                stream.thread.join(timeout=2.0)
+        for worker in self.workers:
+            worker.join(timeout=2.0)
+        self.workers = []
+        if self.app is not None:
+            close_batcher(self.app)
+    
+    def join(self, timeout=None):
+        """Wait until every finite source has ended and its queued frames are processed"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for stream in self.streams.values():
+            if stream.thread is not None:
+                stream.thread.join(None if deadline is None else max(0.0, deadline - time.perf_counter()))
+        while self.scheduler.pending() or self.in_flight:
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            time.sleep(0.01)
+        return all(stream.thread is None or not stream.thread.is_alive() for stream in self.streams.values())
+    
+    def _open(self, stream):
+        stream.capture = self.opener(stream.source)
+        return stream.capture is not None
+    
+    def _reconnect(self, stream):
+        """Reopen a live source that stopped delivering frames"""
+        for attempt in range(1, self.reconnect_attempts + 1):
+            log.warning("Stream %s lost, reconnecting (%d/%d)", stream.name, attempt, self.reconnect_attempts)
+            if stream.capture is not None:
+                stream.capture.release()
+            stream.state = "reconnecting"
+            end = time.perf_counter() + self.reconnect_delay
+            while self.running and time.perf_counter() < end:
+                time.sleep(0.05)
+            if not self.running:
+                return False
+            if self._open(stream):
+                stream.reconnects += 1
+                stream.state = "running"
+                return True
+        stream.capture = None
+        return False
+    
+    def _capture_loop(self, stream):
+        if not self._open(stream):
+            stream.state = "failed"
+            return
+        stream.state = "running"
+        fps = stream.capture.get(cv2.CAP_PROP_FPS) if stream.realtime else 0
+        frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+        next_frame_at = time.perf_counter()
+        
+        while self.running:
+            ret, frame = stream.capture.read()
+            if not ret:
+                if stream.loop and not stream.live:
+                    stream.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if stream.live and self._reconnect(stream):
+                    continue
+                break
+            
+            captured_at = time.perf_counter()
+            stream.frames_captured += 1
+            stream.capture_meter.tick(captured_at)
+            stream.queue.put((stream.frames_captured, captured_at, frame))
+            
+            if frame_interval:
+                next_frame_at += frame_interval
+                delay = next_frame_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_frame_at = time.perf_counter()
+        
+        if stream.capture is not None:
+            stream.capture.release()
+        stream.state = "ended" if stream.state == "running" else "failed"
+        log.info("Stream %s %s after %d frames", stream.name, stream.state, stream.frames_captured)
+    
+    def _inference_loop(self):
+        while self.running:
+            with self.scheduler.condition:
+                item = self.scheduler.get(timeout=0.5)
+                if item is not None:
+                    self.in_flight += 1
+            if item is None:
+                continue
+            
+            name, (frame_id, captured_at, frame) = item
+            stream = self.streams[name]
+            try:
+                faces = self.analyze(frame)
+            except Exception as e:
+                log.error("Inference failed on stream %s: %s", name, e)
+                faces = []
+            completed_at = time.perf_counter()
+            result = StreamFrameResult(name, frame_id, captured_at, completed_at, faces)
+            
+            stream.inference_meter.tick(completed_at)
+            with self.lock:
+                stream.latencies.append(completed_at - captured_at)
+                stream.frames_processed += 1
+                # Workers can finish out of order; never replace a newer decision with an older one
+                if stream.result is None or frame_id > stream.result.frame_id:
+                    stream.result = result
+            if self.on_result is not None:
+                try:
+                    self.on_result(result)
+                except Exception as e:
+                    log.error("Result callback failed on stream %s: %s", name, e)
+            with self.scheduler.condition:
+                self.in_flight -= 1
+    
+    def latest_result(self, name):
+        with self.lock:
+            return self.streams[name].result
+    
+    def stats(self):
+        """Per-stream capture/inference FPS, queue depth, drops, latency (ms) and state"""
+        report = {}
+        for name, stream in self.streams.items():
+            with self.lock:
+                latencies = sorted(stream.latencies)
+                processed = stream.frames_processed
+            report[name] = {
+                'source': str(stream.source),
+                'state': stream.state,
+                'capture_fps': stream.capture_meter.rate(),
+                'inference_fps': stream.inference_meter.rate(),
+                'queue_depth': len(stream.queue),
+                'dropped_frames': stream.queue.dropped,
+                'frames_captured': stream.frames_captured,
+                'frames_processed': processed,
+                'reconnects': stream.reconnects,
+                'latency_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+                'latency_p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+                                  if latencies else 0.0,
+            }
+        return report
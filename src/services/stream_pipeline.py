@@ -0,0 +1,212 @@
+"""Threaded capture/inference pipeline for camera streams"""
+import time
+import threading
+from collections import deque
+import cv2
+from src.core.image_processor import process_frame_embedding
+from src.services.verification_service import verify_embedding
+from src.services.motion_gate import GatedAnalyzer
+from src.models.data_models import FrameResult
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+class LatestFrameQueue:
+    """Bounded queue that drops the oldest frame instead of blocking the producer
+
+    Several queues can share one condition so a consumer can wait on all of them.
+    """
+    
+    def __init__(self, maxsize=1, condition=None):
+        self.maxsize = max(1, maxsize)
+        self.items = deque()
+        self.dropped = 0
+        self.condition = condition or threading.Condition()
+        self.closed = False
+    
+    def put(self, item):
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+    
+    def get(self, timeout=None):
+        """Return the oldest queued item, or None on timeout/close"""
+        with self.condition:
+            if not self.items and not self.closed:
+                self.condition.wait(timeout)
+            return self.items.popleft() if self.items else None
+    
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+    
+    def __len__(self):
+        with self.condition:
+            return len(self.items)
+
+class RateMeter:
+    """Events per second over a sliding time window"""
+    
+    def __init__(self, window=2.0):
+        self.window = window
+        self.events = deque()
+        self.lock = threading.Lock()
+    
+    def tick(self, now=None):
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            self.events.append(now)
+            while self.events and now - self.events[0] > self.window:
+                self.events.popleft()
+    
+    def rate(self, now=None):
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            while self.events and now - self.events[0] > self.window:
+                self.events.popleft()
+            if len(self.events) < 2:
+                return 0.0
+            span = self.events[-1] - self.events[0]
+            return (len(self.events) - 1) / span if span > 0 else 0.0
+
+class LivePipeline:
+    """Capture thread -> latest-frame queue -> inference workers -> newest result
+
+    The caller renders from latest_frame()/latest_result() at capture rate, so the
+    preview stays responsive even when inference is slower than the camera.
+    An optional MotionGate crops to its ROI and skips detection on static frames.
+    analyze(frame, frame_id) returns (label, score, face_found); frame ids increase
+    with capture order, so stateful analyzers can tell when workers finish out of order.
+    """
+    
+    def __init__(self, app, camera, index, labels, threshold, num_workers=2, queue_size=1,
+                 flip=True, analyze=None, gate=None):
+        self.app = app
+        self.camera = camera
+        self.index = index
+        self.labels = labels
+        self.threshold = threshold
+        self.num_workers = max(1, num_workers)
+        self.flip = flip
+        self.analyze = analyze or self._verify_frame
+        self.gate = gate
+        if gate is not None:
+            self.analyze = GatedAnalyzer(self.analyze, gate)
+        
+        self.queue = LatestFrameQueue(queue_size)
+        self.capture_meter = RateMeter()
+        self.inference_meter = RateMeter()
+        self.latencies = deque(maxlen=100)
+        
+        self.lock = threading.Lock()
+        self.frame_ready = threading.Condition(self.lock)
+        self.frame = None
+        self.frame_id = 0
+        self.result = None
+        self.running = False
+        self.threads = []
+    
+    def _verify_frame(self, frame, frame_id=None):
+        embedding, _ = process_frame_embedding(self.app, frame)
+        if embedding is None:
+            return None, 0.0, False
+        label, score = verify_embedding(self.index, self.labels, embedding, self.threshold)
+        return label, score, True
+    
+    def start(self):
+        self.running = True
+        self.threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True)]
+        self.threads += [threading.Thread(target=self._inference_loop, name=f"inference-{i}", daemon=True)
+                         for i in range(self.num_workers)]
+        for thread in self.threads:
+            thread.start()
+        return self
+    
+    def stop(self):
+        self.running = False
+        self.queue.close()
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+        for thread in self.threads:
+            thread.join(timeout=2.0)
+        self.threads = []
+    
+    def _capture_loop(self):
+        while self.running:
+            ret, frame = self.camera.read()
+            if not ret:
+                log.warning("Failed to read from camera")
+                self.running = False
+                break
+            
+            captured_at = time.perf_counter()
+            if self.flip:
+                frame = cv2.flip(frame, 1)
+            
+            with self.frame_ready:
+                self.frame_id += 1
+                self.frame = frame
+                frame_id = self.frame_id
+                self.frame_ready.notify_all()
+            
+            self.capture_meter.tick(captured_at)
+            self.queue.put((frame_id, captured_at, frame))
+        
+        self.queue.close()
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+    
+    def _inference_loop(self):
+        while self.running:
+            item = self.queue.get(timeout=0.5)
+            if item is None:
+                continue
+            
+            frame_id, captured_at, frame = item
+            try:
+                label, score, has_face = self.analyze(frame, frame_id)
+            except Exception as e:
+                log.error("Inference failed: %s", e)
+                label, score, has_face = None, 0.0, False
+            completed_at = time.perf_counter()
+            
+            self.inference_meter.tick(completed_at)
+            with self.lock:
+                self.latencies.append(completed_at - captured_at)
+                # Workers can finish out of order; never replace a newer decision with an older one
+                if self.result is None or frame_id > self.result.frame_id:
+                    self.result = FrameResult(frame_id, captured_at, completed_at, label, score, has_face)
+    
+    def latest_frame(self, after_id=0, timeout=1.0):
+        """Wait for a frame newer than after_id; returns (frame_id, frame) or (after_id, None)"""
+        with self.frame_ready:
+            if self.frame_id <= after_id and self.running:
+                self.frame_ready.wait(timeout)
+            if self.frame_id <= after_id:
+                return after_id, None
+            return self.frame_id, self.frame
+    
+    def latest_result(self):
+        with self.lock:
+            return self.result
+    
+    def metrics(self):
+        """Capture FPS, inference FPS, end-to-end latency (ms), dropped frames and gate counts"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+        avg = sum(latencies) / len(latencies) if latencies else 0.0
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        metrics = {
+            'capture_fps': self.capture_meter.rate(),
+            'inference_fps': self.inference_meter.rate(),
+            'latency_ms': avg * 1000,
+            'latency_p95_ms': p95 * 1000,
+            'dropped_frames': self.queue.dropped,
+        }
+        if self.gate is not None:
+            metrics.update(self.gate.stats())
+        return metrics
@@ -0,0 +1,227 @@
+"""Vector store backends shared by the CLI and API workers"""
+import json
+import numpy as np
+import faiss
+from config.config import model_config, storage_config
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+class VectorStore:
+    """Gallery of (id, label, embedding) records with upsert, delete and filtered batched search
+    
+    Ids are strings chosen by the caller (e.g. "alice/3"); upserting an existing id
+    replaces its label and vector. Search returns, for every query row, up to k
+    (id, label, score) tuples by descending inner product.
+    """
+    
+    def upsert(self, ids, labels, embeddings):
+        raise NotImplementedError
+    
+    def delete(self, ids=None, labels=None):
+        """Delete records by id and/or by label; returns the number of records removed"""
+        raise NotImplementedError
+    
+    def search(self, queries, k=5, labels=None):
+        """Search every query row, optionally restricted to the given labels"""
+        raise NotImplementedError
+    
+    def count(self):
+        raise NotImplementedError
+    
+    def identities(self):
+        """Return the set of labels currently stored"""
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+
+def _as_matrix(embeddings, dimension=None):
+    matrix = np.ascontiguousarray(np.atleast_2d(embeddings), dtype='float32')
+    if dimension is not None and matrix.shape[1] != dimension:
+        raise ValueError(f"Expected {dimension}-d vectors, got {matrix.shape[1]}")
+    return matrix
+
+def _check_records(ids, labels, embeddings):
+    if not (len(ids) == len(labels) == len(embeddings)):
+        raise ValueError("ids, labels and embeddings must have the same length")
+    if len(set(ids)) != len(ids):
+        raise ValueError("Duplicate ids in one upsert")
+
+class FaissVectorStore(VectorStore):
+    """In-process store over a flat inner-product FAISS index (one copy per process)"""
+    
+    def __init__(self, dimension=None):
+        self.dimension = dimension or model_config.embedding_dim
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        self._next_id = 0
+        self._int_ids = {}
+        self._records = {}
+        self._by_label = {}
+    
+    def upsert(self, ids, labels, embeddings):
+        ids, labels = list(ids), list(labels)
+        _check_records(ids, labels, embeddings)
+        if not ids:
+            return 0
+        matrix = _as_matrix(embeddings, self.dimension)
+        
+        self.delete(ids=[record_id for record_id in ids if record_id in self._int_ids])
+        int_ids = np.arange(self._next_id, self._next_id + len(ids), dtype='int64')
+        self._next_id += len(ids)
+        self.index.add_with_ids(matrix, int_ids)
+        
+        for record_id, label, int_id in zip(ids, labels, int_ids.tolist()):
+            self._int_ids[record_id] = int_id
+            self._records[int_id] = (record_id, label)
+            self._by_label.setdefault(label, set()).add(int_id)
+        return len(ids)
+    
+    def delete(self, ids=None, labels=None):
+        targets = set()
+        for record_id in ids or []:
+            if record_id in self._int_ids:
+                targets.add(self._int_ids[record_id])
+        for label in labels or []:
+            targets.update(self._by_label.get(label, ()))
+        if not targets:
+            return 0
+        
+        self.index.remove_ids(np.array(sorted(targets), dtype='int64'))
+        for int_id in targets:
+            record_id, label = self._records.pop(int_id)
+            del self._int_ids[record_id]
+            self._by_label[label].discard(int_id)
+            if not self._by_label[label]:
+                del self._by_label[label]
+        return len(targets)
+    
+    def search(self, queries, k=5, labels=None):
+        queries = _as_matrix(queries, self.dimension)
+        if self.index.ntotal == 0 or len(queries) == 0:
+            return [[] for _ in range(len(queries))]
+        
+        params = None
+        if labels is not None:
+            allowed = [int_id for label in labels for int_id in self._by_label.get(label, ())]
+            if not allowed:
+                return [[] for _ in range(len(queries))]
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.array(allowed, dtype='int64')))
+        
+        D, I = self.index.search(queries, min(k, self.index.ntotal), params=params)
+        return [[self._records[int_id] + (float(score),) for score, int_id in zip(row_scores, row_ids) if int_id >= 0]
+                for row_scores, row_ids in zip(D, I)]
+    
+    def count(self):
+        return self.index.ntotal
+    
+    def identities(self):
+        return set(self._by_label)
+
+class MilvusVectorStore(VectorStore):
+    """Store backed by a Milvus collection, shared by every process that connects to it
+    
+    A uri ending in ".db" runs Milvus Lite in-process on a local file, which is what the
+    tests and single-host deployments use; an http(s) uri points at a Milvus server.
+    """
+    
+    def __init__(self, uri=None, collection=None, dimension=None, index_type=None, token=""):
+        try:
+            from pymilvus import MilvusClient, DataType
+        except ImportError as e:
+            raise ImportError("MilvusVectorStore needs pymilvus (pip install 'pymilvus>=2.5.0')") from e
+        
+        self.uri = uri or storage_config.milvus_uri
+        self.collection = collection or storage_config.milvus_collection
+        self.dimension = dimension or model_config.embedding_dim
+        self.client = MilvusClient(uri=self.uri, token=token)
+        
+        if not self.client.has_collection(self.collection):
+            schema = MilvusClient.create_schema(auto_id=False, enable_dynamic_field=False)
+            schema.add_field("id", DataType.VARCHAR, is_primary=True, max_length=512)
+            schema.add_field("label", DataType.VARCHAR, max_length=256)
+            schema.add_field("embedding", DataType.FLOAT_VECTOR, dim=self.dimension)
+            index_params = self.client.prepare_index_params()
+            index_params.add_index(field_name="embedding", index_type=index_type or storage_config.milvus_index_type,
+                                   metric_type="IP")
+            # Strong consistency: an enrollment is visible to the next search from any worker
+            self.client.create_collection(self.collection, schema=schema, index_params=index_params,
+                                          consistency_level="Strong")
+            log.info("Created Milvus collection '%s' (%s-d, IP)", self.collection, self.dimension)
+        self.client.load_collection(self.collection)
+    
+    @staticmethod
+    def _label_filter(labels):
+        return f"label in {json.dumps([str(label) for label in labels])}"
+    
+    def upsert(self, ids, labels, embeddings):
+        ids, labels = list(ids), list(labels)
+        _check_records(ids, labels, embeddings)
+        if not ids:
+            return 0
+        matrix = _as_matrix(embeddings, self.dimension)
+        rows = [{"id": str(record_id), "label": str(label), "embedding": vector.tolist()}
+                for record_id, label, vector in zip(ids, labels, matrix)]
+        self.client.upsert(self.collection, data=rows)
+        return len(rows)
+    
+    @staticmethod
+    def _delete_count(result):
+        # pymilvus 2.x returns {"delete_count": n}; 3.x returns the deleted primary keys
+        return int(result["delete_count"]) if isinstance(result, dict) else len(result)
+    
+    def delete(self, ids=None, labels=None):
+        removed = 0
+        if ids:
+            removed += self._delete_count(self.client.delete(self.collection, ids=[str(record_id) for record_id in ids]))
+        if labels:
+            removed += self._delete_count(self.client.delete(self.collection, filter=self._label_filter(labels)))
+        return removed
+    
+    def search(self, queries, k=5, labels=None):
+        queries = _as_matrix(queries, self.dimension)
+        if len(queries) == 0:
+            return []
+        if labels is not None and len(labels) == 0:
+            return [[] for _ in range(len(queries))]
+        
+        hits = self.client.search(self.collection, data=queries.tolist(), limit=k, output_fields=["label"],
+                                  filter=self._label_filter(labels) if labels is not None else "",
+                                  search_params={"metric_type": "IP"})
+        return [[(hit["id"], hit["entity"]["label"], float(hit["distance"])) for hit in row] for row in hits]
+    
+    def count(self):
+        return int(self.client.query(self.collection, filter="", output_fields=["count(*)"])[0]["count(*)"])
+    
+    def identities(self):
+        labels = set()
+        iterator = self.client.query_iterator(self.collection, batch_size=1000, filter='id != ""',
+                                              output_fields=["label"])
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                return labels
+            labels.update(row["label"] for row in batch)
+    
+    def close(self):
+        self.client.close()
+
+def create_vector_store(backend=None, **kwargs):
+    """Create the vector store named by StorageConfig.vector_store ("faiss" or "milvus")"""
+    backend = backend or storage_config.vector_store
+    if backend == "faiss":
+        return FaissVectorStore(**kwargs)
+    if backend == "milvus":
+        return MilvusVectorStore(**kwargs)
+    raise ValueError(f"Unknown vector store: {backend}")
+
+def gallery_record_ids(labels):
+    """Deterministic ids for a gallery loaded from disk ("<label>/<n>"), so re-seeding is idempotent"""
+    counts = {}
+    ids = []
+    for label in labels:
+        n = counts.get(label, 0)
+        counts[label] = n + 1
+        ids.append(f"{label}/{n}")
+    return ids
@@ -1,27 +1,67 @@
 """Verification logic"""
 import os
+from datetime import datetime
 import numpy as np
-from src.core.image_processor import process_single_image
+from src.core.image_processor import process_single_image, process_frame_faces
+from src.models.data_models import FaceVerificationResult
+from src.services.ingestion_engine import embed_batch
+from src.services.index_manager import search_index
+from src.utils.metrics import stage, record_decisions
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 def verify_embedding(index, labels, embedding, threshold):
     """Verify an embedding against the database"""
     if index is None or embedding is None:
         return None, 0.0
     
-    D, I = index.search(np.array([embedding]).astype('float32'), k=1)
+    with stage("search"):
+        D, I = search_index(index, np.array([embedding]).astype('float32'), 1)
+    
+    if I[0][0] < 0:
+        record_decisions(0, 1)
+        return None, 0.0
     
     top_score = float(D[0][0])
     top_label = labels[I[0][0]]
     
     if top_score >= threshold:
+        record_decisions(1, 0)
         return top_label, top_score
     else:
+        record_decisions(0, 1)
         return None, top_score
 
-def verify_face(app, index, labels, image_path, threshold):
-    """Verify a face against the database"""
+def verify_embeddings(index, labels, embeddings, threshold):
+    """Verify an (N, dim) matrix of embeddings with a single index search
+
+    Returns (top_labels, scores, accepted): top_labels is an object array holding the
+    nearest label for every row (None when the index had no neighbour), scores the
+    float32 top-1 similarity and accepted the boolean mask of scores >= threshold.
+    """
+    embeddings = np.asarray(embeddings, dtype='float32')
+    n = len(embeddings)
+    top_labels = np.full(n, None, dtype=object)
+    scores = np.zeros(n, dtype='float32')
+    
+    if index is None or n == 0:
+        return top_labels, scores, np.zeros(n, dtype=bool)
+    
+    with stage("search"):
+        D, I = search_index(index, embeddings.reshape(n, -1), 1)
+    found = I[:, 0] >= 0
+    
+    scores[found] = D[found, 0]
+    top_labels[found] = np.asarray(labels, dtype=object)[I[found, 0]]
+    accepted = found & (scores >= threshold)
+    record_decisions(accepted.sum(), n - accepted.sum())
+    return top_labels, scores, accepted
+
+def verify_face(app, index, labels, image_path, threshold, identity_index=None):
+    """Verify a face against the database (identity-level when an IdentityIndex is given)"""
     if index is None:
-        print("❌ No index built yet")
+        log.error("No index built yet")
         return None, 0.0
     
     print(f"🔍 Verifying: {os.path.basename(image_path)}")
@@ -29,14 +69,63 @@ def verify_face(app, index, labels, image_path, threshold):
     embedding = process_single_image(app, image_path, "query")
     
     if embedding is None:
-        print("❌ Could not process query image")
+        log.warning("Could not process query image")
         return None, 0.0
     
-    label, score = verify_embedding(index, labels, embedding, threshold)
+    if identity_index is not None:
+        label, score = identity_index.verify(embedding, threshold)
+    else:
+        label, score = verify_embedding(index, labels, embedding, threshold)
     
     if label:
         print(f"✅ Match: {label} (score: {score:.3f})")
     else:
         print(f"❌ No match (score: {score:.3f}, threshold: {threshold:.3f})")
     
-    return label, score
\ No newline at end of file
+    return label, score
+
+def verify_faces(app, index, labels, image_paths, threshold):
+    """Verify many images: one embedding batch and one index search
+
+    Returns (top_labels, scores, accepted) aligned with image_paths; images without a
+    usable face get label None, score 0.0 and are rejected.
+    """
+    n = len(image_paths)
+    top_labels = np.full(n, None, dtype=object)
+    scores = np.zeros(n, dtype='float32')
+    accepted = np.zeros(n, dtype=bool)
+    
+    if index is None:
+        log.error("No index built yet")
+        return top_labels, scores, accepted
+    
+    print(f"🔍 Verifying {n} images...")
+    
+    results = embed_batch(app, [(image_path, "query") for image_path in image_paths])
+    embedded = np.array([embedding is not None for _, _, embedding in results], dtype=bool)
+    
+    if embedded.any():
+        embeddings = np.stack([embedding for _, _, embedding in results if embedding is not None])
+        top_labels[embedded], scores[embedded], accepted[embedded] = verify_embeddings(index, labels, embeddings, threshold)
+    
+    print(f"✅ {int(accepted.sum())} matched, {int(embedded.sum() - accepted.sum())} rejected, "
+          f"{int(n - embedded.sum())} without a usable face")
+    return top_labels, scores, accepted
+
+def verify_frame_faces(app, index, labels, frame, threshold, min_size=0):
+    """Verify every face in a frame with one embedding batch and one index search
+
+    Returns a FaceVerificationResult per detected face, largest first, each carrying
+    its bounding box and detection score.
+    """
+    faces = process_frame_faces(app, frame, min_size)
+    if not faces:
+        return []
+    
+    top_labels, scores, accepted = verify_embeddings(index, labels, [face.embedding for face in faces], threshold)
+    timestamp = datetime.now().isoformat()
+    
+    return [FaceVerificationResult(identity=top_labels[i] if accepted[i] else None, confidence=float(scores[i]),
+                                   success=bool(accepted[i]), timestamp=timestamp,
+                                   box=face.box, det_score=face.det_score)
+            for i, face in enumerate(faces)]
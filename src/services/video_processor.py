@@ -0,0 +1,212 @@
+"""Offline verification of recorded video footage"""
+import os
+import json
+import time
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import cv2
+from config.config import video_config
+from src.core.embedding_service import init_insightface
+from src.core.image_processor import process_frames_faces, warm_up_detector
+from src.services.verification_service import verify_embeddings
+from src.services.ingestion_engine import resolve_num_workers, worker_threads, limit_worker_threads
+from src.utils.metrics import stage
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# InsightFace session owned by each pool worker (set by _init_worker)
+_worker_app = None
+
+def _init_worker(threads):
+    """Load one InsightFace/ONNX session per worker process"""
+    global _worker_app
+    limit_worker_threads(threads)
+    _worker_app = init_insightface()
+    warm_up_detector()
+
+def _worker_detect(frames, min_size):
+    return process_frames_faces(_worker_app, frames, min_size)
+
+def video_info(video_path):
+    """Return {'fps', 'frame_count', 'duration_s', 'width', 'height'} read from the container"""
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        return {
+            'fps': fps,
+            'frame_count': frame_count,
+            'duration_s': frame_count / fps if fps > 0 else 0.0,
+            'width': int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        capture.release()
+
+def iter_video_frames(video_path, sample_every=1, sample_interval=0.0):
+    """Yield (frame_index, timestamp_s, frame) for the sampled frames of a video
+    
+    Frames are taken every `sample_every` frames, or every `sample_interval` seconds
+    when that is positive. Skipped frames are only grabbed, not converted to BGR
+    images, and nothing is held beyond the current frame.
+    """
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    sample_every = max(1, int(sample_every))
+    next_timestamp = 0.0
+    
+    try:
+        for frame_index in itertools.count():
+            with stage("decode"):
+                if not capture.grab():
+                    return
+            timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if timestamp <= 0 and frame_index > 0 and fps > 0:
+                timestamp = frame_index / fps
+            
+            if sample_interval > 0:
+                if timestamp + 1e-6 < next_timestamp:
+                    continue
+                next_timestamp += sample_interval * max(1, int((timestamp - next_timestamp) / sample_interval) + 1)
+            elif frame_index % sample_every:
+                continue
+            
+            with stage("decode"):
+                ok, frame = capture.retrieve()
+            if ok:
+                yield frame_index, timestamp, frame
+    finally:
+        capture.release()
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def timecode(seconds):
+    """Seconds -> "HH:MM:SS.mmm" """
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    return f"{hours:02d}:{minutes:02d}:{millis / 1000:06.3f}"
+
+def _match_records(video_path, metas, faces_per_frame, index, labels, threshold, include_unknown):
+    """Verify every face of a batch with one index search; returns JSON-ready records"""
+    flat = [(meta, face) for meta, faces in zip(metas, faces_per_frame) for face in faces]
+    if not flat:
+        return []
+    top_labels, scores, accepted = verify_embeddings(index, labels, [face.embedding for _, face in flat], threshold)
+    
+    records = []
+    for i, ((frame_index, timestamp), face) in enumerate(flat):
+        if not accepted[i] and not include_unknown:
+            continue
+        records.append({
+            'video': os.path.basename(video_path),
+            'frame': frame_index,
+            'timestamp_s': round(timestamp, 3),
+            'timecode': timecode(timestamp),
+            'identity': top_labels[i] if accepted[i] else None,
+            'score': round(float(scores[i]), 4),
+            'box': [int(v) for v in face.box],
+            'det_score': round(float(face.det_score), 4),
+        })
+    return records
+
+def process_video(app, index, labels, video_path, output_path, threshold, sample_every=None, sample_interval=None,
+                  batch_size=None, num_workers=None, min_size=0, include_unknown=None):
+    """Scan a video for enrolled identities, appending one JSON line per matched face to output_path
+    
+    Sampled frames are decoded here and detected/embedded in batches, either in-process
+    (num_workers <= 1, using app) or by worker processes that each load their own
+    InsightFace session. At most num_workers * max_pending_batches batches are in flight,
+    and results are written as each batch finishes, in frame order, so memory stays flat
+    however long the video is. A batch that fails to detect or embed is logged and
+    counted in failed_frames, and the scan moves on; only a dead worker pool stops it.
+    Returns a stats dict.
+    """
+    sample_every = video_config.sample_every if sample_every is None else sample_every
+    sample_interval = video_config.sample_interval if sample_interval is None else sample_interval
+    batch_size = max(1, batch_size or video_config.batch_size)
+    include_unknown = video_config.include_unknown if include_unknown is None else include_unknown
+    num_workers = resolve_num_workers(video_config.num_workers if num_workers is None else num_workers)
+    
+    stats = {'frames_processed': 0, 'failed_frames': 0, 'faces': 0, 'matches': 0, 'last_timestamp_s': 0.0}
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    
+    with open(output_path, 'a', encoding='utf-8') as output:
+        def write(metas, faces_per_frame):
+            records = _match_records(video_path, metas, faces_per_frame, index, labels, threshold, include_unknown)
+            for record in records:
+                output.write(json.dumps(record) + "\n")
+            output.flush()
+            stats['frames_processed'] += len(metas)
+            stats['faces'] += sum(len(faces) for faces in faces_per_frame)
+            stats['matches'] += sum(1 for record in records if record['identity'] is not None)
+            stats['last_timestamp_s'] = metas[-1][1]
+        
+        def skip(metas, error):
+            log.error("Skipping frames %d-%d of %s: %s", metas[0][0], metas[-1][0], os.path.basename(video_path),
+                      error)
+            stats['failed_frames'] += len(metas)
+            stats['last_timestamp_s'] = metas[-1][1]
+        
+        def drain(metas, future):
+            try:
+                faces_per_frame = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                skip(metas, e)
+                return
+            write(metas, faces_per_frame)
+        
+        batches = _batches(iter_video_frames(video_path, sample_every, sample_interval), batch_size)
+        if num_workers <= 1:
+            for batch in batches:
+                metas = [(i, ts) for i, ts, _ in batch]
+                try:
+                    faces_per_frame = process_frames_faces(app, [frame for _, _, frame in batch], min_size)
+                except Exception as e:
+                    skip(metas, e)
+                    continue
+                write(metas, faces_per_frame)
+        else:
+            log.info("Processing %s with %d worker processes (batch size %d)", os.path.basename(video_path),
+                     num_workers, batch_size)
+            context = multiprocessing.get_context("spawn")
+            window = num_workers * max(1, video_config.max_pending_batches)
+            pending = deque()
+            with ProcessPoolExecutor(max_workers=num_workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(worker_threads(num_workers),)) as pool:
+                for batch in batches:
+                    pending.append(([(i, ts) for i, ts, _ in batch],
+                                    pool.submit(_worker_detect, [frame for _, _, frame in batch], min_size)))
+                    if len(pending) >= window:
+                        drain(*pending.popleft())
+                while pending:
+                    drain(*pending.popleft())
+    
+    elapsed = time.perf_counter() - start
+    stats.update({
+        'video': video_path,
+        'output': output_path,
+        'elapsed_s': elapsed,
+        'frames_per_second': stats['frames_processed'] / elapsed if elapsed > 0 else 0.0,
+        'realtime_factor': stats['last_timestamp_s'] / elapsed if elapsed > 0 else 0.0,
+    })
+    log.info("Processed %s: %d frames, %d faces, %d matches in %.1fs", os.path.basename(video_path),
+             stats['frames_processed'], stats['faces'], stats['matches'], elapsed, extra=dict(stats))
+    return stats
@@ -0,0 +1,152 @@
+"""Benchmark measurement, synthetic data and regression checks"""
+import gc
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+import cv2
+import numpy as np
+
+# Metrics where larger is worse; throughput is the only larger-is-better metric
+LATENCY_METRICS = ('p50_ms', 'p99_ms')
+THROUGHPUT_METRIC = 'throughput_per_s'
+
+def peak_rss_mb():
+    """Process high-water resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def percentiles(timings_s):
+    """Latency summary in milliseconds for a list of per-call durations in seconds"""
+    ms = np.asarray(timings_s, dtype='float64') * 1000
+    return {
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p90_ms': float(np.percentile(ms, 90)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'mean_ms': float(ms.mean()),
+        'min_ms': float(ms.min()),
+        'max_ms': float(ms.max()),
+    }
+
+def measure(fn, iterations=50, warmup=3, items_per_call=1, min_seconds=0.0):
+    """Time fn() repeatedly and report latency percentiles, throughput and peak memory
+    
+    Timing runs without tracemalloc (it slows allocation-heavy code); one extra traced
+    call afterwards gives the peak Python/NumPy allocation of a single call. Native
+    allocations (FAISS, ONNX Runtime) only show up in the process RSS high-water mark.
+    """
+    for _ in range(warmup):
+        fn()
+    gc.collect()
+    
+    timings = []
+    start = time.perf_counter()
+    while len(timings) < iterations or time.perf_counter() - start < min_seconds:
+        call_start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - call_start)
+    total = time.perf_counter() - start
+    
+    tracemalloc.start()
+    fn()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    result = percentiles(timings)
+    result.update({
+        'iterations': len(timings),
+        'items_per_call': items_per_call,
+        'throughput_per_s': len(timings) * items_per_call / total if total > 0 else 0.0,
+        'peak_traced_mb': traced_peak / (1024 * 1024),
+        'peak_rss_mb': peak_rss_mb(),
+    })
+    return result
+
+def random_gallery(size, dimension=512, identities=None, seed=0, chunk=100_000):
+    """L2-normalized random embeddings clustered around per-identity centres, with labels
+    
+    Generated in chunks so a 1M x 512 gallery never needs more than its own 2 GB.
+    """
+    rng = np.random.default_rng(seed)
+    identities = identities or max(1, size // 10)
+    centres = rng.standard_normal((identities, dimension), dtype=np.float32)
+    owners = rng.integers(0, identities, size)
+    
+    embeddings = np.empty((size, dimension), dtype=np.float32)
+    for start in range(0, size, chunk):
+        end = min(start + chunk, size)
+        block = centres[owners[start:end]] + rng.standard_normal((end - start, dimension), dtype=np.float32) * 0.7
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        embeddings[start:end] = block
+    labels = np.array([f"person_{i:07d}" for i in owners])
+    return embeddings, labels
+
+def random_queries(embeddings, count, seed=1, noise=0.3):
+    """Noisy copies of gallery rows, as a probe set with known ground truth"""
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(embeddings), count)
+    queries = embeddings[rows] + rng.standard_normal((count, embeddings.shape[1]), dtype=np.float32) * noise / np.sqrt(embeddings.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+def synthetic_face_image(seed=0, size=(480, 640)):
+    """Draw a frontal cartoon face on a noisy background (BGR); good enough to exercise the detector"""
+    rng = np.random.default_rng(seed)
+    h, w = size
+    img = rng.integers(40, 90, (h, w, 3), dtype=np.uint8)
+    cx, cy = w // 2 + int(rng.integers(-w // 8, w // 8)), h // 2 + int(rng.integers(-h // 10, h // 10))
+    fw, fh = w // 7, h // 4
+    skin = tuple(int(v) for v in rng.integers(120, 220, 3))
+    cv2.ellipse(img, (cx, cy), (fw, fh), 0, 0, 360, skin, -1)
+    for dx in (-fw // 2, fw // 2):
+        cv2.ellipse(img, (cx + dx, cy - fh // 4), (fw // 6, fh // 12), 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(img, (cx + dx, cy - fh // 4), fh // 16, (30, 20, 20), -1)
+        cv2.line(img, (cx + dx - fw // 5, cy - fh // 2), (cx + dx + fw // 5, cy - fh // 2 - 4), (40, 30, 30), 3)
+    cv2.line(img, (cx, cy - fh // 8), (cx - fw // 10, cy + fh // 6), (90, 70, 70), 2)
+    cv2.ellipse(img, (cx, cy + fh // 2), (fw // 3, fh // 10), 0, 0, 180, (60, 40, 150), 3)
+    return img
+
+def synthetic_chips(count, seed=0, image_size=112):
+    """Aligned-chip-sized crops of synthetic faces for recognition-only timing"""
+    return [cv2.resize(synthetic_face_image(seed + i, (240, 240))[30:210, 30:210], (image_size, image_size))
+            for i in range(count)]
+
+def write_synthetic_dataset(root, people=5, images_per_person=4, seed=0):
+    """Write a dataset/ tree of synthetic faces (one folder per person); returns the image count"""
+    count = 0
+    for person in range(people):
+        folder = os.path.join(root, f"synthetic_{person:03d}")
+        os.makedirs(folder, exist_ok=True)
+        for i in range(images_per_person):
+            cv2.imwrite(os.path.join(folder, f"{i:03d}.jpg"), synthetic_face_image(seed + person * 1000 + i))
+            count += 1
+    return count
+
+def compare_results(baseline, current, threshold=0.10):
+    """Compare two benchmark result dicts; returns a list of regression descriptions
+    
+    A benchmark regresses when p50 or p99 latency grows, or throughput drops, by more
+    than `threshold` (a fraction). Benchmarks present in only one run are ignored.
+    """
+    regressions = []
+    for name, now in current.get('results', {}).items():
+        before = baseline.get('results', {}).get(name)
+        if not before or 'error' in now or 'error' in before:
+            continue
+        for metric in LATENCY_METRICS:
+            if before.get(metric, 0) > 0 and now[metric] > before[metric] * (1 + threshold):
+                regressions.append(f"{name}: {metric} {before[metric]:.3f} -> {now[metric]:.3f} "
+                                   f"(+{(now[metric] / before[metric] - 1) * 100:.1f}%)")
+        if before.get(THROUGHPUT_METRIC, 0) > 0 and now[THROUGHPUT_METRIC] < before[THROUGHPUT_METRIC] * (1 - threshold):
+            regressions.append(f"{name}: {THROUGHPUT_METRIC} {before[THROUGHPUT_METRIC]:.1f} -> "
+                               f"{now[THROUGHPUT_METRIC]:.1f} ({(now[THROUGHPUT_METRIC] / before[THROUGHPUT_METRIC] - 1) * 100:.1f}%)")
+    return regressions
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
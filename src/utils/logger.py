@@ -1,18 +1,176 @@
-"""Logging configuration"""
+"""Logging configuration
+
+Every module logs through a child of the "face_verification" logger:
+    
+    from src.utils.logger import get_logger
+    log = get_logger(__name__)
+    log.warning("No face detected: %s", name)
+
+Records are put on a bounded queue and written by a background listener thread, so a
+slow terminal or log file never blocks inference (records are dropped and counted
+when the queue is full). Repeats of the same message template are rate limited, and
+per-item debug records marked with extra={"sampled": True} are sampled. The level
+and format come from LoggingConfig and can be overridden with the LOG_LEVEL and
+LOG_FORMAT environment variables, or at runtime with set_level().
+"""
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from config.config import logging_config
+
+ROOT_LOGGER = 'face_verification'
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sampled'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message plus any extra fields"""
+    
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    """Let through `burst` records per message template every `interval` seconds
+    
+    The next record let through after suppression carries a `suppressed` count, so
+    nothing disappears silently. A failing camera logs a handful of errors per
+    interval instead of one per frame.
+    """
+    
+    def __init__(self, interval=10.0, burst=5):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.windows = {}
+        self.lock = threading.Lock()
+    
+    def filter(self, record):
+        if self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            start, count, suppressed = self.windows.get(key, (now, 0, 0))
+            if now - start >= self.interval:
+                start, count = now, 0
+            if count >= self.burst:
+                self.windows[key] = (start, count, suppressed + 1)
+                return False
+            self.windows[key] = (start, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep one in every `every` records flagged extra={"sampled": True}, per message template"""
+    
+    def __init__(self, every=100):
+        super().__init__()
+        self.every = max(1, int(every))
+        self.counts = {}
+        self.lock = threading.Lock()
+    
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or self.every == 1:
+            return True
+        key = (record.name, str(record.msg))
+        with self.lock:
+            count = self.counts.get(key, 0)
+            self.counts[key] = count + 1
+        if count % self.every:
+            return False
+        record.sample_every = self.every
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener = None
 
-def setup_logger(name='face_verification', level=logging.INFO):
+def _build_output_handlers(config):
+    log_format = os.environ.get('LOG_FORMAT', config.format)
+    formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if config.file:
+        os.makedirs(os.path.dirname(config.file) or '.', exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            config.file, maxBytes=config.file_max_bytes, backupCount=config.file_backups, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+def setup_logger(name=ROOT_LOGGER, level=None, config=None):
+    """Configure the root application logger once; later calls just return it"""
+    global _listener
+    config = config or logging_config
     logger = logging.getLogger(name)
-    logger.setLevel(level)
+    if getattr(logger, '_face_configured', False):
+        return logger
+    
+    level = level or os.environ.get('LOG_LEVEL') or config.level
+    logger.setLevel(level if isinstance(level, int) else str(level).upper())
+    logger.propagate = False
     
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.queue_size))
+    queue_handler.addFilter(SamplingFilter(config.sample_every))
+    queue_handler.addFilter(RateLimitFilter(config.rate_limit_interval, config.rate_limit_burst))
+    logger.addHandler(queue_handler)
     
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *_build_output_handlers(config),
+                                               respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    logger._face_configured = True
     return logger
 
-logger = setup_logger()
\ No newline at end of file
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def get_logger(name=None):
+    """Return the application logger or a child of it (pass __name__)"""
+    if not name or name == ROOT_LOGGER:
+        return logger
+    return logger.getChild(name)
+
+def set_level(level):
+    """Change verbosity at runtime, e.g. set_level("DEBUG") while diagnosing a camera"""
+    logger.setLevel(level if isinstance(level, int) else str(level).upper())
+
+def dropped_records():
+    """Records dropped because the log queue was full"""
+    return sum(getattr(handler, 'dropped', 0) for handler in logger.handlers)
+
+logger = setup_logger()
@@ -0,0 +1,207 @@
+"""Stage timers, counters and Prometheus text export
+
+Usage on a hot path:
+
+    with stage("detect"):
+        faces = RetinaFace.detect_faces(img)
+    inc("face_faces_found_total", len(faces))
+
+When metrics are disabled `stage` returns a shared no-op context manager and `inc`
+returns immediately, so instrumented code pays one attribute check per call.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.config import metrics_config
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_HISTOGRAM = "face_stage_duration_seconds"
+COUNTERS = {
+    "face_images_processed_total": "Images or frames run through face detection",
+    "face_faces_found_total": "Faces found by the detector",
+    "face_matches_total": "Verifications accepted at the threshold",
+    "face_rejections_total": "Verifications rejected at the threshold",
+}
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    """Monotonic counter, optionally split by label values"""
+    
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+    
+    def inc(self, value=1, label_values=()):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + value
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram in seconds, optionally split by label values"""
+    
+    def __init__(self, name, help_text, buckets, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = tuple(label_names)
+        self.series = {}
+        self.lock = threading.Lock()
+    
+    def observe(self, value, label_values=()):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += 1
+            series[2] += value
+    
+    def summary(self):
+        """Return {label_values: (count, mean_seconds)}"""
+        with self.lock:
+            return {label_values: (count, total / count if count else 0.0)
+                    for label_values, (_, count, total) in self.series.items()}
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for label_values, (bucket_counts, count, total) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.label_names, label_values, ("le", repr(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, label_values, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, label_values)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, label_values)} {total!r}")
+        return lines
+
+class MetricsRegistry:
+    """Per-process collection of the pipeline's stage histogram and counters"""
+    
+    def __init__(self, enabled=False, stage_buckets=None):
+        self.enabled = enabled
+        self.stages = Histogram(STAGE_HISTOGRAM, "Time spent in each pipeline stage",
+                                stage_buckets or metrics_config.stage_buckets, ("stage",))
+        self.counters = {name: Counter(name, help_text) for name, help_text in COUNTERS.items()}
+    
+    def counter(self, name):
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters.setdefault(name, Counter(name, name.replace("_", " ")))
+        return counter
+    
+    def reset(self):
+        self.__init__(self.enabled, self.stages.buckets)
+    
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = self.stages.render()
+        for name in sorted(self.counters):
+            lines.extend(self.counters[name].render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry(enabled=metrics_config.enabled)
+
+class _NoopStage:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_STAGE = _NoopStage()
+
+class _StageTimer:
+    __slots__ = ("name", "start")
+    
+    def __init__(self, name):
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        registry.stages.observe(time.perf_counter() - self.start, (self.name,))
+        return False
+
+def stage(name):
+    """Time a block as pipeline stage `name` (decode, color_convert, detect, crop, embed, normalize, search)"""
+    if not registry.enabled:
+        return _NOOP_STAGE
+    return _StageTimer(name)
+
+def inc(name, value=1):
+    """Add to one of the COUNTERS"""
+    if not registry.enabled or not value:
+        return
+    registry.counter(name).inc(value)
+
+def record_decisions(matches, rejections):
+    """Count accepted and rejected verifications"""
+    if not registry.enabled:
+        return
+    inc("face_matches_total", int(matches))
+    inc("face_rejections_total", int(rejections))
+
+def set_enabled(enabled=True):
+    registry.enabled = enabled
+
+def render_prometheus():
+    return registry.render()
+
+def stage_summary():
+    """Return {stage: (calls, mean_ms)} for quick on-screen diagnostics"""
+    return {label_values[0]: (count, mean * 1000) for label_values, (count, mean) in registry.stages.summary().items()}
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port=None, host="0.0.0.0"):
+    """Serve /metrics for Prometheus from a daemon thread; returns the server"""
+    port = metrics_config.port if port is None else port
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    log.info("Metrics endpoint: http://%s:%s/metrics", host, server.server_address[1])
+    return server
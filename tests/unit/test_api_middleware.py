@@ -0,0 +1,60 @@
+"""Unit tests for the HTTP timing and limit middleware"""
+import asyncio
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from fastapi.testclient import TestClient
+from src.api.middleware import TimingMiddleware, LimitMiddleware
+
+def _app(max_body_bytes=16, max_concurrent=4, release=None):
+    """Echo app that reports the body size; waits on `release` when given"""
+    async def echo(request):
+        body = await request.body()
+        if release is not None:
+            await release.wait()
+        return JSONResponse({"size": len(body)})
+    
+    app = Starlette(routes=[Route("/", echo, methods=["POST"])])
+    app.add_middleware(LimitMiddleware, max_body_bytes=max_body_bytes, max_concurrent=max_concurrent)
+    app.add_middleware(TimingMiddleware)
+    return app
+
+def test_timing_header_on_every_response():
+    """Test X-Process-Time is added to both normal and rejected responses"""
+    client = TestClient(_app())
+    ok = client.post("/", content=b"small")
+    rejected = client.post("/", content=b"x" * 17)
+    
+    assert ok.json() == {"size": 5}
+    assert float(ok.headers["x-process-time"]) >= 0
+    assert "x-process-time" in rejected.headers
+
+def test_body_over_limit_is_rejected():
+    """Test 413 both from Content-Length and from a chunked body that grows past the limit"""
+    client = TestClient(_app())
+    declared = client.post("/", content=b"x" * 17)
+    chunked = client.post("/", content=iter([b"x" * 10, b"x" * 10]))
+    
+    assert declared.status_code == 413
+    assert chunked.status_code == 413
+    assert client.post("/", content=b"x" * 16).status_code == 200
+
+def test_requests_beyond_concurrency_limit_get_503():
+    """Test a request arriving while max_concurrent are in flight is shed, and the slot is freed afterwards"""
+    async def scenario():
+        release = asyncio.Event()
+        transport = httpx.ASGITransport(app=_app(max_concurrent=1, release=release))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(client.post("/", content=b"a"))
+            await asyncio.sleep(0.05)
+            busy = await client.post("/", content=b"b")
+            release.set()
+            return busy, await first, await client.post("/", content=b"c")
+    
+    busy, first, after = asyncio.run(scenario())
+    
+    assert busy.status_code == 503
+    assert busy.headers["retry-after"] == "1"
+    assert first.status_code == 200
+    assert after.status_code == 200
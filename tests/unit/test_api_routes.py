@@ -0,0 +1,118 @@
+"""Unit tests for the HTTP verification service"""
+import pytest
+import cv2
+import numpy as np
+from fastapi.testclient import TestClient
+from src.api import routes
+from src.services.index_manager import build_index
+from src.models.data_models import DetectedFace
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """API client over a three-person gallery where the image's mean pixel picks the embedding"""
+    gallery = np.eye(3, 512, dtype='float32')
+    labels = np.array(['alice', 'bob', 'carol'])
+    
+    def fake_load(cls, model_path=None):
+        return cls(None, gallery, labels, build_index(gallery), 0.6, str(tmp_path / "model.json"))
+    
+    def fake_embed_images(app, images):
+        return [gallery[int(img.mean()) % 3] if img.mean() < 250 else None for img in images]
+    
+    def fake_process_frame_faces(app, img):
+        return [DetectedFace(box=(0, 0, 16, 16), det_score=0.9, embedding=gallery[int(img.mean()) % 3]),
+                DetectedFace(box=(16, 0, 32, 16), det_score=0.8, embedding=np.ones(512, dtype='float32') / np.sqrt(512))]
+    
+    monkeypatch.setattr(routes.GalleryState, "load", classmethod(fake_load))
+    monkeypatch.setattr(routes, "embed_images", fake_embed_images)
+    monkeypatch.setattr(routes, "process_frame_faces", fake_process_frame_faces)
+    with TestClient(routes.create_app()) as test_client:
+        yield test_client
+
+def _png(value):
+    return cv2.imencode('.png', np.full((32, 32, 3), value, dtype=np.uint8))[1].tobytes()
+
+def test_verify_raw_bytes_and_upload(client):
+    """Test verification accepts both a raw body and a multipart upload"""
+    raw = client.post("/verify", content=_png(1), headers={"content-type": "application/octet-stream"})
+    upload = client.post("/verify", files={"file": ("face.png", _png(2), "image/png")})
+    
+    assert raw.json()["identity"] == "bob"
+    assert upload.json()["identity"] == "carol"
+    assert "x-process-time" in raw.headers
+
+def test_enroll_matches_and_delete(client):
+    """Test enrolling, searching and deleting an identity"""
+    enrolled = client.post("/identities/dave", files=[("files", ("a.png", _png(0), "image/png"))])
+    assert enrolled.json()["gallery_size"] == 4
+    
+    matches = client.post("/matches?k=2", content=_png(0)).json()["matches"]
+    assert {match["label"] for match in matches} == {"alice", "dave"}
+    
+    assert client.delete("/identities/dave").json()["gallery_size"] == 3
+    assert client.delete("/identities/dave").status_code == 404
+
+def test_no_face_and_bad_image(client):
+    """Test images without a face and undecodable bodies"""
+    assert client.post("/verify", content=_png(255)).json()["face_found"] is False
+    assert client.post("/verify", content=b"not an image").status_code == 400
+
+def test_verify_all_faces(client):
+    """Test multi-face verification returns every face with its box"""
+    faces = client.post("/verify/faces", content=_png(1)).json()["faces"]
+    
+    assert [face["identity"] for face in faces] == ["bob", None]
+    assert faces[1]["box"] == [16, 0, 32, 16]
+
+def test_shared_gallery_sees_other_workers_enrollments(monkeypatch):
+    """Test two API apps over one shared store see each other's enrollments and deletes"""
+    from src.services.vector_store import FaissVectorStore
+    
+    gallery = np.eye(3, 512, dtype='float32')
+    store = FaissVectorStore()
+    
+    def fake_load(cls, model_path=None):
+        return routes.SharedGalleryState.connect(None, gallery[:2], np.array(['alice', 'bob']), 0.6, store=store)
+    
+    monkeypatch.setattr(routes.GalleryState, "load", classmethod(fake_load))
+    monkeypatch.setattr(routes, "embed_images", lambda app, images: [gallery[int(img.mean()) % 3] for img in images])
+    with TestClient(routes.create_app()) as worker_a, TestClient(routes.create_app()) as worker_b:
+        assert worker_b.get("/health").json()["gallery_size"] == 2
+        worker_a.post("/identities/carol", content=_png(2))
+        
+        assert worker_b.post("/verify", content=_png(2)).json()["identity"] == "carol"
+        assert worker_b.delete("/identities/carol").status_code == 200
+        assert worker_a.post("/verify", content=_png(2)).json()["success"] is False
+        assert worker_a.get("/health").json()["identities"] == 2
+
+def test_shared_gallery_health_does_not_rescan_store(monkeypatch):
+    """Test /health reuses the cached identity count until the store changes"""
+    from src.services.vector_store import FaissVectorStore
+    
+    gallery = np.eye(3, 512, dtype='float32')
+    store = FaissVectorStore()
+    scans = []
+    scan = store.identities
+    monkeypatch.setattr(store, "identities", lambda: scans.append(1) or scan())
+    
+    def fake_load(cls, model_path=None):
+        return routes.SharedGalleryState.connect(None, gallery[:2], np.array(['alice', 'bob']), 0.6, store=store)
+    
+    monkeypatch.setattr(routes.GalleryState, "load", classmethod(fake_load))
+    monkeypatch.setattr(routes, "embed_images", lambda app, images: [gallery[int(img.mean()) % 3] for img in images])
+    with TestClient(routes.create_app()) as client:
+        assert [client.get("/health").json()["identities"] for _ in range(3)] == [2, 2, 2]
+        client.post("/identities/carol", content=_png(2))
+        assert client.get("/health").json()["identities"] == 3
+        store.upsert(["dave/0"], ["dave"], gallery[:1])
+        assert client.get("/health").json()["identities"] == 4
+    
+    assert len(scans) == 2
+
+def test_metrics_endpoint_serves_prometheus_text(client):
+    """Test /metrics responds in the Prometheus text format"""
+    response = client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "face_stage_duration_seconds" in response.text
@@ -0,0 +1,63 @@
+"""Unit tests for the embedding micro-batcher"""
+import threading
+import pytest
+import numpy as np
+import gc
+from src.core.batch_scheduler import EmbeddingBatcher, get_batcher, active_batcher, close_batcher
+
+class FakeRecognition:
+    def __init__(self):
+        self.batch_sizes = []
+    
+    def get_feat(self, imgs):
+        self.batch_sizes.append(len(imgs))
+        return np.stack([np.eye(512, dtype='float32')[int(img.mean())] * 3 for img in imgs])
+
+class FakeApp:
+    def __init__(self):
+        self.models = {'recognition': FakeRecognition()}
+
+def test_concurrent_callers_share_batches():
+    """Test chips from many threads are merged and each caller gets its own embedding"""
+    app = FakeApp()
+    batcher = EmbeddingBatcher(app, max_batch_size=8, max_wait_ms=50)
+    results = {}
+    
+    def caller(i):
+        results[i] = batcher.embed(np.full((112, 112, 3), i, dtype=np.uint8))
+    
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert sorted(results) == list(range(16))
+    assert all(int(np.argmax(results[i])) == i for i in results)
+    assert all(np.linalg.norm(results[i]) == pytest.approx(1.0) for i in results)
+    assert max(app.models['recognition'].batch_sizes) > 1
+    assert max(app.models['recognition'].batch_sizes) <= 8
+
+def test_batcher_thread_exits_with_its_app():
+    """Test the registry does not keep an app alive, and its batcher thread stops once the app is gone"""
+    app = FakeApp()
+    worker = get_batcher(app).worker
+    del app
+    gc.collect()
+    worker.join(timeout=2.0)
+    
+    assert not worker.is_alive()
+
+def test_close_batcher_drains_and_falls_back_to_direct_calls():
+    """Test close_batcher finishes queued chips, stops the thread and unregisters the app"""
+    app = FakeApp()
+    batcher = get_batcher(app)
+    future = batcher.submit(np.full((112, 112, 3), 3, dtype=np.uint8))
+    close_batcher(app)
+    batcher.worker.join(timeout=2.0)
+    
+    assert int(np.argmax(future.result())) == 3
+    assert not batcher.worker.is_alive()
+    assert active_batcher(app) is None
+    with pytest.raises(RuntimeError):
+        batcher.submit(np.zeros((112, 112, 3), dtype=np.uint8))
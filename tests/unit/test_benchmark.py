@@ -0,0 +1,37 @@
+"""Unit tests for the benchmark harness"""
+import pytest
+import numpy as np
+from src.utils.benchmark import measure, random_gallery, compare_results
+
+def test_measure_reports_percentiles_and_throughput():
+    """Test every call is timed and throughput counts items per call"""
+    calls = []
+    
+    result = measure(lambda: calls.append(1), iterations=20, warmup=2, items_per_call=4)
+    
+    assert len(calls) == 2 + 20 + 1
+    assert result['iterations'] == 20
+    assert result['p50_ms'] <= result['p99_ms'] <= result['max_ms']
+    assert result['throughput_per_s'] > 0
+
+def test_random_gallery_is_normalized_and_reproducible():
+    """Test synthetic galleries are unit vectors and identical for the same seed"""
+    embeddings, labels = random_gallery(250, dimension=64, seed=3, chunk=100)
+    again, _ = random_gallery(250, dimension=64, seed=3, chunk=100)
+    
+    assert embeddings.shape == (250, 64) and len(labels) == 250
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-5)
+    assert np.array_equal(embeddings, again)
+
+def test_compare_results_flags_slowdowns_beyond_threshold():
+    """Test latency growth and throughput drops beyond the threshold are regressions"""
+    baseline = {'results': {'search/a': {'p50_ms': 1.0, 'p99_ms': 2.0, 'throughput_per_s': 100.0},
+                            'search/b': {'p50_ms': 1.0, 'p99_ms': 2.0, 'throughput_per_s': 100.0}}}
+    current = {'results': {'search/a': {'p50_ms': 1.05, 'p99_ms': 2.1, 'throughput_per_s': 95.0},
+                           'search/b': {'p50_ms': 1.5, 'p99_ms': 2.0, 'throughput_per_s': 70.0},
+                           'search/new': {'p50_ms': 9.0, 'p99_ms': 9.0, 'throughput_per_s': 1.0}}}
+    
+    regressions = compare_results(baseline, current, threshold=0.10)
+    
+    assert len(regressions) == 2
+    assert all(regression.startswith('search/b') for regression in regressions)
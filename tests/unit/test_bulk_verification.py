@@ -0,0 +1,148 @@
+"""Unit tests for bulk verification"""
+import csv
+import json
+import numpy as np
+import pytest
+from src.services import bulk_verification
+from src.services.bulk_verification import bulk_verify, completed_inputs, iter_manifest_inputs
+from src.services.index_manager import build_index
+
+def unit(i):
+    vector = np.zeros(512, dtype='float32')
+    vector[i] = 1.0
+    return vector
+
+@pytest.fixture
+def gallery():
+    return build_index(np.stack([unit(0), unit(1)]), "flat"), np.array(["alice", "bob"])
+
+@pytest.fixture
+def fake_embed(monkeypatch):
+    """Embed a query file from its text content: "alice", "bob", "stranger", "corrupt" (error) or nothing (no face)"""
+    calls = []
+    
+    def embed_batch_with_errors(app, items):
+        calls.append(len(items))
+        results, errors = [], []
+        for path, label in items:
+            try:
+                content = open(path).read().strip()
+            except OSError:
+                content = ""
+            if content == "corrupt":
+                errors.append(path)
+            embedding = {"alice": unit(0), "bob": unit(1), "stranger": unit(2)}.get(content)
+            results.append((path, label, embedding))
+        return results, errors
+    
+    monkeypatch.setattr(bulk_verification, "embed_batch_with_errors", embed_batch_with_errors)
+    return calls
+
+def write_queries(folder, contents):
+    folder.mkdir(parents=True, exist_ok=True)
+    for name, content in contents.items():
+        (folder / name).write_text(content)
+
+def test_folder_results_stream_to_jsonl_with_top_k(tmp_path, gallery, fake_embed):
+    """Test every image gets a record with status, identity and top-k matches, searched in batches"""
+    write_queries(tmp_path / "queries", {"a.jpg": "alice", "b.jpg": "bob", "c.jpg": "stranger", "d.jpg": ""})
+    index, labels = gallery
+    output = tmp_path / "results.jsonl"
+    
+    stats = bulk_verify(None, index, labels, str(tmp_path / "queries"), str(output), 0.5, top_k=2,
+                        num_workers=1, batch_size=3)
+    records = {record['input']: record for record in map(json.loads, output.read_text().splitlines())}
+    
+    assert fake_embed == [3, 1]
+    assert records["a.jpg"]['status'] == "match" and records["a.jpg"]['identity'] == "alice"
+    assert [label for label, _ in records["b.jpg"]['matches']] == ["bob", "alice"]
+    assert records["c.jpg"]['status'] == "no_match" and records["c.jpg"]['identity'] is None
+    assert records["d.jpg"]['status'] == "no_face"
+    assert stats['processed'] == 4 and stats['match'] == 2
+
+def test_resume_skips_finished_inputs_and_repairs_torn_line(tmp_path, gallery, fake_embed):
+    """Test a rerun only verifies inputs missing from its own CSV output"""
+    write_queries(tmp_path / "queries", {"a.jpg": "alice", "b.jpg": "bob", "c.jpg": "stranger"})
+    index, labels = gallery
+    output = tmp_path / "results.csv"
+    
+    bulk_verify(None, index, labels, str(tmp_path / "queries"), str(output), 0.5, num_workers=1, batch_size=1)
+    lines = output.read_text().splitlines()
+    output.write_text("\n".join(lines[:2]) + "\n" + lines[2][:5])  # header, a.jpg, torn b.jpg
+    assert completed_inputs(str(output)) == {"a.jpg"}
+    
+    stats = bulk_verify(None, index, labels, str(tmp_path / "queries"), str(output), 0.5, num_workers=1,
+                        batch_size=1)
+    rows = list(csv.DictReader(output.open()))
+    
+    assert stats['skipped'] == 1 and stats['processed'] == 2
+    assert [row['input'] for row in rows] == ["a.jpg", "b.jpg", "c.jpg"]
+    assert rows[1]['matches'].startswith("bob:1.0000")
+
+def test_manifest_accepts_csv_and_plain_lists(tmp_path):
+    """Test both manifest styles resolve paths relative to the manifest"""
+    (tmp_path / "list.txt").write_text("# nightly\nimgs/a.jpg\n\nimgs/b.jpg\n")
+    (tmp_path / "list.csv").write_text("id,path\nevent-1,imgs/a.jpg\n")
+    
+    assert list(iter_manifest_inputs(str(tmp_path / "list.txt"))) == [
+        ("imgs/a.jpg", str(tmp_path / "imgs/a.jpg")), ("imgs/b.jpg", str(tmp_path / "imgs/b.jpg"))]
+    assert list(iter_manifest_inputs(str(tmp_path / "list.csv"))) == [("event-1", str(tmp_path / "imgs/a.jpg"))]
+
+def test_error_rows_are_retried_and_dead_pool_aborts(tmp_path, gallery, fake_embed, monkeypatch):
+    """Test a dead worker pool stops the run without error rows, and a rerun retries earlier errors"""
+    from concurrent.futures import Future
+    from concurrent.futures.process import BrokenProcessPool
+    
+    write_queries(tmp_path / "queries", {"a.jpg": "alice", "b.jpg": "bob", "c.jpg": "stranger"})
+    index, labels = gallery
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({'input': "c.jpg", 'status': "error", 'identity': None, 'score': None,
+                                  'matches': [], 'error': "boom"}) + "\n")
+    
+    class DyingPool:
+        """First batch succeeds, then the pool breaks as if a worker was OOM-killed"""
+        def __init__(self, **kwargs):
+            self.submitted = 0
+        
+        def __enter__(self):
+            return self
+        
+        def __exit__(self, *exc):
+            return False
+        
+        def submit(self, func, items):
+            future = Future()
+            if self.submitted == 0:
+                future.set_result(bulk_verification.embed_batch_with_errors(None, items))
+            else:
+                future.set_exception(BrokenProcessPool("worker died"))
+            self.submitted += 1
+            return future
+    
+    monkeypatch.setattr(bulk_verification, "ProcessPoolExecutor", DyingPool)
+    assert completed_inputs(str(output)) == set()
+    with pytest.raises(BrokenProcessPool):
+        bulk_verify(None, index, labels, str(tmp_path / "queries"), str(output), 0.5, num_workers=2, batch_size=1)
+    
+    written = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [(record['input'], record['status']) for record in written] == [("c.jpg", "error"), ("a.jpg", "match")]
+    
+    stats = bulk_verify(None, index, labels, str(tmp_path / "queries"), str(output), 0.5, num_workers=1,
+                        batch_size=1)
+    assert stats['skipped'] == 1 and stats['processed'] == 2 and stats['error'] == 0
+    assert completed_inputs(str(output)) == {"a.jpg", "b.jpg", "c.jpg"}
+
+def test_unreadable_images_are_errors_and_retried(tmp_path, gallery, fake_embed):
+    """Test images that fail to read or embed are written as errors, not no_face, and resume retries them"""
+    write_queries(tmp_path / "queries", {"a.jpg": "alice", "b.jpg": "corrupt", "c.jpg": ""})
+    index, labels = gallery
+    output = tmp_path / "results.jsonl"
+    
+    stats = bulk_verify(None, index, labels, str(tmp_path / "queries"), str(output), 0.5, num_workers=1)
+    records = {record['input']: record for record in map(json.loads, output.read_text().splitlines())}
+    
+    assert records["b.jpg"]['status'] == "error" and records["b.jpg"]['error']
+    assert records["c.jpg"]['status'] == "no_face"
+    assert stats['error'] == 1
+    assert completed_inputs(str(output)) == {"a.jpg", "c.jpg"}
+
@@ -0,0 +1,57 @@
+"""Unit tests for the embedding cache"""
+import pytest
+import cv2
+import numpy as np
+from src.services import ingestion_engine
+from src.services.dataset_loader import load_dataset
+from src.services.embedding_cache import EmbeddingCache
+
+def test_cache_hits_unchanged_files_and_evicts_deleted(tmp_path):
+    """Test cached embeddings survive a reload and deleted images are evicted"""
+    dataset = tmp_path / "dataset" / "alice"
+    dataset.mkdir(parents=True)
+    kept, removed = dataset / "a.jpg", dataset / "b.jpg"
+    kept.write_bytes(b"image-a")
+    removed.write_bytes(b"image-b")
+    items = [(str(kept), "alice"), (str(removed), "alice")]
+    
+    cache = EmbeddingCache(str(tmp_path / "cache.pkl"), "v1").load()
+    hits, missing = cache.lookup(items)
+    assert hits == {} and missing == items
+    cache.update({str(kept): np.ones(512, dtype='float32'), str(removed): None})
+    cache.save()
+    
+    removed.unlink()
+    cache = EmbeddingCache(str(tmp_path / "cache.pkl"), "v1").load()
+    hits, missing = cache.lookup(items[:1])
+    assert missing == [] and np.array_equal(hits[str(kept)], np.ones(512))
+    assert cache.evict(str(tmp_path / "dataset"), [str(kept)]) == 1
+    
+    other_version = EmbeddingCache(str(tmp_path / "cache.pkl"), "v2").load()
+    assert other_version.lookup(items[:1])[1] == items[:1]
+
+def test_failed_images_are_retried_but_no_face_is_cached(tmp_path, monkeypatch):
+    """Test an inference error is not cached while a real "no face" result is"""
+    person = tmp_path / "dataset" / "alice"
+    person.mkdir(parents=True)
+    cv2.imwrite(str(person / "face.png"), np.full((32, 32, 3), 10, dtype=np.uint8))
+    cv2.imwrite(str(person / "blank.png"), np.full((32, 32, 3), 200, dtype=np.uint8))
+    calls = []
+    
+    def fake_embed_images(app, images, errors=None):
+        # Blank images have no face; the first call fails for every face like a broken batch
+        calls.append(len(images))
+        faces = [slot for slot, img in enumerate(images) if img.mean() < 100]
+        if len(calls) == 1:
+            errors.extend(faces)
+            return [None] * len(images)
+        return [np.ones(512, dtype='float32') if slot in faces else None for slot in range(len(images))]
+    
+    monkeypatch.setattr(ingestion_engine, "embed_images", fake_embed_images)
+    paths = dict(num_workers=1, checkpoint_path=str(tmp_path / "ckpt.pkl"), cache_path=str(tmp_path / "cache.pkl"))
+    
+    assert load_dataset(None, str(tmp_path / "dataset"), **paths)[2] is False
+    embeddings, labels, success = load_dataset(None, str(tmp_path / "dataset"), **paths)
+    
+    assert success and list(labels) == ["alice"]
+    assert calls == [2, 1]
@@ -0,0 +1,18 @@
+"""Unit tests for embedding service"""
+import pytest
+import onnxruntime
+from config.config import RuntimeConfig
+from src.core.embedding_service import build_session_options
+
+def test_session_options_follow_runtime_config():
+    """Test RuntimeConfig maps onto ONNX Runtime session options"""
+    config = RuntimeConfig(intra_op_threads=2, inter_op_threads=1, graph_optimization="basic",
+                           execution_mode="parallel", enable_cpu_mem_arena=False)
+    
+    options = build_session_options(config)
+    
+    assert options.intra_op_num_threads == 2
+    assert options.inter_op_num_threads == 1
+    assert options.graph_optimization_level == onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    assert options.execution_mode == onnxruntime.ExecutionMode.ORT_PARALLEL
+    assert options.enable_cpu_mem_arena is False
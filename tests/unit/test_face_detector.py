@@ -14,4 +14,40 @@ def test_extract_face_valid():
     
     result = extract_face_from_retinaface(img_rgb, faces)
     assert result is not None
-    assert result.shape == (100, 100, 3)
\ No newline at end of file
+    assert result.shape == (100, 100, 3)
+def test_select_largest_face_returns_landmarks():
+    """Test the largest detection and its landmarks are selected"""
+    from src.core.face_detector import select_largest_face, extract_landmarks
+    
+    faces = {
+        'face_1': {'facial_area': [0, 0, 50, 50], 'landmarks': {}},
+        'face_2': {
+            'facial_area': [100, 100, 300, 300],
+            'landmarks': {
+                'right_eye': [150, 160], 'left_eye': [250, 160], 'nose': [200, 200],
+                'mouth_right': [160, 250], 'mouth_left': [240, 250]
+            }
+        }
+    }
+    
+    box, face_data = select_largest_face((480, 640, 3), faces)
+    landmarks = extract_landmarks(face_data)
+    
+    assert box == (100, 100, 300, 300)
+    assert landmarks.shape == (5, 2)
+    assert landmarks[0].tolist() == [150, 160]
+
+def test_select_all_faces_largest_first():
+    """Test every valid detection is kept, largest first, and tiny faces are dropped"""
+    from src.core.face_detector import select_all_faces
+    
+    faces = {
+        'face_1': {'facial_area': [0, 0, 50, 50]},
+        'face_2': {'facial_area': [100, 100, 300, 300]},
+        'face_3': {'facial_area': [400, 10, 410, 20]},
+        'face_4': {'facial_area': [700, 700, 800, 800]}
+    }
+    
+    selected = select_all_faces((480, 640, 3), faces, min_size=20)
+    
+    assert [box for box, _ in selected] == [(100, 100, 300, 300), (0, 0, 50, 50)]
@@ -0,0 +1,77 @@
+"""Unit tests for face tracking"""
+import pytest
+import numpy as np
+from src.services import face_tracker
+from src.services.face_tracker import FaceTracker, TrackedVerifier, iou
+
+def test_iou_of_identical_and_disjoint_boxes():
+    """Test IoU bounds"""
+    assert iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert iou((0, 0, 10, 10), (20, 20, 30, 30)) == 0.0
+
+def test_tracker_reuses_embedding_until_interval():
+    """Test a steady face is embedded once per interval and smoothed over history"""
+    tracker = FaceTracker(iou_threshold=0.3, reembed_interval=5, max_misses=2, history_size=4)
+    
+    needs = []
+    for i in range(10):
+        (track, needs_embedding), = tracker.update([((100 + i, 100, 200 + i, 200), 0.99)])
+        needs.append(needs_embedding)
+        if needs_embedding:
+            tracker.record(track, "alice", 0.8)
+    
+    assert needs == [True, False, False, False, False, True, False, False, False, False]
+    assert track.track_id == 1
+    assert track.decision(0.6) == ("alice", 0.8)
+
+def test_tracker_starts_new_track_after_loss():
+    """Test a face that disappears longer than max_misses gets a new track"""
+    tracker = FaceTracker(iou_threshold=0.3, reembed_interval=50, max_misses=1, history_size=4)
+    box = ((0, 0, 50, 50), 0.9)
+    
+    (first, _), = tracker.update([box])
+    tracker.update([])
+    tracker.update([])
+    (second, needs_embedding), = tracker.update([box])
+    
+    assert second.track_id != first.track_id
+    assert needs_embedding
+
+def test_tracker_ignores_frames_older_than_the_last_update():
+    """Test a worker finishing frame N after frame N+1 does not move tracks back or reset intervals"""
+    tracker = FaceTracker(iou_threshold=0.3, reembed_interval=3, max_misses=1, history_size=4)
+    
+    (track, _), = tracker.update([((0, 0, 50, 50), 0.9)], frame_idx=1)
+    tracker.update([((4, 0, 54, 50), 0.9)], frame_idx=3)
+    assert tracker.update([((2, 0, 52, 50), 0.9)], frame_idx=2) is None
+    assert track.box == (4, 0, 54, 50)
+    
+    (same, needs_embedding), = tracker.update([((6, 0, 56, 50), 0.9)], frame_idx=4)
+    assert same is track and needs_embedding
+
+def test_tracked_verifier_survives_detector_and_embedder_failures(monkeypatch):
+    """Test a raising detector or embedder yields no face and the failed embed is retried next frame"""
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+    detection = ((0, 0, 50, 50), 0.9, None)
+    calls = {"embed": 0}
+    
+    def flaky_embed(app, img, landmarks):
+        calls["embed"] += 1
+        if calls["embed"] == 1:
+            raise RuntimeError("onnx failure")
+        return np.ones(4, dtype=np.float32)
+    
+    def broken_detector(img):
+        raise RuntimeError("detector failure")
+    
+    monkeypatch.setattr(face_tracker, "embed_face", flaky_embed)
+    monkeypatch.setattr(face_tracker, "verify_embedding", lambda index, labels, emb, threshold: ("alice", 0.9))
+    verifier = TrackedVerifier(None, None, [], 0.6, FaceTracker(reembed_interval=50))
+    
+    monkeypatch.setattr(face_tracker, "detect_largest_face", broken_detector)
+    assert verifier(frame) == (None, 0.0, False)
+    
+    monkeypatch.setattr(face_tracker, "detect_largest_face", lambda img: detection)
+    assert verifier(frame) == (None, 0.0, False)
+    assert verifier(frame) == ("alice", 0.9, True)
+    assert calls["embed"] == 2
@@ -0,0 +1,68 @@
+"""Unit tests for compressed galleries with exact re-scoring"""
+import os
+import numpy as np
+import pytest
+from src.services.index_manager import build_index, search_index, rescore_vectors, remove_identity, is_compressed
+from src.services.storage_service import save_model, load_model, model_files, verify_model_files
+from src.services.gallery_compression import compression_report
+from src.utils.benchmark import random_gallery, random_queries
+
+@pytest.fixture(scope="module")
+def gallery():
+    return random_gallery(600, identities=60)
+
+def test_rescoring_restores_exact_scores(gallery):
+    """Test candidates from an int8 index come back with full-precision scores and order"""
+    embeddings, _ = gallery
+    queries = random_queries(embeddings, 20)
+    exact_D, exact_I = build_index(embeddings, "flat").search(queries, 5)
+    
+    index = build_index(embeddings, "sq_int8")
+    assert is_compressed(index) and rescore_vectors(index) is not None
+    D, I = search_index(index, queries, 5)
+    
+    assert np.array_equal(I, exact_I)
+    assert np.allclose(D, exact_D, atol=1e-5)
+
+def test_compact_copy_is_saved_and_used_after_load(tmp_path, gallery):
+    """Test a compressed model writes a float16 copy and re-scores from it after loading"""
+    embeddings, labels = gallery
+    model_path = str(tmp_path / "model.json")
+    
+    save_model(embeddings, labels, 0.6, build_index(embeddings, "sq_int8"), model_path)
+    loaded, loaded_labels, _, index, success = load_model(model_path)
+    files = model_files(model_path)
+    
+    assert success and verify_model_files(model_path)
+    assert os.path.getsize(files['compact']) == embeddings.size * 2
+    source = rescore_vectors(index)
+    assert source.dtype == np.float16 and isinstance(source, np.memmap)
+    
+    D, I = search_index(index, embeddings[:3], 1)
+    assert list(I[:, 0]) == [0, 1, 2]
+    assert np.allclose(D[:, 0], 1.0, atol=1e-3)
+    
+    index, kept, kept_labels = remove_identity(index, loaded, loaded_labels, loaded_labels[0])
+    assert rescore_vectors(index) is not None and len(rescore_vectors(index)) == len(kept)
+
+def test_flat_model_has_no_compact_copy(tmp_path, gallery):
+    """Test uncompressed indexes neither write nor attach a re-score copy"""
+    embeddings, labels = gallery
+    model_path = str(tmp_path / "model.json")
+    
+    save_model(embeddings, labels, 0.6, build_index(embeddings, "flat"), model_path)
+    _, _, _, index, _ = load_model(model_path)
+    
+    assert not os.path.exists(model_files(model_path)['compact'])
+    assert rescore_vectors(index) is None
+
+def test_compression_report_measures_memory_and_error(gallery):
+    """Test the report shows memory saved and the re-scored error near zero"""
+    embeddings, _ = gallery
+    report = compression_report(embeddings, random_queries(embeddings, 30), backends=("sq_fp16", "sq_int8"), k=5)
+    
+    int8 = report['backends']['sq_int8']
+    assert report['backends']['sq_fp16']['memory_saved'] == pytest.approx(0.5, abs=0.05)
+    assert int8['memory_saved'] == pytest.approx(0.75, abs=0.05)
+    assert int8['rescored_top1_agreement'] == 1.0
+    assert int8['rescored_score_error_max'] < 1e-3
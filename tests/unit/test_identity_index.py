@@ -0,0 +1,49 @@
+"""Unit tests for identity-level search"""
+import pytest
+import numpy as np
+from src.services.identity_index import IdentityIndex, identity_representatives
+
+def _gallery(people=5, images=8, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings, labels = [], []
+    for person in range(people):
+        center = rng.normal(size=512)
+        for _ in range(images):
+            vector = center + rng.normal(size=512) * 0.5
+            embeddings.append(vector / np.linalg.norm(vector))
+            labels.append(f"person_{person}")
+    return np.array(embeddings, dtype='float32'), np.array(labels)
+
+def test_top_matches_are_one_per_identity():
+    """Test results are deduplicated by identity and scored against the full image set"""
+    embeddings, labels = _gallery()
+    identities = IdentityIndex(embeddings, labels, exemplars=2)
+    
+    matches = identities.top_matches(embeddings[3], k=5)
+    
+    assert len({label for label, _ in matches}) == len(matches) == 5
+    assert matches[0][0] == "person_0"
+    assert matches[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert identities.index.ntotal == 5 * 3
+
+def test_representatives_are_centroid_plus_real_images():
+    """Test exemplars are actual enrollment vectors and the centroid is normalized"""
+    embeddings, _ = _gallery(people=1, images=10)
+    
+    reps = identity_representatives(embeddings, exemplars=3)
+    
+    assert np.linalg.norm(reps[0]) == pytest.approx(1.0, abs=1e-5)
+    assert all(np.isclose(embeddings @ rep, 1.0, atol=1e-5).any() for rep in reps[1:])
+
+def test_refresh_after_removal_and_verify_many():
+    """Test refreshing drops a removed identity and batched verification honours the threshold"""
+    embeddings, labels = _gallery(people=3)
+    identities = IdentityIndex(embeddings, labels, exemplars=0)
+    
+    keep = labels != "person_1"
+    identities.refresh(embeddings[keep], labels[keep], changed=["person_1"])
+    top_labels, scores, accepted = identities.verify_many(embeddings[[0, 8]], threshold=0.99)
+    
+    assert set(identities.identities) == {"person_0", "person_2"}
+    assert top_labels[0] == "person_0" and accepted[0]
+    assert top_labels[1] != "person_1" and not accepted[1]
@@ -0,0 +1,57 @@
+"""Unit tests for adaptive-resolution detection"""
+import numpy as np
+import pytest
+from config.config import model_config
+from src.core import image_processor
+from src.core.image_processor import detection_scale, run_detector, detector_stats
+
+class FakeRetinaFace:
+    """Finds one face at a fixed fraction of whatever image it is given"""
+    calls = []
+    
+    @classmethod
+    def detect_faces(cls, img, threshold=0.9, model=None, allow_upscaling=True):
+        h, w = img.shape[:2]
+        cls.calls.append((w, h, allow_upscaling))
+        return {'face_1': {'score': 0.99, 'facial_area': [w // 4, h // 4, w // 2, h // 2],
+                           'landmarks': {'right_eye': [w * 0.3, h * 0.3], 'left_eye': [w * 0.45, h * 0.3],
+                                         'nose': [w * 0.375, h * 0.375], 'mouth_right': [w * 0.32, h * 0.45],
+                                         'mouth_left': [w * 0.43, h * 0.45]}}}
+
+@pytest.fixture
+def fake_detector(monkeypatch):
+    FakeRetinaFace.calls = []
+    monkeypatch.setattr(image_processor, "RetinaFace", FakeRetinaFace)
+    return FakeRetinaFace
+
+def test_detection_scale_follows_min_face_size(monkeypatch):
+    """Test the scale shrinks the smallest wanted face to the detector minimum, within limits"""
+    monkeypatch.setattr(model_config, "detector_min_face", 24)
+    monkeypatch.setattr(model_config, "detection_min_side", 160)
+    
+    assert detection_scale((720, 1280, 3), 0) == 1.0
+    assert detection_scale((720, 1280, 3), 80) == pytest.approx(0.3)
+    assert detection_scale((720, 1280, 3), 400) == pytest.approx(160 / 720)
+    assert detection_scale((100, 100, 3), 80) == 1.0
+
+def test_run_detector_maps_downscaled_detections_to_full_resolution(fake_detector, monkeypatch):
+    """Test the detector sees a small copy and boxes/landmarks come back in full-frame pixels"""
+    monkeypatch.setattr(model_config, "detector_min_face", 24)
+    monkeypatch.setattr(model_config, "detection_min_side", 160)
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    
+    faces = run_detector(frame, min_face_size=96)
+    
+    assert fake_detector.calls == [(320, 180, False)]
+    face = faces['face_1']
+    assert face['facial_area'] == [320, 180, 640, 360]
+    assert face['landmarks']['right_eye'] == pytest.approx([384.0, 216.0])
+    summary = detector_stats.summary()
+    assert summary['last_scale'] == pytest.approx(0.25)
+    assert summary['last_input'] == (320, 180)
+
+def test_run_detector_keeps_full_resolution_without_min_face(fake_detector):
+    """Test the default configuration still detects on the original frame"""
+    run_detector(np.zeros((480, 640, 3), dtype=np.uint8), min_face_size=0)
+    
+    assert fake_detector.calls == [(640, 480, True)]
@@ -0,0 +1,81 @@
+"""Unit tests for the dataset ingestion engine"""
+import pytest
+import numpy as np
+import cv2
+from config.config import model_config, runtime_config
+from src.core import image_processor
+from src.services import ingestion_engine
+from src.services.ingestion_engine import (IngestionCheckpoint, resolve_num_workers, worker_threads,
+                                           limit_worker_threads, embed_batch_with_errors, app_for_workers)
+
+def test_checkpoint_resumes_after_truncated_write(tmp_path):
+    """Test records before a torn write survive a reload"""
+    image_path = tmp_path / "img.jpg"
+    image_path.write_bytes(b"fake")
+    checkpoint = IngestionCheckpoint(str(tmp_path / "ckpt.pkl"))
+    
+    embedding = np.ones(512, dtype='float32')
+    checkpoint.append([(str(image_path), "alice", embedding)])
+    with open(checkpoint.path, 'ab') as f:
+        f.write(b"\x80\x04truncated")
+    
+    done = checkpoint.load()
+    assert list(done) == [str(image_path)]
+    assert done[str(image_path)][1] == "alice"
+    assert np.array_equal(done[str(image_path)][2], embedding)
+    
+    checkpoint.clear()
+    assert checkpoint.load() == {}
+
+def test_zero_workers_on_single_cpu_runs_in_process(monkeypatch):
+    """Test "0 = one per CPU" resolves to in-process on a one-CPU host, as the CLIs rely on"""
+    monkeypatch.setattr("os.cpu_count", lambda: 1)
+    
+    assert resolve_num_workers(0) == 1
+    assert resolve_num_workers(None) == 1
+    assert resolve_num_workers(3) == 3
+
+def test_parent_loads_models_only_when_running_in_process(monkeypatch):
+    """Test the CLIs' parent process skips InsightFace when pool workers load their own"""
+    loads = []
+    monkeypatch.setattr(ingestion_engine, "init_insightface", lambda: loads.append(1) or "app")
+    monkeypatch.setattr(ingestion_engine, "warm_up_detector", lambda: None)
+    monkeypatch.setattr("os.cpu_count", lambda: 1)
+    
+    assert app_for_workers(4) == (4, None)
+    assert app_for_workers(0) == (1, "app")
+    assert len(loads) == 1
+
+def test_pool_workers_split_cores_between_them(monkeypatch):
+    """Test worker processes get cores // workers ONNX threads unless the config pins its own"""
+    monkeypatch.setattr("os.cpu_count", lambda: 16)
+    monkeypatch.setattr(runtime_config, "intra_op_threads", 0)
+    assert worker_threads(4) == 4
+    assert worker_threads(32) == 1
+    
+    limit_worker_threads(worker_threads(4))
+    assert runtime_config.intra_op_threads == 4
+    
+    monkeypatch.setattr(runtime_config, "intra_op_threads", 2)
+    limit_worker_threads(8)
+    assert runtime_config.intra_op_threads == 2
+
+def test_legacy_pipeline_reports_errors_but_not_missing_faces(tmp_path, monkeypatch):
+    """Test legacy-mode read and detector failures are errors while an image without a face is not"""
+    corrupt, crash, blank = tmp_path / "corrupt.jpg", tmp_path / "crash.png", tmp_path / "blank.png"
+    corrupt.write_bytes(b"not an image")
+    cv2.imwrite(str(crash), np.full((32, 32, 3), 10, dtype=np.uint8))
+    cv2.imwrite(str(blank), np.full((32, 32, 3), 200, dtype=np.uint8))
+    
+    def fake_detector(img_rgb, min_face_size=None):
+        if img_rgb.mean() < 100:
+            raise RuntimeError("RetinaFace crashed")
+        return {}
+    
+    monkeypatch.setattr(model_config, "pipeline_mode", image_processor.PIPELINE_LEGACY)
+    monkeypatch.setattr(image_processor, "run_detector", fake_detector)
+    results, errors = embed_batch_with_errors(None, [(str(path), "alice") for path in (corrupt, crash, blank)])
+    
+    assert [embedding for _, _, embedding in results] == [None, None, None]
+    assert errors == [str(corrupt), str(crash)]
+
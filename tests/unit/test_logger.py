@@ -0,0 +1,59 @@
+"""Unit tests for structured, rate-limited logging"""
+import json
+import logging
+import queue
+from src.utils.logger import JsonFormatter, RateLimitFilter, SamplingFilter, DroppingQueueHandler, get_logger
+
+def _record(msg, *args, level=logging.WARNING, name='face_verification.test', **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+def test_json_formatter_includes_extra_fields():
+    """Test records are formatted as one JSON object with extra fields"""
+    entry = json.loads(JsonFormatter().format(_record("Could not load: %s", "a.jpg", camera=2)))
+    
+    assert entry['msg'] == "Could not load: a.jpg"
+    assert entry['level'] == "WARNING"
+    assert entry['logger'] == "face_verification.test"
+    assert entry['camera'] == 2
+    assert 'args' not in entry
+
+def test_rate_limit_filter_suppresses_repeats_and_reports_count():
+    """Test repeats of one template are capped per window and the suppressed count is reported"""
+    limiter = RateLimitFilter(interval=60.0, burst=2)
+    
+    passed = [limiter.filter(_record("Failed to read frame %d", i)) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert limiter.filter(_record("Other message"))
+    
+    limiter.windows[('face_verification.test', logging.WARNING, "Failed to read frame %d")] = (-1e9, 2, 3)
+    record = _record("Failed to read frame %d", 6)
+    assert limiter.filter(record)
+    assert record.suppressed == 3
+
+def test_sampling_filter_keeps_one_in_n_flagged_records():
+    """Test sampled records are thinned while unflagged records always pass"""
+    sampler = SamplingFilter(every=10)
+    
+    kept = sum(sampler.filter(_record("Embedded: %s", i, level=logging.DEBUG, sampled=True)) for i in range(100))
+    assert kept == 10
+    assert all(sampler.filter(_record("Embedded: %s", i, level=logging.DEBUG)) for i in range(5))
+
+def test_queue_handler_drops_instead_of_blocking():
+    """Test a full log queue drops records rather than blocking the caller"""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    
+    handler.emit(_record("first"))
+    handler.emit(_record("second"))
+    
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+def test_get_logger_returns_child_of_application_logger():
+    """Test module loggers are children of the configured application logger"""
+    log = get_logger('src.services.index_manager')
+    
+    assert log.name == 'face_verification.src.services.index_manager'
+    assert log.parent is get_logger()
@@ -0,0 +1,44 @@
+"""Unit tests for stage timers and Prometheus export"""
+import pytest
+from src.utils import metrics
+
+@pytest.fixture
+def enabled_metrics():
+    """Fresh, enabled registry; restores the configured state afterwards"""
+    was_enabled = metrics.registry.enabled
+    metrics.registry.reset()
+    metrics.set_enabled(True)
+    yield metrics
+    metrics.registry.reset()
+    metrics.set_enabled(was_enabled)
+
+def test_disabled_metrics_record_nothing():
+    """Test stage timers and counters are no-ops while disabled"""
+    metrics.set_enabled(False)
+    metrics.registry.reset()
+    
+    with metrics.stage("detect"):
+        pass
+    metrics.inc("face_images_processed_total")
+    
+    assert metrics.stage("detect") is metrics.stage("embed")
+    assert metrics.stage_summary() == {}
+    assert "face_images_processed_total 0" not in metrics.render_prometheus()
+
+def test_prometheus_text_has_stage_histogram_and_counters(enabled_metrics):
+    """Test observed stages and counters are exported in Prometheus text format"""
+    with enabled_metrics.stage("detect"):
+        pass
+    with enabled_metrics.stage("detect"):
+        pass
+    enabled_metrics.inc("face_faces_found_total", 3)
+    enabled_metrics.record_decisions(2, 1)
+    
+    text = enabled_metrics.render_prometheus()
+    
+    assert '# TYPE face_stage_duration_seconds histogram' in text
+    assert 'face_stage_duration_seconds_bucket{stage="detect",le="+Inf"} 2' in text
+    assert 'face_stage_duration_seconds_count{stage="detect"} 2' in text
+    assert 'face_faces_found_total 3' in text
+    assert 'face_matches_total 2' in text and 'face_rejections_total 1' in text
+    assert enabled_metrics.stage_summary()["detect"][0] == 2
@@ -0,0 +1,25 @@
+"""Unit tests for the motion gate"""
+import pytest
+import numpy as np
+from src.services.motion_gate import MotionGate
+
+def test_static_frames_skip_detection_until_forced():
+    """Test unchanged frames are skipped and motion or the force interval runs detection"""
+    gate = MotionGate(roi=None, method="diff", pixel_threshold=25, min_changed=0.01, force_interval=5)
+    still = np.full((120, 160, 3), 100, dtype=np.uint8)
+    moved = still.copy()
+    moved[30:90, 40:120] = 220
+    
+    decisions = [gate.should_detect(still) for _ in range(6)]
+    decisions.append(gate.should_detect(moved))
+    
+    assert decisions == [True, False, False, False, False, True, True]
+    assert gate.stats()['detections_skipped'] == 4
+
+def test_roi_crop_uses_frame_fractions():
+    """Test the ROI crop and its offset"""
+    gate = MotionGate(roi=(0.25, 0.5, 0.75, 1.0))
+    roi_frame, offset = gate.crop(np.zeros((480, 640, 3), dtype=np.uint8))
+    
+    assert roi_frame.shape == (240, 320, 3)
+    assert offset == (160, 240)
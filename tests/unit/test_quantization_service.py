@@ -0,0 +1,44 @@
+"""Unit tests for INT8 quantization helpers"""
+import pytest
+import numpy as np
+from config.config import model_config
+from src.core.embedding_service import model_pack_name
+from src.services.quantization_service import sample_calibration_items, letterbox, _leave_one_out_top1
+
+def test_calibration_sample_covers_every_person(tmp_path):
+    """Test calibration images are drawn round-robin across person folders"""
+    for person, count in (("alice", 5), ("bob", 1), ("carol", 3)):
+        folder = tmp_path / person
+        folder.mkdir()
+        for i in range(count):
+            (folder / f"{i}.jpg").write_bytes(b"x")
+    
+    items = sample_calibration_items(str(tmp_path), max_images=4)
+    
+    assert len(items) == 4
+    assert {label for _, label in items} == {"alice", "bob", "carol"}
+
+def test_letterbox_keeps_aspect_ratio():
+    """Test detector calibration frames are padded like SCRFD.detect"""
+    canvas = letterbox(np.full((100, 200, 3), 255, dtype=np.uint8), (160, 160))
+    
+    assert canvas.shape == (160, 160, 3)
+    assert canvas[:80].min() == 255 and canvas[80:].max() == 0
+
+def test_leave_one_out_ignores_self_match():
+    """Test the accuracy report never matches an embedding to itself"""
+    embeddings = np.eye(3, dtype='float32')
+    embeddings[1] = embeddings[0] * 0.8 + embeddings[1] * 0.6
+    labels = np.array(["a", "a", "b"], dtype=object)
+    
+    top_labels, scores = _leave_one_out_top1(embeddings, labels)
+    
+    assert list(top_labels[:2]) == ["a", "a"]
+    assert scores[0] == pytest.approx(0.8)
+
+def test_int8_precision_selects_quantized_pack():
+    """Test INT8 precision loads the quantized pack and rejects unknown precisions"""
+    assert model_pack_name("fp32") == model_config.model_name
+    assert model_pack_name("int8") == f"{model_config.model_name}_int8"
+    with pytest.raises(ValueError):
+        model_pack_name("fp16")
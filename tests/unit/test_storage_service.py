@@ -0,0 +1,59 @@
+"""Unit tests for model storage"""
+import pytest
+import numpy as np
+from src.services.index_manager import build_index
+import threading
+from src.services.storage_service import save_model, load_model, verify_model_files, append_enrollment, load_journal
+
+def test_save_and_load_memory_mapped_model(tmp_path):
+    """Test the mapped format round-trips embeddings, labels and threshold"""
+    model_path = str(tmp_path / "model.json")
+    embeddings = np.random.rand(6, 512).astype('float32')
+    labels = np.array(['bob', 'alice', 'bob', 'carol', 'alice', 'bob'])
+    
+    save_model(embeddings, labels, 0.65, build_index(embeddings), model_path)
+    loaded, loaded_labels, threshold, index, success = load_model(model_path)
+    
+    assert success
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, embeddings)
+    assert list(loaded_labels) == list(labels)
+    assert threshold == pytest.approx(0.65)
+    assert index.ntotal == 6
+    assert verify_model_files(model_path)
+
+def test_resave_does_not_disturb_a_loaded_index(tmp_path):
+    """Test an index loaded with mmap keeps working after the model is re-saved smaller"""
+    model_path = str(tmp_path / "model.json")
+    embeddings = np.random.rand(2000, 512).astype('float32')
+    save_model(embeddings, np.array(['alice'] * 2000), 0.6, build_index(embeddings, "flat"), model_path)
+    _, _, _, index, _ = load_model(model_path)
+    
+    save_model(embeddings[:3], np.array(['bob'] * 3), 0.6, build_index(embeddings[:3], "flat"), model_path)
+    D, I = index.search(embeddings[-1:], 1)
+    
+    assert I[0, 0] == 1999
+    assert (tmp_path / "model.faiss").exists()
+    assert load_model(model_path)[3].ntotal == 3
+
+def test_journal_replays_without_a_base_model(tmp_path):
+    """Test enrollments appended concurrently before any model was saved are all replayed"""
+    model_path = str(tmp_path / "face_model.pkl")
+    
+    def enroll(worker):
+        rng = np.random.default_rng(worker)
+        for i in range(10):
+            append_enrollment('add', f"person_{worker}_{i}", rng.random((2, 8), dtype=np.float32), model_path)
+    
+    threads = [threading.Thread(target=enroll, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    append_enrollment('remove', "person_0_0", model_path=model_path)
+    
+    embeddings, labels, index = load_journal(model_path)
+    
+    assert len(set(labels)) == 39
+    assert "person_0_0" not in set(labels)
+    assert index.ntotal == len(labels) == len(embeddings) == 78
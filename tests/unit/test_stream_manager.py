@@ -0,0 +1,89 @@
+"""Unit tests for the multi-stream manager"""
+import threading
+import cv2
+import numpy as np
+from src.services.stream_manager import FairScheduler, StreamManager
+
+def write_video(path, frames=20, size=(64, 48), fps=25.0):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 10 % 255, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+def test_fair_scheduler_round_robins_across_streams():
+    """Test a backlog on one stream does not starve the others"""
+    scheduler = FairScheduler()
+    busy = scheduler.add_queue("busy", maxsize=10)
+    quiet = scheduler.add_queue("quiet", maxsize=10)
+    for i in range(5):
+        busy.put(i)
+    quiet.put("q")
+    
+    order = [scheduler.get(timeout=0)[0] for _ in range(3)]
+    assert order == ["busy", "quiet", "busy"]
+    assert scheduler.pending() == 3
+
+def test_file_streams_share_workers_and_report_per_stream(tmp_path):
+    """Test two file-backed streams are fully processed by one worker pool with per-stream results"""
+    first = write_video(tmp_path / "door1.avi", frames=12)
+    second = write_video(tmp_path / "door2.avi", frames=8)
+    results = []
+    threads = set()
+    
+    def analyze(frame):
+        threads.add(threading.current_thread().name)
+        return []
+    
+    manager = StreamManager(None, None, None, 0.5, num_workers=2, queue_size=100, analyze=analyze,
+                            on_result=results.append)
+    manager.add_stream(first, name="door1", realtime=False)
+    manager.add_stream(second, name="door2", realtime=False)
+    manager.start()
+    assert manager.join(timeout=10)
+    manager.stop()
+    
+    stats = manager.stats()
+    assert stats["door1"]["frames_processed"] == 12
+    assert stats["door2"]["frames_processed"] == 8
+    assert stats["door1"]["state"] == "ended"
+    assert stats["door1"]["dropped_frames"] == 0 and stats["door1"]["queue_depth"] == 0
+    assert {result.stream for result in results} == {"door1", "door2"}
+    assert manager.latest_result("door2").frame_id == 8
+    assert threads <= {"stream-inference-0", "stream-inference-1"}
+
+def test_live_stream_reconnects_after_read_failure():
+    """Test a live source that stops delivering frames is reopened"""
+    class FlakyCapture:
+        def __init__(self, frames):
+            self.frames = frames
+        
+        def read(self):
+            if self.frames <= 0:
+                return False, None
+            self.frames -= 1
+            return True, np.zeros((8, 8, 3), dtype=np.uint8)
+        
+        def get(self, prop):
+            return 0
+        
+        def release(self):
+            pass
+    
+    opened = []
+    
+    def opener(source):
+        opened.append(source)
+        return FlakyCapture(3) if len(opened) <= 2 else None
+    
+    manager = StreamManager(None, None, None, 0.5, num_workers=1, queue_size=100, analyze=lambda frame: [],
+                            opener=opener, reconnect_attempts=2, reconnect_delay=0)
+    manager.add_stream("rtsp://camera/door", name="door")
+    manager.start()
+    assert manager.join(timeout=10)
+    manager.stop()
+    
+    stats = manager.stats()["door"]
+    assert stats["reconnects"] == 1
+    assert stats["frames_captured"] == 6
+    assert stats["state"] == "failed"
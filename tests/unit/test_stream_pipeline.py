@@ -0,0 +1,67 @@
+"""Unit tests for the threaded stream pipeline"""
+import time
+import pytest
+import numpy as np
+from src.services.stream_pipeline import LatestFrameQueue, LivePipeline
+
+class FakeCamera:
+    def __init__(self, frames):
+        self.frames = frames
+    
+    def read(self):
+        if self.frames <= 0:
+            return False, None
+        self.frames -= 1
+        time.sleep(0.002)
+        return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+def test_latest_frame_queue_drops_stale_frames():
+    """Test a full queue keeps only the newest frames"""
+    queue = LatestFrameQueue(maxsize=2)
+    for i in range(5):
+        queue.put(i)
+    
+    assert queue.dropped == 3
+    assert queue.get(timeout=0) == 3
+    assert queue.get(timeout=0) == 4
+    assert queue.get(timeout=0) is None
+
+def test_pipeline_reports_newest_result_and_metrics():
+    """Test slow inference drops frames while capture keeps running"""
+    def slow_analyze(frame, frame_id):
+        time.sleep(0.02)
+        return "alice", 0.9, True
+    
+    pipeline = LivePipeline(None, FakeCamera(60), None, None, 0.5, num_workers=1,
+                            analyze=slow_analyze).start()
+    while pipeline.running:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    pipeline.stop()
+    
+    result = pipeline.latest_result()
+    metrics = pipeline.metrics()
+    assert result.identity == "alice"
+    assert metrics['dropped_frames'] > 0
+    assert metrics['latency_ms'] > 0
+
+def test_pipeline_keeps_running_when_analysis_raises():
+    """Test an analyzer exception is logged and later frames are still analyzed"""
+    calls = []
+    
+    def flaky_analyze(frame, frame_id):
+        calls.append(frame_id)
+        time.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("inference failure")
+        return "alice", 0.9, True
+    
+    pipeline = LivePipeline(None, FakeCamera(30), None, None, 0.5, num_workers=1,
+                            analyze=flaky_analyze).start()
+    while pipeline.running:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    pipeline.stop()
+    
+    assert len(calls) > 1
+    assert pipeline.latest_result().identity == "alice"
@@ -0,0 +1,70 @@
+"""Conformance tests run against every vector store backend"""
+import pytest
+import numpy as np
+from src.services.vector_store import FaissVectorStore, gallery_record_ids
+
+@pytest.fixture(params=["faiss", "milvus"])
+def store(request, tmp_path):
+    """An empty 8-d store; the Milvus variant runs Milvus Lite on a temporary file"""
+    if request.param == "faiss":
+        yield FaissVectorStore(dimension=8)
+        return
+    
+    pytest.importorskip("milvus_lite")
+    from src.services.vector_store import MilvusVectorStore
+    milvus = MilvusVectorStore(uri=str(tmp_path / "gallery.db"), collection="faces_test", dimension=8)
+    yield milvus
+    milvus.close()
+
+def _unit(i):
+    vector = np.zeros(8, dtype='float32')
+    vector[i] = 1.0
+    return vector
+
+def _seed(store):
+    store.upsert(["alice/0", "alice/1", "bob/0", "carol/0"], ["alice", "alice", "bob", "carol"],
+                 np.stack([_unit(0), _unit(1), _unit(2), _unit(3)]))
+
+def test_batched_search_ranks_by_inner_product(store):
+    """Test every query row gets its own ranked (id, label, score) hits"""
+    _seed(store)
+    
+    results = store.search(np.stack([_unit(2), _unit(1)]), k=2)
+    
+    assert results[0][0][:2] == ("bob/0", "bob")
+    assert results[0][0][2] == pytest.approx(1.0)
+    assert results[1][0][:2] == ("alice/1", "alice")
+    assert store.count() == 4 and store.identities() == {"alice", "bob", "carol"}
+
+def test_upsert_replaces_existing_id(store):
+    """Test upserting an existing id replaces its label and vector instead of duplicating it"""
+    _seed(store)
+    
+    store.upsert(["bob/0"], ["dave"], _unit(4)[None])
+    
+    assert store.count() == 4
+    assert store.search(_unit(4)[None], k=1)[0][0][:2] == ("bob/0", "dave")
+    assert store.search(_unit(2)[None], k=1, labels=["bob"]) == [[]]
+
+def test_label_filter_restricts_results(store):
+    """Test identity filters only return records of the requested labels"""
+    _seed(store)
+    
+    hits = store.search(_unit(0)[None], k=4, labels=["bob", "carol"])[0]
+    
+    assert {label for _, label, _ in hits} <= {"bob", "carol"} and len(hits) == 2
+
+def test_delete_by_id_and_label(store):
+    """Test deletes by id and by label are visible to the next search"""
+    _seed(store)
+    
+    store.delete(ids=["carol/0"])
+    assert store.delete(labels=["alice"]) == 2
+    assert store.delete(labels=["nobody"]) == 0
+    
+    assert store.count() == 1 and store.identities() == {"bob"}
+    assert [hit[0] for hit in store.search(_unit(0)[None], k=4)[0]] == ["bob/0"]
+
+def test_gallery_record_ids_are_deterministic():
+    """Test ids for a gallery loaded from disk are stable across workers"""
+    assert gallery_record_ids(["a", "b", "a"]) == ["a/0", "b/0", "a/1"]
@@ -11,4 +11,75 @@ def test_build_index():
     index = build_index(embeddings)
     
     assert index is not None
-    assert index.ntotal == 10
\ No newline at end of file
+    assert index.ntotal == 10
+
+def test_remove_and_add_identity_keeps_ids_aligned():
+    """Test ids stay equal to label positions after incremental updates"""
+    from src.services.index_manager import build_index, add_identity, remove_identity
+    
+    embeddings = np.random.rand(6, 512).astype('float32')
+    labels = np.array(['alice', 'bob', 'alice', 'carol', 'bob', 'carol'])
+    index = build_index(embeddings)
+    
+    index, embeddings, labels = remove_identity(index, embeddings, labels, 'alice')
+    new_vectors = np.random.rand(2, 512).astype('float32')
+    index, embeddings, labels = add_identity(index, embeddings, labels, 'dave', new_vectors)
+    
+    assert index.ntotal == len(labels) == 6
+    assert 'alice' not in set(labels)
+    D, I = index.search(embeddings, k=1)
+    assert I[:, 0].tolist() == list(range(6))
+
+@pytest.mark.parametrize("backend", ["flat", "ivf_flat", "hnsw"])
+def test_verify_embedding_with_each_backend(backend):
+    """Test verify_embedding works unchanged against every index backend"""
+    from src.services.index_manager import build_index
+    from src.services.verification_service import verify_embedding
+    
+    embeddings = np.random.rand(200, 512).astype('float32')
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    labels = np.array([f"person_{i // 4}" for i in range(200)])
+    index = build_index(embeddings, backend)
+    
+    label, score = verify_embedding(index, labels, embeddings[42], 0.9)
+    assert label == "person_10"
+    assert score > 0.99
+
+def test_verify_embeddings_batch_matches_single():
+    """Test the batched search agrees with verify_embedding row by row"""
+    from src.services.index_manager import build_index
+    from src.services.verification_service import verify_embedding, verify_embeddings
+    
+    embeddings = np.random.rand(20, 512).astype('float32')
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    labels = np.array([f"person_{i // 2}" for i in range(20)])
+    index = build_index(embeddings)
+    queries = np.vstack([embeddings[:5], -embeddings[:1]])
+    
+    top_labels, scores, accepted = verify_embeddings(index, labels, queries, 0.9)
+    
+    for i, query in enumerate(queries):
+        label, score = verify_embedding(index, labels, query, 0.9)
+        assert (top_labels[i] if accepted[i] else None) == label
+        assert scores[i] == pytest.approx(score)
+    assert accepted.tolist() == [True] * 5 + [False]
+
+def test_verify_frame_faces_returns_result_per_face(monkeypatch):
+    """Test every face in a frame is verified in one search and keeps its box"""
+    from src.services import verification_service
+    from src.services.index_manager import build_index
+    from src.models.data_models import DetectedFace
+    
+    gallery = np.eye(3, 512, dtype='float32')
+    labels = np.array(['alice', 'bob', 'carol'])
+    stranger = np.zeros(512, dtype='float32')
+    stranger[5] = 1.0
+    faces = [DetectedFace(box=(0, 0, 40, 40), det_score=0.99, embedding=gallery[1]),
+             DetectedFace(box=(50, 0, 80, 30), det_score=0.9, embedding=stranger)]
+    monkeypatch.setattr(verification_service, "process_frame_faces", lambda app, frame, min_size=0: faces)
+    
+    results = verification_service.verify_frame_faces(None, build_index(gallery), labels, None, 0.6)
+    
+    assert [result.identity for result in results] == ['bob', None]
+    assert [result.success for result in results] == [True, False]
+    assert results[1].box == (50, 0, 80, 30) and results[0].det_score == 0.99
@@ -0,0 +1,89 @@
+"""Unit tests for offline video processing"""
+import json
+import cv2
+import numpy as np
+from src.models.data_models import DetectedFace
+from src.services.index_manager import build_index
+from src.services import video_processor
+from src.services.video_processor import iter_video_frames, process_video, timecode
+
+def write_video(path, frames=50, fps=10.0, size=(64, 48)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 8 % 256, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+def test_iter_video_frames_samples_every_nth_frame(tmp_path):
+    """Test every-N sampling yields the right indices and timestamps"""
+    video = write_video(tmp_path / "clip.avi", frames=50, fps=10.0)
+    
+    sampled = [(index, round(ts, 2)) for index, ts, _ in iter_video_frames(video, sample_every=10)]
+    assert sampled == [(0, 0.0), (10, 1.0), (20, 2.0), (30, 3.0), (40, 4.0)]
+
+def test_iter_video_frames_samples_by_time_interval(tmp_path):
+    """Test interval sampling takes one frame per interval"""
+    video = write_video(tmp_path / "clip.avi", frames=50, fps=10.0)
+    
+    indices = [index for index, _, _ in iter_video_frames(video, sample_interval=1.5)]
+    assert indices == [0, 15, 30, 45]
+
+def test_process_video_streams_matches_to_jsonl(tmp_path, monkeypatch):
+    """Test matches are written per face with timestamps, and unknown faces are skipped"""
+    video = write_video(tmp_path / "clip.avi", frames=30, fps=10.0)
+    alice = np.zeros(512, dtype='float32')
+    alice[0] = 1.0
+    stranger = np.zeros(512, dtype='float32')
+    stranger[1] = 1.0
+    
+    def fake_faces(app, frames, min_size=0):
+        # Alice appears from frame 10 onwards next to a stranger in every frame
+        results = []
+        for frame in frames:
+            faces = [DetectedFace(box=(1, 2, 30, 40), det_score=0.9, embedding=stranger)]
+            if frame.mean() > 60:
+                faces.insert(0, DetectedFace(box=(5, 5, 40, 40), det_score=0.99, embedding=alice))
+            results.append(faces)
+        return results
+    
+    monkeypatch.setattr(video_processor, "process_frames_faces", fake_faces)
+    index = build_index(np.stack([alice]), "flat")
+    output = tmp_path / "out" / "matches.jsonl"
+    
+    stats = process_video(None, index, np.array(["alice"]), video, str(output), 0.5, sample_every=5,
+                          batch_size=2, num_workers=1)
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    
+    assert stats['frames_processed'] == 6
+    assert stats['faces'] == 10
+    assert stats['matches'] == 4
+    assert [record['frame'] for record in records] == [10, 15, 20, 25]
+    assert records[0]['identity'] == "alice"
+    assert records[0]['timecode'] == "00:00:01.000"
+    assert records[0]['box'] == [5, 5, 40, 40]
+
+def test_failed_batch_is_skipped_not_fatal(tmp_path, monkeypatch):
+    """Test an embedding error in one batch is counted and the scan continues"""
+    video = write_video(tmp_path / "clip.avi", frames=30, fps=10.0)
+    alice = np.zeros(512, dtype='float32')
+    alice[0] = 1.0
+    calls = []
+    
+    def flaky_faces(app, frames, min_size=0):
+        calls.append(len(frames))
+        if len(calls) == 2:
+            raise RuntimeError("InsightFace batch error")
+        return [[DetectedFace(box=(0, 0, 20, 20), det_score=0.9, embedding=alice)] for _ in frames]
+    
+    monkeypatch.setattr(video_processor, "process_frames_faces", flaky_faces)
+    output = tmp_path / "matches.jsonl"
+    
+    stats = process_video(None, build_index(np.stack([alice]), "flat"), np.array(["alice"]), video, str(output),
+                          0.5, sample_every=5, batch_size=2, num_workers=1)
+    
+    assert calls == [2, 2, 2]
+    assert stats['failed_frames'] == 2 and stats['frames_processed'] == 4
+    assert [json.loads(line)['frame'] for line in output.read_text().splitlines()] == [0, 5, 20, 25]
+
+def test_timecode_formats_hours_minutes_seconds():
+    assert timecode(3723.5) == "01:02:03.500"